@@ -0,0 +1,388 @@
+#!/usr/bin/python
+
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = r'''
+---
+author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
+description: "On HPE Alletra 9000 and Primera and 3PAR - Report provisioned,
+ reserved, used and saved space of all base volumes, in total and per CPG,
+ domain and metadata tag. All volumes are fetched with one list call. The
+ aggregates are computed with NumPy when it is installed, with plain Python
+ otherwise. Virtual copies (snapshots) are not counted. Sizes are in MiB.
+ thin_saved_mib is the provisioned space not reserved thanks to thin
+ provisioning, reduction_saved_mib the host writes not stored thanks to
+ deduplication and compression."
+module: hpe3par_capacity_report
+options:
+  group_by:
+    choices:
+      - cpg
+      - domain
+      - tag
+    default:
+      - cpg
+      - domain
+    description:
+      - "Aggregates to build in addition to the total. Volumes are grouped by
+       user CPG, by domain (- for no domain) or by the values of the
+       tag_keys metadata keys.\n"
+    required: false
+    type: list
+  tag_keys:
+    default:
+      - type
+    description:
+      - "Metadata keys grouped by with group_by tag, for example type which is
+       set to ansible-3par-client on volumes created by hpe3par_volume. The
+       volume list does not carry the metadata, it is fetched once per volume,
+       max_workers at a time.\n"
+    required: false
+    type: list
+  max_workers:
+    default: 8
+    description:
+      - "Number of metadata lookups run concurrently with group_by tag. Capped
+       at 8.\n"
+    required: false
+    type: int
+  storage_system_ip:
+    description:
+      - "The storage system IP address."
+    required: true
+  storage_system_password:
+    description:
+      - "The storage system password."
+    required: true
+  storage_system_username:
+    description:
+      - "The storage system user name."
+    required: true
+
+requirements:
+  - "3PAR OS - 3.2.2 MU6, 3.3.1 MU1"
+  - "Ansible - 2.4"
+  - "hpe3par_sdk 1.0.0"
+  - "numpy (optional, faster aggregation on arrays with many volumes)"
+  - "WSAPI service should be enabled on the HPE Alletra 9000 and Primera and 3PAR storage array."
+short_description: "Report HPE Alletra 9000 and Primera and 3PAR capacity and thin savings"
+version_added: "2.4"
+'''
+
+EXAMPLES = r'''
+    - name: Report capacity per CPG and domain
+      hpe3par_capacity_report:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+      register: capacity
+
+    - name: Show thin savings of CPG "{{ cpg }}"
+      debug:
+        msg: "{{ capacity.report.cpg[cpg].thin_saved_mib }}"
+
+    - name: Report capacity of the volumes created by Ansible
+      hpe3par_capacity_report:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        group_by:
+          - tag
+        tag_keys:
+          - type
+'''
+
+RETURN = r'''
+'''
+
+from multiprocessing.pool import ThreadPool
+from ansible.module_utils.basic import AnsibleModule
+try:
+    from hpe3par_sdk import client
+except ImportError:
+    client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Upper bound for max_workers, as for the hpe3par_volume bulk operations
+MAX_WORKERS = 8
+
+# Volume provisioning types and compression state, as in hpe3par_volume
+PROVISIONING_TPVV = 2
+PROVISIONING_SNP = 3
+PROVISIONING_TDVV = 6
+COMPRESSION_YES = 1
+
+# Aggregated values, in report order
+METRICS = (
+    'volumes',
+    'thin_volumes',
+    'dedupe_volumes',
+    'compressed_volumes',
+    'provisioned_mib',
+    'reserved_mib',
+    'used_mib',
+    'written_mib',
+    'thin_saved_mib',
+    'reduction_saved_mib')
+
+
+def get_volume_columns(volumes):
+    """One list per volume field, snapshots left out."""
+    columns = dict((name, []) for name in (
+        'name', 'cpg', 'domain', 'provisioning_type', 'compression_state',
+        'size', 'reserved', 'used', 'user_used', 'written'))
+    for volume in volumes:
+        if volume.provisioning_type == PROVISIONING_SNP:
+            continue
+        columns['name'].append(volume.name)
+        columns['cpg'].append(volume.user_cpg or '-')
+        columns['domain'].append(volume.domain or '-')
+        columns['provisioning_type'].append(volume.provisioning_type or 0)
+        columns['compression_state'].append(volume.compression_state or 0)
+        columns['size'].append(volume.size_mib or 0)
+        columns['reserved'].append(volume.total_reserved_mib or 0)
+        columns['used'].append(volume.total_used_mib or 0)
+        user_used = 0
+        if volume.user_space is not None:
+            user_used = volume.user_space.used_MiB or 0
+        columns['user_used'].append(user_used)
+        columns['written'].append(volume.host_write_mib or 0)
+    return columns
+
+
+def compute_metrics(columns):
+    if np is not None:
+        provisioning_type = np.array(columns['provisioning_type'])
+        size = np.array(columns['size'], dtype=float)
+        reserved = np.array(columns['reserved'], dtype=float)
+        written = np.array(columns['written'], dtype=float)
+        return {
+            'volumes': np.ones(len(size)),
+            'thin_volumes': provisioning_type == PROVISIONING_TPVV,
+            'dedupe_volumes': provisioning_type == PROVISIONING_TDVV,
+            'compressed_volumes':
+                np.array(columns['compression_state']) == COMPRESSION_YES,
+            'provisioned_mib': size,
+            'reserved_mib': reserved,
+            'used_mib': np.array(columns['used'], dtype=float),
+            'written_mib': written,
+            'thin_saved_mib': np.maximum(size - reserved, 0),
+            'reduction_saved_mib': np.maximum(
+                written - np.array(columns['user_used'], dtype=float), 0)}
+    return {
+        'volumes': [1] * len(columns['size']),
+        'thin_volumes': [int(provisioning_type == PROVISIONING_TPVV)
+                         for provisioning_type
+                         in columns['provisioning_type']],
+        'dedupe_volumes': [int(provisioning_type == PROVISIONING_TDVV)
+                           for provisioning_type
+                           in columns['provisioning_type']],
+        'compressed_volumes': [int(compression_state == COMPRESSION_YES)
+                               for compression_state
+                               in columns['compression_state']],
+        'provisioned_mib': columns['size'],
+        'reserved_mib': columns['reserved'],
+        'used_mib': columns['used'],
+        'written_mib': columns['written'],
+        'thin_saved_mib': [max(size - reserved, 0) for size, reserved
+                           in zip(columns['size'], columns['reserved'])],
+        'reduction_saved_mib': [max(written - user_used, 0)
+                                for written, user_used
+                                in zip(columns['written'],
+                                       columns['user_used'])]}
+
+
+def aggregate(metrics, rows, groups):
+    """Sums the metrics of the volume rows per group, a row may appear in
+    several groups."""
+    report = {}
+    if not rows:
+        return report
+    if np is not None:
+        rows = np.array(rows)
+        group_names, inverse = np.unique(
+            np.array(groups, dtype=object).astype(str), return_inverse=True)
+        sums = [np.bincount(inverse, weights=np.asarray(
+            metrics[metric], dtype=float)[rows], minlength=len(group_names))
+            for metric in METRICS]
+        for index, group_name in enumerate(group_names):
+            report[str(group_name)] = dict(
+                (metric, int(round(sums[position][index])))
+                for position, metric in enumerate(METRICS))
+        return report
+    for row, group in zip(rows, groups):
+        values = report.setdefault(group, dict(
+            (metric, 0) for metric in METRICS))
+        for metric in METRICS:
+            values[metric] += metrics[metric][row]
+    for values in report.values():
+        for metric in METRICS:
+            values[metric] = int(round(values[metric]))
+    return report
+
+
+def get_volume_tags(client_obj, volume_names, tag_keys, max_workers):
+    def get_tags(volume_name):
+        metadata = client_obj.getAllVolumeMetaData(volume_name)
+        return ["%s=%s" % (item['key'], item['value'])
+                for item in metadata.get('members', [])
+                if item.get('key') in tag_keys]
+
+    workers = max(1, min(max_workers or 1, MAX_WORKERS, len(volume_names)))
+    if workers == 1:
+        return [get_tags(volume_name) for volume_name in volume_names]
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(get_tags, volume_names)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def build_capacity_report(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        group_by,
+        tag_keys,
+        max_workers):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Capacity report failed. Storage system username or password is \
+null",
+            {})
+    group_by = group_by or []
+    if 'tag' in group_by and not tag_keys:
+        return (False, False, "Capacity report failed. Tag keys is null", {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        # One call for all volumes, no per volume GET
+        columns = get_volume_columns(client_obj.getVolumes())
+        volume_tags = None
+        if 'tag' in group_by:
+            volume_tags = get_volume_tags(
+                client_obj, columns['name'], tag_keys, max_workers)
+    except Exception as e:
+        return (False, False, "Capacity report failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+
+    metrics = compute_metrics(columns)
+    all_rows = list(range(len(columns['name'])))
+    total = aggregate(metrics, all_rows, ['total'] * len(all_rows))
+    report = {'total': total.get('total', dict(
+        (metric, 0) for metric in METRICS))}
+    for group in ('cpg', 'domain'):
+        if group in group_by:
+            report[group] = aggregate(metrics, all_rows, columns[group])
+    if volume_tags is not None:
+        rows = []
+        groups = []
+        for row, tags in enumerate(volume_tags):
+            rows.extend([row] * len(tags))
+            groups.extend(tags)
+        report['tag'] = aggregate(metrics, rows, groups)
+    return (True, False, "Capacity report of %s volume(s) built successfully."
+            % len(all_rows), report)
+
+
+def main():
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "group_by": {
+            "type": "list",
+            "default": ['cpg', 'domain'],
+            "choices": ['cpg', 'domain', 'tag']
+        },
+        "tag_keys": {
+            "type": "list",
+            "default": ['type']
+        },
+        "max_workers": {
+            "type": "int",
+            "default": 8
+        }
+    }
+    module = AnsibleModule(argument_spec=fields)
+
+    if client is None:
+        module.fail_json(msg='the python hpe3par_sdk module is required')
+
+    storage_system_ip = module.params["storage_system_ip"]
+    storage_system_username = module.params["storage_system_username"]
+    storage_system_password = module.params["storage_system_password"]
+
+    group_by = module.params["group_by"]
+    tag_keys = module.params["tag_keys"]
+    max_workers = module.params["max_workers"]
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
+
+    return_status, changed, msg, report = build_capacity_report(
+        client_obj, storage_system_username, storage_system_password,
+        group_by, tag_keys, max_workers)
+    if return_status:
+        module.exit_json(changed=changed, msg=msg, report=report)
+    else:
+        module.fail_json(msg=msg)
+
+
+if __name__ == '__main__':
+    main()
@@ -185,6 +185,10 @@ try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
 
 
 def convert_to_binary_multiple(size, size_unit):
@@ -438,10 +442,16 @@ def main():
     sdgs_unit = module.params["sdgs_unit"]
     sdgw_unit = module.params["sdgw_unit"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
@@ -0,0 +1,260 @@
+#!/usr/bin/python
+
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = r'''
+---
+author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
+description: "On HPE Alletra 9000 and Primera and 3PAR - Gather volumes, hosts,
+ host sets, volume sets, VLUNs, CPGs and QoS rules with one list call per
+ object type. The facts are returned under ansible_facts.hpe3par, indexed by
+ name. VLUNs are indexed by volume name, each entry is the list of VLUNs of
+ that volume."
+module: hpe3par_facts
+options:
+  cache_ttl:
+    default: 0
+    description:
+      - "Seconds a gathered inventory is reused by later tasks for the same
+       storage system and gather_subset, without contacting the array. 0
+       disables the cache. Requires the module_utils path to be configured.
+       When Ansible fact caching is enabled the returned facts are also stored
+       in the fact cache, expiring after fact_caching_timeout.\n"
+    required: false
+    type: int
+  gather_subset:
+    choices:
+      - all
+      - volumes
+      - hosts
+      - host_sets
+      - volume_sets
+      - vluns
+      - cpgs
+      - qos_rules
+    default:
+      - all
+    description:
+      - "Object types to gather."
+    required: false
+    type: list
+  storage_system_ip:
+    description:
+      - "The storage system IP address."
+    required: true
+  storage_system_password:
+    description:
+      - "The storage system password."
+    required: true
+  storage_system_username:
+    description:
+      - "The storage system user name."
+    required: true
+
+requirements:
+  - "3PAR OS - 3.2.2 MU6, 3.3.1 MU1"
+  - "Ansible - 2.4"
+  - "hpe3par_sdk 1.0.0"
+  - "WSAPI service should be enabled on the HPE Alletra 9000 and Primera and 3PAR storage array."
+short_description: "Gather HPE Alletra 9000 and Primera and 3PAR facts"
+version_added: "2.4"
+'''
+
+EXAMPLES = r'''
+    - name: Gather facts
+      hpe3par_facts:
+        storage_system_ip="{{ storage_system_ip }}"
+        storage_system_username="{{ storage_system_username }}"
+        storage_system_password="{{ storage_system_password }}"
+
+    - name: Gather volumes and VLUNs, reuse them for 5 minutes
+      hpe3par_facts:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        gather_subset:
+          - volumes
+          - vluns
+        cache_ttl: 300
+
+    - name: Show the size of "{{ volume_name }}"
+      debug:
+        msg: "{{ hpe3par.volumes[volume_name].size_mib }}"
+'''
+
+RETURN = r'''
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+try:
+    from hpe3par_sdk import client
+except ImportError:
+    client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Fact name, client list call and attribute the objects are indexed by
+FACT_SUBSETS = (
+    ('volumes', 'getVolumes', 'name'),
+    ('hosts', 'getHosts', 'name'),
+    ('host_sets', 'getHostSets', 'name'),
+    ('volume_sets', 'getVolumeSets', 'name'),
+    ('vluns', 'getVLUNs', 'volume_name'),
+    ('cpgs', 'getCPGs', 'name'),
+    ('qos_rules', 'queryQoSRules', 'name'),
+)
+
+
+def to_fact(obj):
+    """Converts an SDK model object to plain dicts and lists."""
+    if isinstance(obj, (list, tuple)):
+        return [to_fact(item) for item in obj]
+    if isinstance(obj, dict):
+        return dict((key, to_fact(value)) for key, value in obj.items())
+    if hasattr(obj, '__dict__'):
+        return dict((key, to_fact(value)) for key, value in vars(obj).items())
+    return obj
+
+
+def get_subsets(gather_subset):
+    if gather_subset is None or 'all' in gather_subset:
+        return [subset[0] for subset in FACT_SUBSETS]
+    return [subset[0] for subset in FACT_SUBSETS
+            if subset[0] in gather_subset]
+
+
+def gather_facts(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        gather_subset):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Gather facts failed. Storage system username or password is null",
+            {})
+    subsets = get_subsets(gather_subset)
+    facts = {}
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        for fact_name, list_call, key in FACT_SUBSETS:
+            if fact_name not in subsets:
+                continue
+            index = {}
+            for obj in getattr(client_obj, list_call)():
+                if fact_name == 'vluns':
+                    index.setdefault(obj.volume_name, []).append(to_fact(obj))
+                else:
+                    index[getattr(obj, key)] = to_fact(obj)
+            facts[fact_name] = index
+    except Exception as e:
+        return (False, False, "Gather facts failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    return (True, False, "Gathered %s successfully." % ", ".join(subsets),
+            facts)
+
+
+def main():
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "gather_subset": {
+            "type": "list",
+            "default": ['all'],
+            "choices": ['all'] + [subset[0] for subset in FACT_SUBSETS]
+        },
+        "cache_ttl": {
+            "type": "int",
+            "default": 0
+        }
+    }
+    module = AnsibleModule(argument_spec=fields)
+
+    if client is None:
+        module.fail_json(msg='the python hpe3par_sdk module is required')
+
+    storage_system_ip = module.params["storage_system_ip"]
+    storage_system_username = module.params["storage_system_username"]
+    storage_system_password = module.params["storage_system_password"]
+
+    gather_subset = module.params["gather_subset"]
+    cache_ttl = module.params["cache_ttl"]
+
+    cache_file = None
+    if hpe3par_util is not None and cache_ttl > 0:
+        cache_file = hpe3par_util.get_cache_file(
+            'facts', storage_system_ip, storage_system_username,
+            ','.join(get_subsets(gather_subset)))
+        facts = hpe3par_util.read_cache(cache_file, cache_ttl)
+        if facts is not None:
+            module.exit_json(changed=False, msg="Gathered facts from cache.",
+                             ansible_facts={'hpe3par': facts})
+            return
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
+
+    return_status, changed, msg, facts = gather_facts(
+        client_obj, storage_system_username, storage_system_password,
+        gather_subset)
+    if return_status:
+        if cache_file is not None:
+            hpe3par_util.write_cache(cache_file, facts)
+        module.exit_json(changed=changed, msg=msg,
+                         ansible_facts={'hpe3par': facts})
+    else:
+        module.fail_json(msg=msg)
+
+
+if __name__ == '__main__':
+    main()
@@ -176,6 +176,51 @@ try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+
+def normalize_wwn(wwn):
+    return wwn.replace(':', '').upper()
+
+
+def classify_host_paths(client_obj, host_name, wwns=None, iqns=None):
+    """Sorts FC WWNs or iSCSI names into unassigned ones, ones assigned to
+    host_name and ones assigned to another host, with a single host query
+    for all of them.
+    """
+    paths = wwns if wwns is not None else iqns
+    path_new = []
+    path_same_host = []
+    path_other_host = []
+    if not paths:
+        return (path_new, path_same_host, path_other_host)
+
+    path_index = {}
+    for host_obj in client_obj.queryHost(iqns=iqns, wwns=wwns):
+        if wwns is not None:
+            for fc_path in host_obj.fcpaths:
+                if fc_path.wwn:
+                    path_index[normalize_wwn(fc_path.wwn)] = host_obj.name
+        else:
+            for iscsi_path in host_obj.iscsi_paths:
+                if iscsi_path.name:
+                    path_index[iscsi_path.name.lower()] = host_obj.name
+
+    for path in paths:
+        if wwns is not None:
+            host_name_3par = path_index.get(normalize_wwn(path))
+        else:
+            host_name_3par = path_index.get(path.lower())
+        if host_name_3par is None:
+            path_new.append(path)
+        elif host_name == host_name_3par:
+            path_same_host.append(path)
+        else:
+            path_other_host.append(path)
+    return (path_new, path_same_host, path_other_host)
 
 
 def create_host(
@@ -541,22 +586,8 @@ null",
         client_obj.login(storage_system_username, storage_system_password)
 
         # check if wwn is already assigned
-        wwn_new = []
-        wwn_same_host = []
-        wwn_other_host = []
-
-        for wwn in host_fc_wwns:
-            wwn_list = [wwn]
-            host_list = client_obj.queryHost(wwns=wwn_list)
-            for host_obj in host_list:
-                host_name_3par = host_obj.name
-                if host_name == host_name_3par:
-                    wwn_same_host.append(wwn)
-                else:
-                    wwn_other_host.append(wwn)
-
-            if host_list == []:
-                wwn_new.append(wwn)
+        wwn_new, wwn_same_host, wwn_other_host = classify_host_paths(
+            client_obj, host_name, wwns=host_fc_wwns)
 
         if wwn_other_host:
             str_wwn = ", ".join(wwn_other_host)
@@ -613,22 +644,8 @@ null",
         client_obj.login(storage_system_username, storage_system_password)
 
         # check various possibilities
-        wwn_new = []
-        wwn_same_host = []
-        wwn_other_host = []
-
-        for wwn in host_fc_wwns:
-            wwn_list = [wwn]
-            host_list = client_obj.queryHost(wwns=wwn_list)
-            for host_obj in host_list:
-                host_name_3par = host_obj.name
-                if host_name == host_name_3par:
-                    wwn_same_host.append(wwn)
-                else:
-                    wwn_other_host.append(wwn)
-
-            if host_list == []:
-                wwn_new.append(wwn)
+        wwn_new, wwn_same_host, wwn_other_host = classify_host_paths(
+            client_obj, host_name, wwns=host_fc_wwns)
 
         if wwn_other_host:
             str_wwn = ", ".join(wwn_other_host)
@@ -686,22 +703,8 @@ null",
         client_obj.login(storage_system_username, storage_system_password)
 
         # check if iscsi name is already assigned
-        iqn_new = []
-        iqn_same_host = []
-        iqn_other_host = []
-
-        for iqn in host_iscsi_names:
-            iscsi_name = [iqn]
-            host_list = client_obj.queryHost(iqns=iscsi_name)
-            for host_obj in host_list:
-                host_name_3par = host_obj.name
-                if host_name == host_name_3par:
-                    iqn_same_host.append(iqn)
-                else:
-                    iqn_other_host.append(iqn)
-
-            if host_list == []:
-                iqn_new.append(iqn)
+        iqn_new, iqn_same_host, iqn_other_host = classify_host_paths(
+            client_obj, host_name, iqns=host_iscsi_names)
 
         if iqn_other_host:
             str_iqn = ", ".join(iqn_other_host)
@@ -759,22 +762,8 @@ null",
         client_obj.login(storage_system_username, storage_system_password)
 
         # check various possibilities
-        iqn_new = []
-        iqn_same_host = []
-        iqn_other_host = []
-
-        for iqn in host_iscsi_names:
-            iscsi_name = [iqn]
-            host_list = client_obj.queryHost(iqns=iscsi_name)
-            for host_obj in host_list:
-                host_name_3par = host_obj.name
-                if host_name == host_name_3par:
-                    iqn_same_host.append(iqn)
-                else:
-                    iqn_other_host.append(iqn)
-
-            if host_list == []:
-                iqn_new.append(iqn)
+        iqn_new, iqn_same_host, iqn_other_host = classify_host_paths(
+            client_obj, host_name, iqns=host_iscsi_names)
 
         if iqn_other_host:
             str_iqn = ", ".join(iqn_other_host)
@@ -890,10 +879,16 @@ def main():
     chap_secret_hex = module.params["chap_secret_hex"]
     force_path_removal = module.params["force_path_removal"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
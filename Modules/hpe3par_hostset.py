@@ -31,9 +31,16 @@ DOCUMENTATION = r'''
 ---
 author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Create Host Set - Add Hosts to
- Host Set - Remove Hosts from Host Set"
+ Host Set - Remove Hosts from Host Set - Set the exact members of a Host Set"
 module: hpe3par_hostset
 options:
+  batch_size:
+    default: 500
+    description:
+      - "Maximum number of hosts added or removed in one request with state
+       exact."
+    required: false
+    type: int
   domain:
     description:
       - "The domain in which the VV set or host set will be created."
@@ -45,14 +52,17 @@ options:
   setmembers:
     description:
       - "The host to be added to the set.\nRequired with action
-       add_hosts, remove_hosts\n"
+       add_hosts, remove_hosts, exact. With exact, hosts in the set that are
+       not listed are removed and an empty list empties the set\n"
     required: false
   state:
     description:
       - "Whether the specified Host Set should exist or not. State also
-       provides actions to add or remove hosts from host set"
+       provides actions to add or remove hosts from host set. exact creates
+       the host set if needed and makes setmembers its only members, it
+       requires the hpe3par_util module_utils"
     choices:
-      ['present', 'absent', 'add_hosts', 'remove_hosts']
+      ['present', 'absent', 'add_hosts', 'remove_hosts', 'exact']
     required: true
   storage_system_ip:
     description:
@@ -104,6 +114,16 @@ EXAMPLES = r'''
         hostset_name="{{ hostset_name }}"
         setmembers="{{ remove_host_setmembers }}"
 
+    - name: Set the members of Hostset "{{ hostset_name }}"
+      hpe3par_hostset:
+        storage_system_ip="{{ storage_system_ip }}"
+        storage_system_username="{{ storage_system_username }}"
+        storage_system_password="{{ storage_system_password }}"
+        state=exact
+        hostset_name="{{ hostset_name }}"
+        setmembers="{{ add_host_setmembers2 }}"
+        batch_size=100
+
     - name: Delete Hostset "{{ hostset_name }}"
       hpe3par_hostset:
         storage_system_ip="{{ storage_system_ip }}"
@@ -122,6 +142,17 @@ try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from hpe3parclient import exceptions
+except ImportError:
+    exceptions = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Default for batch_size, hosts sent in one add/remove set members request
+MAX_SET_MEMBERS_PER_REQUEST = 500
 
 
 def create_hostset(
@@ -301,11 +332,83 @@ password is null",
     return (True, True, "Removed hosts successfully.", {})
 
 
+def set_hosts(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        hostset_name,
+        domain,
+        setmembers,
+        batch_size=MAX_SET_MEMBERS_PER_REQUEST):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Set hostset members failed. Storage system username or password \
+is null",
+            {})
+    if hostset_name is None:
+        return (
+            False,
+            False,
+            "Set hostset members failed. Hostset name is null",
+            {})
+    if len(hostset_name) < 1 or len(hostset_name) > 27:
+        return (False, False, "Hostset create failed. Hostset name must be atleast 1 character and not more than 27 characters", {})
+    if setmembers is None:
+        return (
+            False,
+            False,
+            "Set hostset members failed. Setmembers is null",
+            {})
+    if batch_size is None or batch_size < 1:
+        return (
+            False,
+            False,
+            "Set hostset members failed. Batch size must be at least 1",
+            {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        try:
+            existing_set_members = client_obj.getHostSet(
+                hostset_name).setmembers or []
+        except exceptions.HTTPNotFound:
+            existing_set_members = None
+        wanted_set_members, new_set_members, old_set_members = (
+            hpe3par_util.diff_set_members(existing_set_members, setmembers))
+        if existing_set_members is None:
+            client_obj.createHostSet(
+                hostset_name, domain, None,
+                new_set_members[:batch_size] or None)
+            new_set_members = new_set_members[batch_size:]
+        elif not new_set_members and not old_set_members:
+            return (
+                True,
+                False,
+                "Host set %s already has the given members. Nothing to \
+do." % hostset_name,
+                {})
+        for chunk in hpe3par_util.get_chunks(old_set_members, batch_size):
+            client_obj.removeHostsFromHostSet(hostset_name, chunk)
+        for chunk in hpe3par_util.get_chunks(new_set_members, batch_size):
+            client_obj.addHostsToHostSet(hostset_name, chunk)
+    except Exception as e:
+        return (False, False, "Set hostset members failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    if existing_set_members is None:
+        return (True, True, "Created host set %s with %s host(s)." %
+                (hostset_name, len(wanted_set_members)), {})
+    return (True, True, "Set hosts successfully. Added %s, removed %s." %
+            (len(new_set_members), len(old_set_members)), {})
+
+
 def main():
     fields = {
         "state": {
             "required": True,
-            "choices": ['present', 'absent', 'add_hosts', 'remove_hosts'],
+            "choices": ['present', 'absent', 'add_hosts', 'remove_hosts',
+                        'exact'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -331,6 +434,10 @@ def main():
         },
         "setmembers": {
             "type": "list"
+        },
+        "batch_size": {
+            "type": "int",
+            "default": MAX_SET_MEMBERS_PER_REQUEST
         }
     }
     module = AnsibleModule(argument_spec=fields)
@@ -344,11 +451,22 @@ def main():
     hostset_name = module.params["hostset_name"]
     domain = module.params["domain"]
     setmembers = module.params["setmembers"]
+    batch_size = module.params["batch_size"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if module.params["state"] == "exact" and hpe3par_util is None:
+        module.fail_json(msg='the hpe3par_util module_utils is required with '
+                             'state exact')
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
@@ -367,6 +485,10 @@ def main():
         return_status, changed, msg, issue_attr_dict = remove_hosts(
             client_obj, storage_system_username, storage_system_password,
             hostset_name, setmembers)
+    elif module.params["state"] == "exact":
+        return_status, changed, msg, issue_attr_dict = set_hosts(
+            client_obj, storage_system_username, storage_system_password,
+            hostset_name, domain, setmembers, batch_size)
 
     if return_status:
         if issue_attr_dict:
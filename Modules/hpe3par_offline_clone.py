@@ -31,7 +31,8 @@ DOCUMENTATION = r'''
 ---
 author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Create Offline Clone - Delete Clone
- - Resync Clone - Stop Cloning"
+ - Resync Clone - Stop Cloning - Create a list of offline clones with a bounded
+ number of copy tasks in flight"
 module: hpe3par_offline_clone
 options:
   base_volume_name:
@@ -41,12 +42,30 @@ options:
     required: false
   clone_name:
     description:
-      - "Specifies the destination volume."
-    required: true
+      - "Specifies the destination volume.\nRequired unless clones is given\n"
+    required: false
+  clones:
+    description:
+      - "List of offline clones to create with action present. Each item is a
+       dictionary with clone_name and base_volume_name, and optionally
+       dest_cpg, skip_zero, save_snapshot and priority. Values missing from an
+       item are taken from the module options. At most max_tasks copies run at
+       once, the next copy starts as soon as one of them ends. The task waits
+       for all copies to end, at most timeout seconds. Per clone results are
+       returned in issue.results. Requires the hpe3par_util module_utils.\n"
+    required: false
+    type: list
   dest_cpg:
     description:
       - "Specifies the destination CPG for an online copy."
     required: false
+  max_tasks:
+    default: 4
+    description:
+      - "Maximum number of copy tasks of the clones list running on the array
+       at once.\n"
+    required: false
+    type: int
   priority:
     choices:
       - HIGH
@@ -78,6 +97,13 @@ options:
       - "Whether the specified Clone should exist or not. State also provides
        actions to resync and stop clone\n"
     required: true
+  timeout:
+    default: 3600
+    description:
+      - "Seconds to wait for the copy with wait, or for all copies of the
+       clones list.\n"
+    required: false
+    type: int
   storage_system_ip:
     description:
       - "The storage system IP address."
@@ -90,6 +116,16 @@ options:
     description:
       - "The storage system user name."
     required: true
+  wait:
+    default: false
+    description:
+      - "Waits until the copy task of the clone has ended with action present,
+       also when the copy was started by an earlier task. The task list of the
+       array is polled at growing intervals, from 1 up to 30 seconds. Fails if
+       the copy fails or does not end within timeout seconds. Requires the
+       hpe3par_util module_utils.\n"
+    required: false
+    type: bool
 
 requirements:
   - "3PAR OS - 3.2.2 MU6, 3.3.1 MU1"
@@ -112,6 +148,21 @@ EXAMPLES = r'''
         dest_cpg="{{ cpg }}"
         priority="MEDIUM"
 
+    - name: Create offline clones of several volumes, 2 copies at a time
+      hpe3par_offline_clone:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: present
+        dest_cpg: "{{ cpg }}"
+        max_tasks: 2
+        clones:
+          - clone_name: db_data_clone
+            base_volume_name: db_data
+          - clone_name: db_logs_clone
+            base_volume_name: db_logs
+            priority: HIGH
+
     - name: Stop Clone {{ clone_name }}
       hpe3par_offline_clone:
         storage_system_ip="{{ storage_system_ip }}"
@@ -134,11 +185,19 @@ EXAMPLES = r'''
 RETURN = r'''
 '''
 
+import time
 from ansible.module_utils.basic import AnsibleModule
 try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Retries of a copy refused because the array is busy
+BUSY_RETRIES = 5
 
 
 def create_offline_clone(
@@ -151,7 +210,9 @@ def create_offline_clone(
         dest_cpg,
         skip_zero,
         save_snapshot,
-        priority):
+        priority,
+        wait=False,
+        timeout=3600):
     if storage_system_username is None or storage_system_password is None:
         return (
             False,
@@ -177,10 +238,6 @@ is null",
         return (False, False, "Clone create failed. Base volume name must be atleast 1 character and not more than 31 characters", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(
-            storage_system_ip,
-            storage_system_username,
-            storage_system_password)
         if not client_obj.onlinePhysicalCopyExists(
                 base_volume_name,
                 clone_name) and not client_obj.offlinePhysicalCopyExists(
@@ -194,27 +251,234 @@ is null",
                     priority)}
             if skip_zero:
                 optional['skipZero'] = skip_zero
-            client_obj.copyVolume(
+            response = client_obj.copyVolume(
                 base_volume_name,
                 clone_name,
                 dest_cpg,
                 optional)
+            changed = True
+            task_id = None
+            if isinstance(response, dict):
+                task_id = response.get('taskid')
         else:
-            return (
-                True,
-                False,
-                "Clone already exists / creation in progress. Nothing to do.",
-                {})
+            changed = False
+            task_id = None
+            if wait:
+                # The offline copy task is named <base>-*<clone>
+                for task in client_obj.getAllTasks():
+                    if (task.name == '%s-*%s' % (base_volume_name,
+                                                 clone_name) and
+                            task.status == hpe3par_util.TASK_ACTIVE):
+                        task_id = task.task_id
+            if task_id is None:
+                return (
+                    True,
+                    False,
+                    "Clone already exists / creation in progress. Nothing to \
+do.",
+                    {})
+        if wait and task_id is not None:
+            status = hpe3par_util.wait_for_tasks(
+                client_obj, [task_id], timeout)[task_id]['status']
+            error = hpe3par_util.get_task_error(task_id, status, timeout,
+                                                'Copy task')
+            if error:
+                return (False, changed, "Offline Clone creation failed | %s" %
+                        error, {'task_id': task_id})
     except Exception as e:
         return (False, False, "Offline Clone creation failed | %s" % (e), {})
     finally:
         client_obj.logout()
+    issue_attr_dict = {}
+    if task_id is not None:
+        issue_attr_dict['task_id'] = task_id
+    if not changed:
+        return (True, False, "Offline Clone %s creation completed." %
+                clone_name, issue_attr_dict)
     return (
         True,
         True,
         "Created Offline Clone %s successfully." %
         clone_name,
-        {})
+        issue_attr_dict)
+
+
+def get_clone_specs(clones, defaults):
+    clone_specs = []
+    for clone in clones:
+        spec = dict(defaults)
+        spec.update(clone)
+        clone_specs.append(spec)
+    return clone_specs
+
+
+def create_offline_clones(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        clones,
+        dest_cpg,
+        skip_zero,
+        save_snapshot,
+        priority,
+        max_tasks=4,
+        timeout=3600):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Offline clone create failed. Storage system username or password \
+is null",
+            {})
+    if not clones:
+        return (False, False, "Offline clone create failed. Clones is null",
+                {})
+    if max_tasks is None or max_tasks < 1:
+        return (False, False, "Offline clone create failed. Max tasks must be \
+at least 1", {})
+    # Validate the whole batch before talking to the array
+    clone_specs = get_clone_specs(clones, {
+        'dest_cpg': dest_cpg,
+        'skip_zero': skip_zero,
+        'save_snapshot': save_snapshot,
+        'priority': priority})
+    clone_names = set()
+    for spec in clone_specs:
+        for key, label in (('clone_name', 'Clone name'),
+                           ('base_volume_name', 'Base volume name')):
+            if not spec.get(key) or len(spec[key]) > 31:
+                return (False, False, "Offline clone create failed. %s must \
+be atleast 1 character and not more than 31 characters" % label, {})
+        if spec['clone_name'] in clone_names:
+            return (False, False, "Offline clone create failed. Clone %s is \
+given more than once" % spec['clone_name'], {})
+        clone_names.add(spec['clone_name'])
+        if spec['priority'] not in ('HIGH', 'MEDIUM', 'LOW'):
+            return (False, False, "Offline clone create failed. Priority of \
+clone %s must be one of HIGH, MEDIUM, LOW" % spec['clone_name'], {})
+
+    results = {}
+
+    def add_result(spec, failed, changed, msg):
+        results[spec['clone_name']] = {
+            'clone_name': spec['clone_name'],
+            'base_volume_name': spec['base_volume_name'],
+            'failed': failed,
+            'changed': changed,
+            'msg': msg}
+
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        # One task list tells which copies are already running
+        active = set(task.name for task in client_obj.getAllTasks()
+                     if task.status == hpe3par_util.TASK_ACTIVE)
+        pending = []
+        for spec in clone_specs:
+            if spec['clone_name'] in active or '%s-*%s' % (
+                    spec['base_volume_name'], spec['clone_name']) in active:
+                add_result(spec, False, False, "Clone already exists / \
+creation in progress. Nothing to do.")
+            else:
+                pending.append(spec)
+
+        in_flight = {}
+        busy_retries = 0
+        poll_interval = hpe3par_util.MIN_TASK_POLL_INTERVAL
+        deadline = time.time() + timeout
+        while pending or in_flight:
+            if time.time() >= deadline:
+                for task_id, spec in in_flight.items():
+                    add_result(spec, True, True, hpe3par_util.get_task_error(
+                        task_id, hpe3par_util.TASK_ACTIVE, timeout,
+                        'Copy task'))
+                for spec in pending:
+                    add_result(spec, True, False, "Copy not started within \
+%s seconds" % timeout)
+                break
+            while pending and len(in_flight) < max_tasks:
+                spec = pending[0]
+                optional = {
+                    'online': False,
+                    'saveSnapshot': spec['save_snapshot'],
+                    'priority': getattr(
+                        client.HPE3ParClient.TaskPriority, spec['priority'])}
+                if spec['skip_zero']:
+                    optional['skipZero'] = spec['skip_zero']
+                try:
+                    response = client_obj.copyVolume(
+                        spec['base_volume_name'], spec['clone_name'],
+                        spec['dest_cpg'], optional)
+                except Exception as e:
+                    # 503 means the array is busy, retry after the next poll
+                    if (getattr(e, 'http_status', None) == 503 and
+                            busy_retries < BUSY_RETRIES):
+                        busy_retries += 1
+                        break
+                    pending.pop(0)
+                    add_result(spec, True, False, str(e))
+                    continue
+                busy_retries = 0
+                pending.pop(0)
+                task_id = None
+                if isinstance(response, dict):
+                    task_id = response.get('taskid')
+                if task_id is None:
+                    add_result(spec, False, True,
+                               "Created Offline Clone %s successfully." %
+                               spec['clone_name'])
+                else:
+                    in_flight[task_id] = spec
+            if not in_flight and not pending:
+                break
+            time.sleep(poll_interval)
+            # One task list for all copies in flight
+            tasks = hpe3par_util.get_tasks(client_obj, in_flight)
+            ended = 0
+            for task_id in list(in_flight):
+                task = tasks[task_id]
+                status = (task.status if task is not None
+                          else hpe3par_util.TASK_NOT_FOUND)
+                if status == hpe3par_util.TASK_ACTIVE:
+                    continue
+                spec = in_flight.pop(task_id)
+                ended += 1
+                error = hpe3par_util.get_task_error(task_id, status, timeout,
+                                                    'Copy task')
+                if error:
+                    add_result(spec, True, True, error)
+                else:
+                    add_result(spec, False, True,
+                               "Created Offline Clone %s successfully." %
+                               spec['clone_name'])
+            if ended:
+                poll_interval = hpe3par_util.MIN_TASK_POLL_INTERVAL
+            else:
+                poll_interval = min(poll_interval * 2,
+                                    hpe3par_util.MAX_TASK_POLL_INTERVAL)
+    except Exception as e:
+        return (False, False, "Offline Clone creation failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+
+    results = [results[spec['clone_name']] for spec in clone_specs]
+    failed = [result for result in results if result['failed']]
+    changed = any(result['changed'] for result in results)
+    if failed:
+        return (
+            False,
+            changed,
+            "Offline clone creation failed for %s of %s clone(s) | %s" %
+            (len(failed), len(results),
+             "; ".join("%s: %s" % (result['clone_name'], result['msg'])
+                       for result in failed)),
+            {'results': results})
+    return (
+        True,
+        changed,
+        "Offline clone creation completed for %s clone(s), %s created." %
+        (len(results),
+         len([result for result in results if result['changed']])),
+        {'results': results})
 
 
 def resync_clone(
@@ -284,10 +548,6 @@ is null",
         return (False, False, "Clone create failed. Base volume name must be atleast 1 character and not more than 31 characters", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(
-            storage_system_ip,
-            storage_system_username,
-            storage_system_password)
         if client_obj.volumeExists(
             clone_name) and client_obj.offlinePhysicalCopyExists(
                 base_volume_name, clone_name):
@@ -338,10 +598,6 @@ is null",
         return (False, False, "Clone create failed. Base volume name must be atleast 1 character and not more than 31 characters", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(
-            storage_system_ip,
-            storage_system_username,
-            storage_system_password)
         if client_obj.volumeExists(
                 clone_name) and not client_obj.onlinePhysicalCopyExists(
                 base_volume_name,
@@ -389,9 +645,28 @@ def main():
             "no_log": True
         },
         "clone_name": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
+        "clones": {
+            "required": False,
+            "type": "list"
+        },
+        "max_tasks": {
+            "required": False,
+            "type": "int",
+            "default": 4
+        },
+        "wait": {
+            "required": False,
+            "type": "bool",
+            "default": False
+        },
+        "timeout": {
+            "required": False,
+            "type": "int",
+            "default": 3600
+        },
         "base_volume_name": {
             "required": False,
             "type": "str"
@@ -430,18 +705,41 @@ def main():
     save_snapshot = module.params["save_snapshot"]
     priority = module.params["priority"]
     skip_zero = module.params["skip_zero"]
+    clones = module.params["clones"]
+    max_tasks = module.params["max_tasks"]
+    wait = module.params["wait"]
+    timeout = module.params["timeout"]
+
+    if clones is not None and module.params["state"] != 'present':
+        module.fail_json(msg='clones is only supported with state present')
+    if clones is None and clone_name is None:
+        module.fail_json(msg='one of clone_name or clones is required')
+    if (clones is not None or wait) and hpe3par_util is None:
+        module.fail_json(msg='the hpe3par_util module_utils is required with '
+                             'clones or wait')
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
-    if module.params["state"] == "present":
+    if module.params["state"] == "present" and clones is not None:
+        return_status, changed, msg, issue_attr_dict = create_offline_clones(
+            client_obj, storage_system_username, storage_system_password,
+            clones, dest_cpg, skip_zero, save_snapshot, priority, max_tasks,
+            timeout)
+    elif module.params["state"] == "present":
         return_status, changed, msg, issue_attr_dict = create_offline_clone(
             client_obj, storage_system_ip, storage_system_username,
             storage_system_password, clone_name, base_volume_name, dest_cpg,
-            skip_zero, save_snapshot, priority)
+            skip_zero, save_snapshot, priority, wait, timeout)
     elif module.params["state"] == "absent":
         return_status, changed, msg, issue_attr_dict = delete_clone(
             client_obj, storage_system_ip, storage_system_username,
@@ -459,6 +757,8 @@ def main():
             module.exit_json(changed=changed, msg=msg, issue=issue_attr_dict)
         else:
             module.exit_json(changed=changed, msg=msg)
+    elif clones is not None:
+        module.fail_json(msg=msg, issue=issue_attr_dict)
     else:
         module.fail_json(msg=msg)
 
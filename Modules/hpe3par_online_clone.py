@@ -71,11 +71,27 @@ options:
       - "Enables (true) or disables (false) whether the online copy is a TDVV."
     required: false
     type: bool
+  timeout:
+    default: 3600
+    description:
+      - "Seconds to wait for the copy with wait."
+    required: false
+    type: int
   tpvv:
     description:
       - "Enables (true) or disables (false) whether the online copy is a TPVV."
     required: false
     type: bool
+  wait:
+    default: false
+    description:
+      - "Waits until the copy task of the clone has ended with action present,
+       also when the copy was started by an earlier task. The task list of the
+       array is polled at growing intervals, from 1 up to 30 seconds. Fails if
+       the copy fails or does not end within timeout seconds. Requires the
+       hpe3par_util module_utils.\n"
+    required: false
+    type: bool
   storage_system_ip:
     description:
       - "The storage system IP address."
@@ -113,9 +129,18 @@ EXAMPLES = r'''
         compression=False
         snap_cpg="{{ cpg }}"
 
-    - name: sleep for 100 seconds and continue with play
-      wait_for:
-        timeout=100
+    - name: Create Clone clone_volume_ansible and wait for the copy to end
+      hpe3par_online_clone:
+        storage_system_ip="{{ storage_system_ip }}"
+        storage_system_username="{{ storage_system_username }}"
+        storage_system_password="{{ storage_system_password }}"
+        state=present
+        clone_name="clone_volume_ansible"
+        base_volume_name="{{ volume_name }}"
+        dest_cpg="{{ cpg }}"
+        snap_cpg="{{ cpg }}"
+        wait=true
+        timeout=600
 
     - name: Delete clone "clone_volume_ansible"
       hpe3par_online_clone:
@@ -135,6 +160,10 @@ try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
 
 
 def create_online_clone(
@@ -147,7 +176,9 @@ def create_online_clone(
         tpvv,
         reduce,
         snap_cpg,
-        compression):
+        compression,
+        wait=False,
+        timeout=3600):
     if storage_system_username is None or storage_system_password is None:
         return (
             False,
@@ -188,27 +219,55 @@ is null",
                 optional['tdvv'] = reduce if reduce is not None else False
             if compression:
                 optional['compression'] = compression
-            client_obj.copyVolume(
+            response = client_obj.copyVolume(
                 base_volume_name,
                 clone_name,
                 dest_cpg,
                 optional)
+            changed = True
+            task_id = None
+            if isinstance(response, dict):
+                task_id = response.get('taskid')
         else:
-            return (
-                True,
-                False,
-                "Clone already exists / creation in progress. Nothing to do.",
-                {})
+            changed = False
+            task_id = None
+            if wait:
+                # The online copy task is named after the clone
+                for task in client_obj.getAllTasks():
+                    if (task.name == clone_name and
+                            task.status == hpe3par_util.TASK_ACTIVE):
+                        task_id = task.task_id
+            if task_id is None:
+                return (
+                    True,
+                    False,
+                    "Clone already exists / creation in progress. Nothing to \
+do.",
+                    {})
+        if wait and task_id is not None:
+            status = hpe3par_util.wait_for_tasks(
+                client_obj, [task_id], timeout)[task_id]['status']
+            error = hpe3par_util.get_task_error(task_id, status, timeout,
+                                                'Copy task')
+            if error:
+                return (False, changed, "Online Clone creation failed | %s" %
+                        error, {'task_id': task_id})
     except Exception as e:
         return (False, False, "Online Clone creation failed | %s" % (e), {})
     finally:
         client_obj.logout()
+    issue_attr_dict = {}
+    if task_id is not None:
+        issue_attr_dict['task_id'] = task_id
+    if not changed:
+        return (True, False, "Online Clone %s creation completed." %
+                clone_name, issue_attr_dict)
     return (
         True,
         True,
         "Created Online Clone %s successfully." %
         clone_name,
-        {})
+        issue_attr_dict)
 
 
 def resync_clone(
@@ -278,10 +337,6 @@ is null",
         return (False, False, "Clone create failed. Base volume name must be atleast 1 character and not more than 31 characters", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(
-            storage_system_ip,
-            storage_system_username,
-            storage_system_password)
         if client_obj.volumeExists(
                 clone_name) and not client_obj.onlinePhysicalCopyExists(
                 base_volume_name,
@@ -355,6 +410,16 @@ def main():
         "compression": {
             "required": False,
             "type": "bool",
+        },
+        "wait": {
+            "required": False,
+            "type": "bool",
+            "default": False
+        },
+        "timeout": {
+            "required": False,
+            "type": "int",
+            "default": 3600
         }
     }
 
@@ -373,18 +438,30 @@ def main():
     reduce = module.params["reduce"]
     snap_cpg = module.params["snap_cpg"]
     compression = module.params["compression"]
+    wait = module.params["wait"]
+    timeout = module.params["timeout"]
+
+    if wait and hpe3par_util is None:
+        module.fail_json(msg='the hpe3par_util module_utils is required with '
+                             'wait')
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
         return_status, changed, msg, issue_attr_dict = create_online_clone(
             client_obj, storage_system_username, storage_system_password,
             base_volume_name, clone_name, dest_cpg, tpvv, reduce, snap_cpg,
-            compression)
+            compression, wait, timeout)
     elif module.params["state"] == "absent":
         return_status, changed, msg, issue_attr_dict = delete_clone(
             client_obj, storage_system_ip, storage_system_username,
@@ -34,7 +34,7 @@ description: "On HPE Alletra 9000 and Primera and 3PAR - Create Remote Copy Grou
  Copy Group -Synchronize Remote Copy Group - Delete Remote Copy Group
  - Admit Remote Copy Link - Dismiss Remote Copy Link - Start Remote Copy Group
  - Stop Remote Copy Group - Admit Remote Copy Target - Dismiss Remote Copy Target
- - Start Remote Copy Service - Remote Copy Status"
+ - Start Remote Copy Service - Remote Copy Status - Wait for Remote Copy Sync"
 module: hpe3par_remote_copy
 options:
   remote_copy_group_name:
@@ -42,7 +42,31 @@ options:
       - "Specifies the name of the Remote Copy group to create.\n
        Used with state[s] - present, absent, modify, add_volume,\n
        remove_volume, start, stop, synchronize, admit_target,\n
-       dismiss_target, remote_copy_status"
+       dismiss_target, remote_copy_status, wait_for_sync"
+  remote_copy_group_names:
+    description:
+      - "List of Remote Copy group names to wait for, instead of
+       remote_copy_group_name.\n
+       Used with state[s] - wait_for_sync"
+    type: list
+  timeout:
+    default: 3600
+    description:
+      - "Seconds to wait for the Remote Copy groups to be synced.\n
+       Used with state[s] - wait_for_sync"
+    type: int
+  volumes:
+    description:
+      - "List of volumes to admit to the Remote Copy group instead of
+       volume_name. An item is a volume name or a dictionary with
+       volume_name and either sec_volume_name or admit_volume_targets.
+       Without admit_volume_targets in the item, the targets of
+       admit_volume_targets are used with sec_volume_name, or the volume
+       name, as secondary volume. The group volumes are read once and only
+       the missing volumes are admitted. Admitted volumes are synchronized
+       together when the group is started.\n
+       Used with state[s] - add_volume"
+    type: list
   domain:
     description:
       - "Specifies the domain in which to create the Remote Copy group.\n
@@ -221,11 +245,17 @@ options:
       - dismiss_target
       - start_rcopy
       - remote_copy_status
+      - wait_for_sync
     description:
       - "Whether the specified Remote Copy Group should exist or not. State
        also provides actions to modify Remote copy Group ,add/remove volumes,
        start/stop/synchronize remote copy group, Add/remove remote
-       copy link, start remote copy services, admit/dismiss target.\n"
+       copy link, start remote copy services, admit/dismiss target.\n
+       wait_for_sync waits until all targets of the groups are started and
+       all their volumes are synced, polling the status of all groups with
+       one call at intervals growing from 2 up to 60 seconds while no group
+       progresses. The progress and estimated remaining seconds (eta) of
+       each group are returned in output.results.\n"
     required: true
   storage_system_ip:
     description:
@@ -377,6 +407,21 @@ EXAMPLES = r'''
         targetVolumeName: target_volume_2
       target_mode: periodic
 
+  - name: Admit volumes to Remote Copy Group
+    hpe3par_remote_copy:
+      storage_system_ip: 10.10.10.1
+      storage_system_password: password
+      storage_system_username: username
+      state: add_volume
+      remote_copy_group_name: test_rcg
+      admit_volume_targets:
+      - target_name: target_array_name
+      volumes:
+      - app_volume_1
+      - volume_name: app_volume_2
+        sec_volume_name: app_volume_2_dr
+      volume_auto_creation: true
+
   - name: remote copy group status
     hpe3par_remote_copy:
       storage_system_ip: 10.10.10.1
@@ -389,6 +434,17 @@ EXAMPLES = r'''
   - debug:
       msg: "{{ result.output.remote_copy_sync_status}}"
 
+  - name: wait until the remote copy groups are synced
+    hpe3par_remote_copy:
+      storage_system_ip: 10.10.10.1
+      storage_system_password: password
+      storage_system_username: username
+      state: wait_for_sync
+      remote_copy_group_names:
+      - test_rcg
+      - test_rcg_2
+      timeout: 7200
+
 
   - name: dismiss Remote Copy target
     hpe3par_remote_copy:
@@ -651,11 +707,29 @@ EXAMPLES = r'''
 RETURN = r'''
 '''
 
+import time
 from ansible.module_utils.basic import AnsibleModule
 try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from hpe3parclient import exceptions
+except ImportError:
+    exceptions = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Target state started and volume sync status synced, as checked by
+# remoteCopyGroupStatusCheck
+TARGET_STARTED = 3
+VOLUME_SYNCED = 3
+# Seconds between two polls of wait_for_sync, doubled while no group
+# progresses
+MIN_POLL_INTERVAL = 2
+MAX_POLL_INTERVAL = 60
 
 def create_remote_copy_group(
             client_obj,
@@ -880,6 +954,113 @@ def add_volume_to_remote_copy_group(
         client_obj.logout()
     return (True, True, "Volume %s added to Remote Copy Group %s successfully." % (volume_name, remote_copy_group_name), {})
 
+def get_remote_copy_group_or_none(client_obj, remote_copy_group_name):
+    """Fetches the group with its volumes in one call, returns None if it
+    does not exist.
+    """
+    try:
+        return client_obj.getRemoteCopyGroup(remote_copy_group_name)
+    except exceptions.HTTPNotFound:
+        return None
+
+def get_volume_admit_targets(volume, admit_volume_targets):
+    """Returns the WSAPI targets of one item of volumes. Without
+    admit_volume_targets in the item, the module targets are used with the
+    sec_volume_name of the item, or the volume name, as secondary volume.
+    """
+    targets = volume.get('admit_volume_targets')
+    if targets is None:
+        targets = [dict(target, sec_volume_name=volume.get('sec_volume_name', volume['volume_name']))
+                   for target in admit_volume_targets or []]
+    if not targets:
+        raise ValueError("Admit volume targets are null")
+    targets_transformed = []
+    for target in targets:
+        if target.get('target_name') is None:
+            raise ValueError("Target name is null")
+        if not target.get('sec_volume_name') or len(target['sec_volume_name']) > 31:
+            raise ValueError("Secondary volume name must be atleast 1 character and not more than 31 characters")
+        targets_transformed.append({'targetName': target['target_name'],
+                                    'secVolumeName': target['sec_volume_name']})
+    return targets_transformed
+
+def add_volumes_to_remote_copy_group(
+            client_obj,
+            storage_system_username,
+            storage_system_password,
+            remote_copy_group_name,
+            volumes,
+            admit_volume_targets,
+            volume_auto_creation,
+            skip_initial_sync,
+            different_secondary_wwn
+            ):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Add volume to Remote Copy Group failed. Storage system username or password is null",
+            {})
+    if remote_copy_group_name is None:
+        return (False, False, "Add volume to Remote Copy Group failed. Remote Copy Group name is null", {})
+    if len(remote_copy_group_name) < 1 or len(remote_copy_group_name) > 31:
+        return (False, False, "Add volume to Remote Copy Group failed. Remote Copy Group name must be atleast 1 character and not more than 31 characters", {})
+    if not volumes:
+        return (False, False, "Add volume to Remote Copy Group failed. Volumes is null", {})
+    if not volume_auto_creation and different_secondary_wwn:
+        return (False, False, "Add volume to Remote Copy Group failed. differentSecondaryWWN cannot be true if volumeAutoCreation is false", {})
+    volumes = [volume if isinstance(volume, dict) else {'volume_name': volume} for volume in volumes]
+    volume_targets = []
+    for volume in volumes:
+        volume_name = volume.get('volume_name')
+        if not volume_name or len(volume_name) > 31:
+            return (False, False, "Add volume to Remote Copy Group failed. Volume name must be atleast 1 character and not more than 31 characters", {})
+        try:
+            volume_targets.append(get_volume_admit_targets(volume, admit_volume_targets))
+        except ValueError as e:
+            return (False, False, "Add volume to Remote Copy Group failed. %s for volume %s" % (e, volume_name), {})
+    results = []
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        source_name = client_obj.getStorageSystemInfo()['name']
+        if any(target['targetName'] == source_name for targets in volume_targets for target in targets):
+            return (False, False, "Source and target cannot be same. Source and target both are %s" % source_name, {})
+        # One call tells whether the group exists and which volumes it has
+        group = get_remote_copy_group_or_none(client_obj, remote_copy_group_name)
+        if group is None:
+            return (False, False, "Remote Copy Group not present", {})
+        members = set(volume.localVolumeName for volume in group.volumes)
+        optional = {
+            'volumeAutoCreation': volume_auto_creation,
+            'skipInitialSync': skip_initial_sync,
+            'differentSecondaryWWN': different_secondary_wwn
+        }
+        for volume, targets in zip(volumes, volume_targets):
+            volume_name = volume['volume_name']
+            if volume_name in members:
+                results.append({'volume_name': volume_name, 'changed': False, 'failed': False,
+                                'msg': "Volume %s already present in Remote Copy Group %s" % (volume_name, remote_copy_group_name)})
+                continue
+            try:
+                client_obj.addVolumeToRemoteCopyGroup(remote_copy_group_name, volume_name, targets, optional)
+                results.append({'volume_name': volume_name, 'changed': True, 'failed': False,
+                                'msg': "Volume %s added to Remote Copy Group %s successfully." % (volume_name, remote_copy_group_name)})
+            except Exception as e:
+                results.append({'volume_name': volume_name, 'changed': False, 'failed': True, 'msg': str(e)})
+            members.add(volume_name)
+    except Exception as e:
+        return (False, False, "Remote Copy Group modify failed | %s" % (e), {})
+    finally:
+        client_obj.logout()
+    failed = [result for result in results if result['failed']]
+    changed = [result for result in results if result['changed']]
+    if failed:
+        return (False, bool(changed), "Add volume to Remote Copy Group failed for %s of %s volume(s) | %s"
+                % (len(failed), len(results), "; ".join("%s: %s" % (result['volume_name'], result['msg']) for result in failed)),
+                {'results': results})
+    return (True, bool(changed), "Add volume to Remote Copy Group completed for %s volume(s), %s added."
+            % (len(results), len(changed)), {'results': results})
+
 def remove_volume_from_remote_copy_group(
             client_obj,
             storage_system_username,
@@ -1235,7 +1416,6 @@ def admit_remote_copy_target(
         client_obj.login(storage_system_username, storage_system_password)
         if target_name == client_obj.getStorageSystemInfo()['name']:
             return (False, False, "Source and target cannot be same. Source and target both are %s" % target_name, {})
-        client_obj.setSSHOptions(storage_system_ip, storage_system_username, storage_system_password)
         #checking existance of remote_copy_group_name
         if not client_obj.remoteCopyGroupExists(remote_copy_group_name):
             return (False, False, "Remote Copy Group is not present", {})
@@ -1244,6 +1424,7 @@ def admit_remote_copy_target(
         #If it is already present then target add to remote copy group fails
         if client_obj.targetInRemoteCopyGroupExists(target_name, remote_copy_group_name):
             return (True, False, "Admit remote copy target failed.Target is already present", {})
+        client_obj.setSSHOptions(storage_system_ip, storage_system_username, storage_system_password)
         optional = { 'volumePairs': local_remote_volume_pair_list }
         results=client_obj.admitRemoteCopyTarget(target_name, target_mode, remote_copy_group_name, optional)
     except Exception as e:
@@ -1277,8 +1458,6 @@ def dismiss_remote_copy_target(
         client_obj.login(storage_system_username, storage_system_password)
         if target_name == client_obj.getStorageSystemInfo()['name']:
             return (False, False, "Source and target cannot be same. Source and target both are %s" % target_name, {})
-        client_obj.setSSHOptions(storage_system_ip, storage_system_username, storage_system_password)
-
         #checking existance of remote_copy_group_name
         if not client_obj.remoteCopyGroupExists(remote_copy_group_name):
             return (False, False, "Remote Copy Group %s is not present" % remote_copy_group_name, {})
@@ -1289,6 +1468,7 @@ def dismiss_remote_copy_target(
             return (True, False, "Dismiss remote copy target failed. Target %s is already not present in remote copy group %s"\
                     % (target_name, remote_copy_group_name), {})
 
+        client_obj.setSSHOptions(storage_system_ip, storage_system_username, storage_system_password)
         results=client_obj.dismissRemoteCopyTarget(target_name, remote_copy_group_name)
     except Exception as e:
         return (False, False, "Dismiss remote copy target failed| %s" % (e), {})
@@ -1315,8 +1495,6 @@ def remote_copy_group_status(
         return (False, False, "Remote copy group status failed. Remote copy group name is null", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(storage_system_ip, storage_system_username, storage_system_password)
-
         #checking existance of remote_copy_group_name
         if not client_obj.remoteCopyGroupExists(remote_copy_group_name):
             return (True, False, "Remote Copy Group %s is not present" % remote_copy_group_name, {})
@@ -1331,12 +1509,100 @@ def remote_copy_group_status(
         client_obj.logout()
     return (True, False, "Remote copy group %s status is complete" % (remote_copy_group_name), {"remote_copy_sync_status":remotecopy_status})
 
+def get_sync_progress(group):
+    """Returns the number of synced volume copies of a Remote Copy group and
+    the total number of volume copies, one per volume and target. A group
+    whose targets are not all started has no synced copy.
+    """
+    copies = [remote_volume.syncStatus for volume in group.volumes
+              for remote_volume in volume.remoteVolumes]
+    if any(target.state != TARGET_STARTED for target in group.targets):
+        return 0, len(copies)
+    return copies.count(VOLUME_SYNCED), len(copies)
+
+def wait_for_remote_copy_sync(
+            client_obj,
+            storage_system_username,
+            storage_system_password,
+            remote_copy_group_names,
+            timeout
+            ):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Wait for remote copy sync failed. Storage system username or password is null",
+            {})
+    if not remote_copy_group_names:
+        return (False, False, "Wait for remote copy sync failed. Remote copy group name is null", {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        start = time.time()
+        deadline = start + timeout
+        poll_interval = MIN_POLL_INTERVAL
+        first_progress = {}
+        last_progress = {}
+        while True:
+            # One call reports the sync status of every group
+            groups = dict((group.name, group)
+                          for group in client_obj.getRemoteCopyGroups())
+            now = time.time()
+            results = []
+            missing = []
+            not_synced = []
+            progressed = False
+            for name in remote_copy_group_names:
+                if name not in groups:
+                    missing.append(name)
+                    continue
+                synced, total = get_sync_progress(groups[name])
+                progress = 100.0 * synced / total if total else 100.0
+                first_progress.setdefault(name, (now, progress))
+                if last_progress.get(name, progress) != progress:
+                    progressed = True
+                last_progress[name] = progress
+                eta = None
+                if synced == total:
+                    eta = 0
+                else:
+                    not_synced.append(name)
+                    first_time, first = first_progress[name]
+                    if progress > first:
+                        # Extrapolated from the progress seen by this task
+                        eta = int((now - first_time) * (100.0 - progress) /
+                                  (progress - first))
+                results.append({'remote_copy_group_name': name,
+                                'synced': synced == total,
+                                'synced_volumes': synced,
+                                'volumes': total,
+                                'progress': round(progress, 1),
+                                'eta': eta})
+            if missing:
+                return (False, False, "Wait for remote copy sync failed. Remote copy group(s) %s not present"
+                        % ", ".join(missing), {'results': results})
+            if not not_synced:
+                break
+            if now >= deadline:
+                return (False, False, "Wait for remote copy sync failed. Remote copy group(s) %s not synced after %s seconds"
+                        % (", ".join(not_synced), timeout), {'results': results})
+            if progressed:
+                poll_interval = MIN_POLL_INTERVAL
+            time.sleep(min(poll_interval, deadline - now))
+            if not progressed:
+                poll_interval = min(poll_interval * 2, MAX_POLL_INTERVAL)
+    except Exception as e:
+        return (False, False, "Wait for remote copy sync failed | %s" % (e), {})
+    finally:
+        client_obj.logout()
+    return (True, False, "Remote copy group(s) %s synced in %s seconds"
+            % (", ".join(remote_copy_group_names), int(time.time() - start)), {'results': results})
+
 def main():
     fields = {
         "state": {
             "required": True,
             "choices": ['present', 'absent', 'modify', 'add_volume', 'remove_volume', 'start', 'stop', 'synchronize', 'recover', 'admit_link', 
-            'dismiss_link','admit_target','dismiss_target', 'start_rcopy', 'remote_copy_status'],
+            'dismiss_link','admit_target','dismiss_target', 'start_rcopy', 'remote_copy_status', 'wait_for_sync'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -1467,6 +1733,16 @@ def main():
         "local_remote_volume_pair_list": {
             "type": "list",
             "default": []
+        },
+        "remote_copy_group_names": {
+            "type": "list"
+        },
+        "volumes": {
+            "type": "list"
+        },
+        "timeout": {
+            "type": "int",
+            "default": 3600
         }
     }
     module = AnsibleModule(argument_spec=fields)
@@ -1509,11 +1785,20 @@ def main():
     local_groups_direction = module.params["local_groups_direction"]
     local_remote_volume_pair_list = module.params["local_remote_volume_pair_list"]
     target_mode = module.params["target_mode"]
-
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    remote_copy_group_names = module.params["remote_copy_group_names"]
+    volumes = module.params["volumes"]
+    timeout = module.params["timeout"]
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
@@ -1547,6 +1832,18 @@ def main():
             unset_user_cpg,
             unset_snap_cpg
         )
+    elif module.params["state"] == "add_volume" and volumes is not None:
+        return_status, changed, msg, issue_attr_dict = add_volumes_to_remote_copy_group(
+            client_obj,
+            storage_system_username,
+            storage_system_password,
+            remote_copy_group_name,
+            volumes,
+            admit_volume_targets,
+            volume_auto_creation,
+            skip_initial_sync,
+            different_secondary_wwn
+        )
     elif module.params["state"] == "add_volume":
         return_status, changed, msg, issue_attr_dict = add_volume_to_remote_copy_group(
             client_obj,
@@ -1670,11 +1967,23 @@ def main():
             storage_system_ip,
             remote_copy_group_name
         )
+    elif module.params["state"] == "wait_for_sync":
+        if remote_copy_group_names is None and remote_copy_group_name is not None:
+            remote_copy_group_names = [remote_copy_group_name]
+        return_status, changed, msg, issue_attr_dict = wait_for_remote_copy_sync(
+            client_obj,
+            storage_system_username,
+            storage_system_password,
+            remote_copy_group_names,
+            timeout
+        )
     if return_status:
         if issue_attr_dict:
             module.exit_json(changed=changed, msg=msg, output=issue_attr_dict)
         else:
             module.exit_json(changed=changed, msg=msg)
+    elif issue_attr_dict:
+        module.fail_json(msg=msg, output=issue_attr_dict)
     else:
         module.fail_json(msg=msg)
 
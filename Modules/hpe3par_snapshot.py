@@ -30,7 +30,8 @@ DOCUMENTATION = r'''
 author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Create Snapshot - Delete Snapshot
  - Modify Snapshot -  Create Schedule - Modify Schedule - Suspend Schedule
- - Resume Schedule - Delete Schedule"
+ - Resume Schedule - Delete Schedule - Create consistent snapshots of a
+ volume set or list of volumes - Manage a list of schedules"
 module: hpe3par_snapshot
 options:
   allow_remote_copy_parent:
@@ -45,6 +46,13 @@ options:
     description:
       - "Specifies the source volume.\nRequired with action present\n"
     required: false
+  base_volume_names:
+    description:
+      - "Source volumes snapshotted together with action consistent_snapshot.
+       \nEither this or volume_set_name is required with action
+       consistent_snapshot\n"
+    required: false
+    type: list
   expiration_hours:
     default: 0
     description:
@@ -114,8 +122,24 @@ options:
     type: bool
   snapshot_name:
     description:
-      - "Specifies a snapshot volume name."
+      - "Specifies a snapshot volume name.\nWith action consistent_snapshot, the
+       naming template of the snapshots. @vvname@ is replaced with the source
+       volume name, @count@ with a number counting from 0 and @y@, @m@, @d@,
+       @H@, @M@, @S@ with the creation time. Defaults to
+       @vvname@.@y@@m@@d@@H@@M@@S@\n"
     required: true
+  schedules:
+    description:
+      - "Desired snapshot schedules, managed with action schedules. Each item
+       takes schedule_name, base_volume_name, task_freq, read_only,
+       expiration_time, expiration_unit, retention_time, retention_unit and a
+       state of present, suspended or absent (default present). The
+       schedules of the array are listed once and only the schedules that
+       differ are created, modified, suspended, resumed or deleted, all over
+       one SSH connection. A schedule whose snapshot command differs is
+       removed and created again.\n"
+    required: false
+    type: list
   schedule_name:
     description:
       - "Name of the schedule."
@@ -140,9 +164,14 @@ options:
       - resume_schedule
       - restore_offline
       - restore_online
+      - consistent_snapshot
+      - schedules
     description:
       - "Whether the specified Snapshot should exist or not. State also
-       provides actions to modify and restore snapshots.\n"
+       provides actions to modify and restore snapshots.\nconsistent_snapshot
+       snapshots all volumes of volume_set_name or base_volume_names in one
+       operation on the array, so all snapshots share the same point in
+       time.\n"
     required: true
   storage_system_ip:
     description:
@@ -156,6 +185,10 @@ options:
     description:
       - "The storage system user name."
     required: true
+  volume_set_name:
+    description:
+      - "Volume set snapshotted with action consistent_snapshot."
+    required: false
 requirements:
   - "3PAR OS - 3.2.2 MU6, 3.3.1 MU1"
   - "Ansible - 2.4"
@@ -229,17 +262,62 @@ EXAMPLES = r'''
         storage_system_password: password
         state: delete_schedule
         schedule_name: my_ansible_sc
+    - name: Snapshot all volumes of volume set db_set at one point in time
+      hpe3par_snapshot:
+        storage_system_ip: 10.10.10.1
+        storage_system_username: username
+        storage_system_password: password
+        state: consistent_snapshot
+        volume_set_name: db_set
+        snapshot_name: "@vvname@.nightly.@m@@d@"
+        read_only: true
+        expiration_time: 7
+        expiration_unit: Days
+    - name: Snapshot volumes db_data and db_logs at one point in time
+      hpe3par_snapshot:
+        storage_system_ip: 10.10.10.1
+        storage_system_username: username
+        storage_system_password: password
+        state: consistent_snapshot
+        base_volume_names:
+          - db_data
+          - db_logs
+    - name: Manage snapshot schedules of several volumes in one task
+      hpe3par_snapshot:
+        storage_system_ip: 10.10.10.1
+        storage_system_username: username
+        storage_system_password: password
+        state: schedules
+        schedules:
+          - schedule_name: db_data_hourly
+            base_volume_name: db_data
+            task_freq: hourly
+            expiration_time: 2
+            expiration_unit: Days
+          - schedule_name: db_logs_daily
+            base_volume_name: db_logs
+            task_freq: "0 2 * * *"
+            read_only: true
+            state: suspended
+          - schedule_name: old_schedule
+            state: absent
 '''
 
 RETURN = r'''
 '''
 
 
+import re
+import time
 from ansible.module_utils.basic import AnsibleModule
 try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
 
 
 def convert_to_hours(time, unit):
@@ -251,6 +329,28 @@ def convert_to_hours(time, unit):
     return hours
 
 
+# Default naming template of consistent_snapshot
+SNAPSHOT_NAME_TEMPLATE = '@vvname@.@y@@m@@d@@H@@M@@S@'
+SNAPSHOT_TIME_PATTERNS = (
+    ('@y@', '%y'), ('@m@', '%m'), ('@d@', '%d'),
+    ('@H@', '%H'), ('@M@', '%M'), ('@S@', '%S'))
+# CLI error lines start with "Error:" or "Invalid ...", names echoed by
+# creategroupsv such as error_snap or invalid_db_snap do not match
+CLI_ERROR_LINE = re.compile(r'^(error|invalid)\b', re.IGNORECASE)
+
+
+def get_snapshot_names(template, base_volume_names, now=None):
+    """Expands the VV name patterns of template for each volume, the same
+    way the array expands them for a volume set snapshot.
+    """
+    now = time.localtime() if now is None else now
+    for pattern, time_format in SNAPSHOT_TIME_PATTERNS:
+        template = template.replace(pattern, time.strftime(time_format, now))
+    return [template.replace('@vvname@', volume_name).replace(
+        '@count@', str(count))
+        for count, volume_name in enumerate(base_volume_names)]
+
+
 def create_snapshot(
         client_obj,
         storage_system_username,
@@ -480,6 +580,23 @@ character and not more than 31 characters", {})
         {})
 
 
+def get_schedule_command(base_volume_name, read_only, expiration_hours,
+                         retention_hours):
+    cmd = ["createsv"]
+    if read_only:
+        cmd.append("-ro")
+    if expiration_hours:
+        cmd.append("-exp")
+        cmd.append(str(expiration_hours)+"h")
+    if retention_hours:
+        cmd.append("-f")
+        cmd.append("-retain")
+        cmd.append(str(retention_hours)+"h")
+    cmd.append(base_volume_name+".@y@@m@@d@@H@@M@@S@")
+    cmd.append(base_volume_name)
+    return ' '.join(cmd)
+
+
 def create_schedule(
         client_obj,
         storage_system_ip,
@@ -533,27 +650,16 @@ greater than retention time for non zero values", {})
 
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        client_obj.setSSHOptions(storage_system_ip, storage_system_username,
-                                 storage_system_password)
         if not client_obj.volumeExists(base_volume_name):
             return (False, False, "Volume does not Exist", {})
+        client_obj.setSSHOptions(storage_system_ip, storage_system_username,
+                                 storage_system_password)
 
         if not client_obj.scheduleExists(schedule_name):
-            cmd = ["createsv"]
-            if read_only:
-                cmd.append("-ro")
-            if expiration_time:
-                cmd.append("-exp")
-                cmd.append(str(expiration_hours)+"h")
-            if retention_time:
-                cmd.append("-f")
-                cmd.append("-retain")
-                cmd.append(str(retention_hours)+"h")
-            cmd.append(base_volume_name+".@y@@m@@d@@H@@M@@S@")
-            cmd.append(base_volume_name)
+            cmd = get_schedule_command(base_volume_name, read_only,
+                                       expiration_hours, retention_hours)
             if ' ' not in task_freq:
                 task_freq = "@"+task_freq
-            cmd = ' '.join(cmd)
             client_obj.createSchedule(
                 schedule_name, cmd, task_freq)
         else:
@@ -738,6 +844,293 @@ atleast 1 character and not more than 31 characters", {})
         {})
 
 
+# Cron form of the task frequency shortcuts showsched reports schedules in
+TASK_FREQ_SHORTCUTS = {
+    'hourly': '0 * * * *',
+    'daily': '0 0 * * *',
+    'weekly': '0 0 * * 0',
+    'monthly': '0 0 1 * *',
+    'yearly': '0 0 1 1 *',
+}
+SCHEDULE_STATES = ('present', 'suspended', 'absent')
+
+
+def normalize_task_freq(task_freq):
+    task_freq = ' '.join(task_freq.split()).lstrip('@')
+    return TASK_FREQ_SHORTCUTS.get(task_freq, task_freq)
+
+
+def get_schedules(client_obj):
+    """Lists all schedules with one showsched, indexed by name. The CLI
+    session of the client prints tables as CSV.
+    """
+    output = [line for line in client_obj._run(['showsched', '-showcmd'])
+              if line.strip()]
+    if not output or 'Name' not in output[0].split(','):
+        return {}
+    header = output[0].split(',')
+    schedules = {}
+    for line in output[1:]:
+        row = dict(zip(header, line.split(',')))
+        if row.get('Status') not in ('active', 'suspended'):
+            # Separator and total lines
+            continue
+        schedules[row['Name']] = {
+            'command': ' '.join(row['Command'].split()),
+            'task_freq': ' '.join(
+                row[column] for column in ('Min', 'Hour', 'DOM', 'Month',
+                                           'DOW')),
+            'status': row['Status'],
+        }
+    return schedules
+
+
+def set_schedules(
+        client_obj,
+        storage_system_ip,
+        storage_system_username,
+        storage_system_password,
+        schedules):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Set schedules failed. Storage system username or password is \
+null",
+            {})
+    if not schedules:
+        return (False, False, "Set schedules failed. Schedules is null", {})
+    desired = {}
+    for schedule in schedules:
+        schedule_name = schedule.get('schedule_name')
+        state = schedule.get('state', 'present')
+        if not schedule_name or len(schedule_name) > 31:
+            return (False, False, "Set schedules failed. Schedule name must \
+be atleast 1 character and not more than 31 characters", {})
+        if state not in SCHEDULE_STATES:
+            return (False, False, "Set schedules failed. State of schedule %s \
+must be one of %s" % (schedule_name, ", ".join(SCHEDULE_STATES)), {})
+        if state == 'absent':
+            desired[schedule_name] = {'state': state}
+            continue
+        base_volume_name = schedule.get('base_volume_name')
+        if not base_volume_name or len(base_volume_name) > 19:
+            return (False, False, "Set schedules failed. Base volume name of \
+schedule %s must be atleast 1 character and not more than 19 characters" %
+                    schedule_name, {})
+        if not schedule.get('task_freq'):
+            return (False, False, "Set schedules failed. Task frequency of \
+schedule %s is null" % schedule_name, {})
+        expiration_hours = convert_to_hours(
+            schedule.get('expiration_time') or 0,
+            schedule.get('expiration_unit', 'Hours'))
+        retention_hours = convert_to_hours(
+            schedule.get('retention_time') or 0,
+            schedule.get('retention_unit', 'Hours'))
+        if expiration_hours and retention_hours and \
+                expiration_hours <= retention_hours:
+            return (False, False, "Expiration time must be greater than \
+retention time for non zero values", {})
+        task_freq = schedule['task_freq']
+        if ' ' not in task_freq:
+            task_freq = "@" + task_freq.lstrip('@')
+        desired[schedule_name] = {
+            'state': state,
+            'base_volume_name': base_volume_name,
+            'command': get_schedule_command(
+                base_volume_name, schedule.get('read_only'),
+                expiration_hours, retention_hours),
+            'task_freq': task_freq,
+        }
+
+    results = []
+    failed = 0
+    try:
+        client_obj.setSSHOptions(storage_system_ip, storage_system_username,
+                                 storage_system_password)
+        # Every command below runs over the SSH connection opened here
+        existing = get_schedules(client_obj)
+        creates = [name for name in desired
+                   if desired[name]['state'] != 'absent' and (
+                       name not in existing or
+                       existing[name]['command'] != desired[name]['command'])]
+        volumes = set(desired[name]['base_volume_name'] for name in creates)
+        missing_volumes = set()
+        if volumes:
+            client_obj.login(storage_system_username, storage_system_password)
+            try:
+                missing_volumes = set(name for name in volumes
+                                      if not client_obj.volumeExists(name))
+            finally:
+                client_obj.logout()
+
+        for schedule_name, schedule in desired.items():
+            current = existing.get(schedule_name)
+            actions = []
+            try:
+                if schedule['state'] == 'absent':
+                    if current is not None:
+                        client_obj.deleteSchedule(schedule_name)
+                        actions.append('deleted')
+                elif schedule_name in creates:
+                    if schedule['base_volume_name'] in missing_volumes:
+                        raise Exception("Volume does not Exist")
+                    if current is not None:
+                        # setsched cannot change the command of a schedule
+                        client_obj.deleteSchedule(schedule_name)
+                    client_obj.createSchedule(
+                        schedule_name, schedule['command'],
+                        schedule['task_freq'])
+                    actions.append('recreated' if current else 'created')
+                    if schedule['state'] == 'suspended':
+                        client_obj.suspendSchedule(schedule_name)
+                        actions.append('suspended')
+                else:
+                    if normalize_task_freq(current['task_freq']) != \
+                            normalize_task_freq(schedule['task_freq']):
+                        client_obj.modifySchedule(
+                            schedule_name,
+                            {'taskFrequency': schedule['task_freq']})
+                        actions.append('modified')
+                    if schedule['state'] == 'suspended' and \
+                            current['status'] == 'active':
+                        client_obj.suspendSchedule(schedule_name)
+                        actions.append('suspended')
+                    elif schedule['state'] == 'present' and \
+                            current['status'] == 'suspended':
+                        client_obj.resumeSchedule(schedule_name)
+                        actions.append('resumed')
+                results.append({'schedule_name': schedule_name,
+                                'changed': bool(actions),
+                                'result': ", ".join(actions) or "unchanged"})
+            except Exception as e:
+                failed += 1
+                results.append({'schedule_name': schedule_name,
+                                'changed': bool(actions),
+                                'result': "failed | %s" % e})
+    except Exception as e:
+        return (False, False, "Set schedules failed | %s" % e, {})
+    changed = any(result['changed'] for result in results)
+    if failed:
+        return (False, changed, "Set schedules failed for %s of %s \
+schedule(s) | %s" % (failed, len(results), "; ".join(
+            "%s: %s" % (result['schedule_name'], result['result'])
+            for result in results if result['result'].startswith('failed'))),
+            {'results': results})
+    if not changed:
+        return (True, False, "Schedules already in the given state. Nothing \
+to do.", {'results': results})
+    return (True, True, "Set schedules successfully. Changed %s of %s \
+schedule(s)." % (len([result for result in results if result['changed']]),
+                 len(results)), {'results': results})
+
+
+def create_consistent_snapshot(
+        client_obj,
+        storage_system_ip,
+        storage_system_username,
+        storage_system_password,
+        snapshot_name,
+        volume_set_name,
+        base_volume_names,
+        read_only,
+        expiration_time,
+        retention_time,
+        expiration_unit,
+        retention_unit):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Consistent snapshot create failed. Storage system username or \
+password is null",
+            {})
+    if (volume_set_name is None) == (not base_volume_names):
+        return (
+            False,
+            False,
+            "Consistent snapshot create failed. Exactly one of volume set name \
+and base volume names is required",
+            {})
+    template = snapshot_name or SNAPSHOT_NAME_TEMPLATE
+    if '@vvname@' not in template and '@count@' not in template:
+        return (
+            False,
+            False,
+            "Consistent snapshot create failed. Snapshot name must contain \
+@vvname@ or @count@",
+            {})
+    expiration_hours = convert_to_hours(expiration_time, expiration_unit)
+    retention_hours = convert_to_hours(retention_time, retention_unit)
+    if base_volume_names:
+        snapshot_names = get_snapshot_names(template, base_volume_names)
+        for name in snapshot_names:
+            if len(name) > 31:
+                return (False, False, "Consistent snapshot create failed. \
+Snapshot name %s must not be more than 31 characters" % name, {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        if volume_set_name is not None:
+            optional = {'readOnly': bool(read_only)}
+            if expiration_hours:
+                optional['expirationHours'] = expiration_hours
+            if retention_hours:
+                optional['retentionHours'] = retention_hours
+            client_obj.createSnapshotOfVolumeSet(
+                template, volume_set_name, optional)
+        else:
+            # WSAPI snapshots one volume per call, creategroupsv takes all of
+            # them at the same point in time
+            client_obj.setSSHOptions(storage_system_ip,
+                                     storage_system_username,
+                                     storage_system_password)
+            cmd = ["creategroupsv"]
+            if read_only:
+                cmd.append("-ro")
+            if expiration_hours:
+                cmd.append("-exp")
+                cmd.append(str(expiration_hours) + "h")
+            if retention_hours:
+                cmd.append("-f")
+                cmd.append("-retain")
+                cmd.append(str(retention_hours) + "h")
+            for volume_name, name in zip(base_volume_names, snapshot_names):
+                cmd.append("%s:%s" % (volume_name, name))
+            output = [line.strip() for line in client_obj._run(cmd)
+                      if line.strip()]
+            for line in output:
+                if CLI_ERROR_LINE.match(line):
+                    raise Exception(line)
+            # Every requested snapshot is listed in the output. The CLI
+            # session of the client prints tables as CSV.
+            created = set()
+            if output and 'CopyOfVV' in output[0].split(','):
+                header = output[0].split(',')
+                for line in output[1:]:
+                    row = dict(zip(header, line.split(',')))
+                    created.add(row.get('CopyOfVV'))
+            if any(name not in created for name in snapshot_names):
+                raise Exception("; ".join(output) or
+                                "creategroupsv created no snapshot")
+    except Exception as e:
+        return (False, False, "Consistent snapshot creation failed | %s" % e,
+                {})
+    finally:
+        client_obj.logout()
+    if volume_set_name is not None:
+        return (
+            True,
+            True,
+            "Created snapshots of volume set %s successfully." %
+            volume_set_name,
+            {})
+    return (
+        True,
+        True,
+        "Created snapshots %s successfully." % ", ".join(snapshot_names),
+        {})
+
+
 def main():
     fields = {
         "state": {
@@ -745,7 +1138,8 @@ def main():
             "choices": ['present', 'absent', 'create_schedule','suspend_schedule', 
                         'resume_schedule', 'delete_schedule', 'modify_schedule', 
                         'modify', 'restore_offline',
-                        'restore_online'],
+                        'restore_online', 'consistent_snapshot',
+                        'schedules'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -816,6 +1210,15 @@ def main():
         },
         "task_freq": {
             "type": "str",
+        },
+        "volume_set_name": {
+            "type": "str"
+        },
+        "base_volume_names": {
+            "type": "list"
+        },
+        "schedules": {
+            "type": "list"
         }
 
     }
@@ -844,11 +1247,20 @@ def main():
     schedule_name = module.params["schedule_name"]
     task_freq = module.params["task_freq"]
     new_schedule_name = module.params["new_schedule_name"]
+    volume_set_name = module.params["volume_set_name"]
+    base_volume_names = module.params["base_volume_names"]
+    schedules = module.params["schedules"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
@@ -901,6 +1313,19 @@ def main():
             client_obj, storage_system_ip, storage_system_username,
             storage_system_password,
             schedule_name)
+    elif module.params["state"] == "consistent_snapshot":
+        return_status, changed, msg, issue_attr_dict = (
+            create_consistent_snapshot(client_obj, storage_system_ip,
+                                       storage_system_username,
+                                       storage_system_password,
+                                       snapshot_name, volume_set_name,
+                                       base_volume_names, read_only,
+                                       expiration_time, retention_time,
+                                       expiration_unit, retention_unit))
+    elif module.params["state"] == "schedules":
+        return_status, changed, msg, issue_attr_dict = set_schedules(
+            client_obj, storage_system_ip, storage_system_username,
+            storage_system_password, schedules)
 
     if return_status:
         if issue_attr_dict:
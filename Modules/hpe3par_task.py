@@ -0,0 +1,221 @@
+#!/usr/bin/python
+
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+from __future__ import absolute_import, division, print_function
+__metaclass__ = type
+
+
+ANSIBLE_METADATA = {'metadata_version': '1.1',
+                    'status': ['preview'],
+                    'supported_by': 'community'}
+
+
+DOCUMENTATION = r'''
+---
+author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
+description: "On HPE Alletra 9000 and Primera and 3PAR - Wait for asynchronous
+ tasks, for example the tasks started by hpe3par_volume convert_type,
+ change_user_cpg and change_snap_cpg without wait_for_task_to_end. All tasks
+ are polled together with one task list call per interval. Tasks no longer in
+ the task list are looked up by ID, unknown task IDs fail."
+module: hpe3par_task
+options:
+  storage_system_ip:
+    description:
+      - "The storage system IP address."
+    required: true
+  storage_system_password:
+    description:
+      - "The storage system password."
+    required: true
+  storage_system_username:
+    description:
+      - "The storage system user name."
+    required: true
+  task_ids:
+    description:
+      - "IDs of the tasks to wait for."
+    required: true
+    type: list
+  timeout:
+    default: 3600
+    description:
+      - "Seconds to wait for all tasks to end. The task list is polled at
+       intervals growing from 2 up to 60 seconds while no task ends.\n"
+    required: false
+    type: int
+
+requirements:
+  - "3PAR OS - 3.2.2 MU6, 3.3.1 MU1"
+  - "Ansible - 2.4"
+  - "hpe3par_sdk 1.0.0"
+  - "The hpe3par_util module_utils"
+  - "WSAPI service should be enabled on the HPE Alletra 9000 and Primera and 3PAR storage array."
+short_description: "Wait for HPE Alletra 9000 and Primera and 3PAR tasks"
+version_added: "2.4"
+'''
+
+EXAMPLES = r'''
+    - name: Convert volumes to thin dedupe
+      hpe3par_volume:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: convert_type
+        volume_name: "{{ item }}"
+        type: thin_dedupe
+        cpg: "{{ cpg }}"
+      loop: "{{ volume_names }}"
+      register: conversions
+
+    - name: Wait for the conversions to end
+      hpe3par_task:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        task_ids: "{{ conversions.results | selectattr('issue', 'defined')
+                      | map(attribute='issue.task_id') | list }}"
+        timeout: 36000
+'''
+
+RETURN = r'''
+'''
+
+from ansible.module_utils.basic import AnsibleModule
+try:
+    from hpe3par_sdk import client
+except ImportError:
+    client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Seconds between two task polls, doubled while no task ends
+MIN_POLL_INTERVAL = 2
+MAX_POLL_INTERVAL = 60
+
+
+def wait_for_tasks(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        task_ids,
+        timeout):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Wait for tasks failed. Storage system username or password is \
+null",
+            {})
+    if not task_ids:
+        return (False, False, "Wait for tasks failed. Task IDs is null", {})
+    try:
+        task_ids = [int(task_id) for task_id in task_ids]
+    except (TypeError, ValueError):
+        return (False, False, "Wait for tasks failed. Task IDs must be \
+integers", {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        tasks = hpe3par_util.wait_for_tasks(
+            client_obj, task_ids, timeout, MIN_POLL_INTERVAL,
+            MAX_POLL_INTERVAL)
+    except Exception as e:
+        return (False, False, "Wait for tasks failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    results = [{'task_id': task_id,
+                'name': tasks[task_id]['name'],
+                'status': hpe3par_util.TASK_STATUSES.get(
+                    tasks[task_id]['status'], str(tasks[task_id]['status'])),
+                'duration': tasks[task_id]['duration']}
+               for task_id in task_ids]
+    active = [result['task_id'] for result in results
+              if result['status'] == 'active']
+    failed = [result for result in results
+              if result['status'] in ('failed', 'cancelled', 'not found')]
+    if active or failed:
+        errors = ["task %s %s" % (result['task_id'], result['status'])
+                  for result in failed]
+        if active:
+            errors.append("task(s) %s not ended after %s seconds" % (
+                ", ".join(str(task_id) for task_id in active), timeout))
+        return (False, False, "Wait for tasks failed | %s" %
+                "; ".join(errors), {'results': results})
+    return (True, False, "%s task(s) ended successfully." % len(results),
+            {'results': results})
+
+
+def main():
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "task_ids": {
+            "required": True,
+            "type": "list"
+        },
+        "timeout": {
+            "type": "int",
+            "default": 3600
+        }
+    }
+    module = AnsibleModule(argument_spec=fields)
+
+    if client is None:
+        module.fail_json(msg='the python hpe3par_sdk module is required')
+    if hpe3par_util is None:
+        module.fail_json(msg='the hpe3par_util module_utils is required')
+
+    storage_system_ip = module.params["storage_system_ip"]
+    storage_system_username = module.params["storage_system_username"]
+    storage_system_password = module.params["storage_system_password"]
+
+    task_ids = module.params["task_ids"]
+    timeout = module.params["timeout"]
+
+    client_obj = hpe3par_util.get_client(
+        client.HPE3ParClient, storage_system_ip, storage_system_username,
+        storage_system_password)
+
+    return_status, changed, msg, issue_attr_dict = wait_for_tasks(
+        client_obj, storage_system_username, storage_system_password,
+        task_ids, timeout)
+    if return_status:
+        module.exit_json(changed=changed, msg=msg, issue=issue_attr_dict)
+    else:
+        module.fail_json(msg=msg, issue=issue_attr_dict)
+
+
+if __name__ == '__main__':
+    main()
@@ -33,7 +33,8 @@ author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Export volume to host - Export
  volumeset to host - Export volume to hostset - Export volumeset
  to hostset - Unexport volume from host - Unexport volumeset from host -
- Unexport volume from hostset - Unexport volumeset from hostset"
+ Unexport volume from hostset - Unexport volumeset from hostset - Export
+ volumes and volumesets to hosts and hostsets"
 module: hpe3par_vlun
 options:
   autolun:
@@ -57,10 +58,45 @@ options:
        unexport_volume_from_hostset, export_volumeset_to_hostset,
        unexport_volumeset_from_hostset\n"
     required: false
+  host_sets:
+    description:
+      - "Host sets to export volumes and volume_sets to with action
+       export_matrix."
+    required: false
+    type: list
+  hosts:
+    description:
+      - "Hosts to export volumes and volume_sets to with action
+       export_matrix."
+    required: false
+    type: list
+  lun_assignment:
+    choices:
+      - sequential
+      - lowest_free
+    default: sequential
+    description:
+      - "How LUN IDs are picked with action export_matrix when autolun is
+       false.\nsequential starts at lunid. Each volume takes the next LUN ID
+       in order and each volume set takes one LUN ID per member.\nlowest_free
+       gives each volume the lowest LUN ID from lunid (default 0) that is
+       free on all of its hosts and on the members of its host sets. A volume
+       that is already exported to some of the hosts keeps its LUN ID if it
+       is free on the others\n"
+    required: false
   lunid:
     description:
-      - "LUN ID."
+      - "LUN ID.\nWith action export_matrix, the first LUN ID to assign, see
+       lun_assignment. A volume gets the same LUN ID on every host and host
+       set\n"
+    required: false
+  max_workers:
+    default: 1
+    description:
+      - "Number of VLUNs created in parallel with action export_matrix, at
+       most 8."
     required: false
+    type: int
   node_val:
     description:
       - "System node."
@@ -79,19 +115,33 @@ options:
       - unexport_volume_from_hostset
       - export_volumeset_to_hostset
       - unexport_volumeset_from_hostset
+      - export_matrix
     description:
-      - "Whether the specified export should exist or not."
+      - "Whether the specified export should exist or not. export_matrix
+       exports every volume and volume set in volumes and volume_sets to
+       every host and host set in hosts and host_sets, creating only the
+       VLUNs that do not exist yet\n"
     required: true
   volume_name:
     description:
       - "Name of the volume to export."
-    required: true
+    required: false
   volume_set_name:
     description:
       - "Name of the VV set to export.\nRequired with action
        export_volumeset_to_host, unexport_volumeset_from_host,
        export_volumeset_to_hostset, unexport_volumeset_from_hostset\n"
     required: false
+  volume_sets:
+    description:
+      - "Volume sets to export with action export_matrix."
+    required: false
+    type: list
+  volumes:
+    description:
+      - "Volumes to export with action export_matrix."
+    required: false
+    type: list
   storage_system_ip:
     description:
       - "The storage system IP address."
@@ -168,16 +218,55 @@ EXAMPLES = r'''
         volume_name="{{ volume_name }}"
         host_name="{{ host_name }}"
         lunid="{{ lunid }}"
+
+    - name: Export volumes to all cluster nodes
+      hpe3par_vlun:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: export_matrix
+        volumes:
+          - db_data_1
+          - db_data_2
+        volume_sets:
+          - db_logs
+        hosts:
+          - node1
+          - node2
+        lunid: 10
+        max_workers: 4
+
+    - name: Export volumes on the lowest LUN IDs free on all cluster nodes
+      hpe3par_vlun:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: export_matrix
+        volumes: "{{ db_volumes }}"
+        host_sets:
+          - db_cluster
+        lun_assignment: lowest_free
 '''
 
 RETURN = r'''
 '''
 
+import time
+from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Upper bound for max_workers, as in hpe3par_volume
+MAX_BULK_WORKERS = 8
+BUSY_RETRIES = 5
+MAX_LUN_ID = 16383
 
 
 def export_volume_to_host(
@@ -658,6 +747,225 @@ unexport a vlun',
     return (True, True, "Deleted VLUN successfully.", {})
 
 
+def get_vlun_index(vluns):
+    """Maps (volume or set:volume set, host or set:host set) to the LUNs
+    exported for it.
+    """
+    vlun_index = {}
+    for vlun in vluns:
+        vlun_index.setdefault(
+            (vlun.volume_name, vlun.hostname), set()).add(vlun.lun)
+    return vlun_index
+
+
+class LunAllocator(object):
+    """Hands out LUN IDs that are free on every host they are exported to.
+
+    Used LUN IDs are kept as one bitmap per host, built from a single VLUN
+    list, so a whole batch of exports is allocated without asking the array
+    whether each ID is taken. A host set counts as its own host and also
+    marks its LUNs used on each member.
+    """
+
+    def __init__(self, vluns, host_set_members=None):
+        self.host_set_members = host_set_members or {}
+        self.used = {}
+        for vlun in vluns:
+            if vlun.hostname and vlun.lun is not None:
+                self.reserve([vlun.hostname], vlun.lun)
+
+    def get_hosts(self, host_names):
+        hosts = []
+        for host_name in host_names:
+            hosts.append(host_name)
+            hosts.extend(self.host_set_members.get(host_name, []))
+        return hosts
+
+    def reserve(self, host_names, lun, count=1):
+        lun_mask = ((1 << count) - 1) << lun
+        for host_name in self.get_hosts(host_names):
+            self.used[host_name] = self.used.get(host_name, 0) | lun_mask
+
+    def is_free(self, host_names, lun, count=1):
+        lun_mask = ((1 << count) - 1) << lun
+        return (lun + count - 1 <= MAX_LUN_ID and
+                not any(self.used.get(host_name, 0) & lun_mask
+                        for host_name in self.get_hosts(host_names)))
+
+    def allocate(self, host_names, count=1, start=0, preferred=None):
+        """Reserves and returns the first of count consecutive LUN IDs,
+        preferred if it is free, else the lowest free one from start.
+        """
+        count = max(count, 1)
+        candidates = range(start, MAX_LUN_ID + 2 - count)
+        if preferred is not None:
+            candidates = [preferred] + list(candidates)
+        for lun in candidates:
+            if self.is_free(host_names, lun, count):
+                self.reserve(host_names, lun, count)
+                return lun
+        raise Exception("No %s free LUN ID(s) left on %s" %
+                        (count, ", ".join(host_names)))
+
+
+def run_vlun_operation(operation, vlun_specs, max_workers):
+    def run_one(spec):
+        delay = 1
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                changed, msg = operation(spec)
+                return dict(spec, changed=changed, failed=False, msg=msg)
+            except Exception as e:
+                # 503 means the array is busy, back off and try again
+                if (getattr(e, 'http_status', None) == 503 and
+                        attempt < BUSY_RETRIES):
+                    time.sleep(delay)
+                    delay *= 2
+                    continue
+                return dict(spec, changed=False, failed=True, msg=str(e))
+
+    workers = max(1, min(max_workers or 1, MAX_BULK_WORKERS,
+                         len(vlun_specs)))
+    if workers == 1:
+        return [run_one(spec) for spec in vlun_specs]
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(run_one, vlun_specs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def export_matrix(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumes,
+        volume_sets,
+        hosts,
+        host_sets,
+        lunid,
+        autolun,
+        max_workers=1,
+        lun_assignment='sequential'):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "VLUN matrix export failed. Storage system username or password \
+is null",
+            {})
+    if not volumes and not volume_sets:
+        return (
+            False,
+            False,
+            "VLUN matrix export failed. Volumes or volume sets are required",
+            {})
+    if not hosts and not host_sets:
+        return (
+            False,
+            False,
+            "VLUN matrix export failed. Hosts or host sets are required",
+            {})
+    if autolun and lun_assignment == 'lowest_free':
+        return (
+            False,
+            False,
+            "VLUN matrix export failed. autolun and lun_assignment \
+lowest_free cannot be used together",
+            {})
+    if not autolun and lunid is None and lun_assignment != 'lowest_free':
+        return (False, False, "Lun ID is required", {})
+
+    def create_one(spec):
+        client_obj.createVLUN(spec['volume_name'], spec['lun'],
+                              spec['host_name'], None, None, None, autolun)
+        return (True, "Created VLUN successfully.")
+
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        vluns = client_obj.getVLUNs()
+        vlun_index = get_vlun_index(vluns)
+
+        exports = []
+        for volume_name in volumes or []:
+            exports.append((volume_name, 1))
+        for volume_set_name in volume_sets or []:
+            lun_count = 1
+            if not autolun:
+                # The members of an exported volume set take consecutive LUNs
+                lun_count = len(client_obj.getVolumeSet(
+                    volume_set_name).setmembers or [])
+            exports.append(('set:' + volume_set_name, lun_count))
+        targets = list(hosts or []) + [
+            'set:' + host_set_name for host_set_name in host_sets or []]
+
+        if lun_assignment == 'lowest_free':
+            host_set_members = dict(
+                ('set:' + host_set_name,
+                 client_obj.getHostSet(host_set_name).setmembers or [])
+                for host_set_name in host_sets or [])
+            allocator = LunAllocator(vluns, host_set_members)
+
+        results = []
+        vlun_specs = []
+        next_lunid = lunid
+        for volume_name, lun_count in exports:
+            missing_targets = [host_name for host_name in targets
+                               if (volume_name, host_name) not in vlun_index]
+            lun = None
+            if autolun:
+                pass
+            elif lun_assignment == 'lowest_free':
+                if missing_targets:
+                    # Keep the LUN the volume already has on the other hosts
+                    existing_luns = [
+                        min(vlun_index[(volume_name, host_name)])
+                        for host_name in targets
+                        if (volume_name, host_name) in vlun_index]
+                    lun = allocator.allocate(
+                        missing_targets, lun_count, lunid or 0,
+                        existing_luns[0] if existing_luns else None)
+            else:
+                lun = next_lunid
+                next_lunid += lun_count
+            for host_name in targets:
+                spec = {'volume_name': volume_name,
+                        'host_name': host_name,
+                        'lun': lun}
+                if host_name in missing_targets:
+                    vlun_specs.append(spec)
+                else:
+                    spec['lun'] = min(vlun_index[(volume_name, host_name)])
+                    results.append(dict(
+                        spec, changed=False, failed=False,
+                        msg="VLUN already present"))
+        results.extend(run_vlun_operation(create_one, vlun_specs, max_workers))
+    except Exception as e:
+        return (False, False, "VLUN matrix export failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+
+    failed = [result for result in results if result['failed']]
+    changed = any(result['changed'] for result in results)
+    if failed:
+        return (
+            False,
+            changed,
+            "VLUN matrix export failed for %s of %s VLUN(s) | %s" %
+            (len(failed), len(results),
+             "; ".join("%s to %s: %s" % (result['volume_name'],
+                                         result['host_name'], result['msg'])
+                       for result in failed)),
+            {'results': results})
+    return (
+        True,
+        changed,
+        "VLUN matrix export completed for %s VLUN(s), %s created." %
+        (len(results), len(vlun_specs)),
+        {'results': results})
+
+
 def main():
 
     fields = {
@@ -671,7 +979,8 @@ def main():
                 'export_volume_to_hostset',
                 'unexport_volume_from_hostset',
                 'export_volumeset_to_hostset',
-                'unexport_volumeset_from_hostset'],
+                'unexport_volumeset_from_hostset',
+                'export_matrix'],
             "type": 'str'},
         "storage_system_ip": {
             "required": True,
@@ -705,7 +1014,22 @@ def main():
         "slot": {
             "type": "int"},
         "card_port": {
-            "type": "int"}}
+            "type": "int"},
+        "volumes": {
+            "type": "list"},
+        "volume_sets": {
+            "type": "list"},
+        "hosts": {
+            "type": "list"},
+        "host_sets": {
+            "type": "list"},
+        "max_workers": {
+            "type": "int",
+            "default": 1},
+        "lun_assignment": {
+            "type": "str",
+            "choices": ['sequential', 'lowest_free'],
+            "default": 'sequential'}}
 
     module = AnsibleModule(argument_spec=fields)
 
@@ -725,11 +1049,23 @@ def main():
     slot = module.params["slot"]
     card_port = module.params["card_port"]
     autolun = module.params["autolun"]
-
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    volumes = module.params["volumes"]
+    volume_sets = module.params["volume_sets"]
+    hosts = module.params["hosts"]
+    host_sets = module.params["host_sets"]
+    max_workers = module.params["max_workers"]
+    lun_assignment = module.params["lun_assignment"]
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "export_volume_to_host":
@@ -778,12 +1114,19 @@ def main():
                                          storage_system_password,
                                          volume_name, lunid, host_set_name,
                                          node_val, slot, card_port))
+    elif module.params["state"] == "export_matrix":
+        return_status, changed, msg, issue_attr_dict = export_matrix(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, volume_sets, hosts, host_sets, lunid, autolun,
+            max_workers, lun_assignment)
 
     if return_status:
         if issue_attr_dict:
             module.exit_json(changed=changed, msg=msg, issue=issue_attr_dict)
         else:
             module.exit_json(changed=changed, msg=msg)
+    elif module.params["state"] == "export_matrix":
+        module.fail_json(msg=msg, issue=issue_attr_dict)
     else:
         module.fail_json(msg=msg)
 
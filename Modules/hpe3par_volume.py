@@ -32,7 +32,7 @@ DOCUMENTATION = r'''
 author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Create Volume - Delete Volume - Modify
  Volume - Grow Volume - Grow Volume to certain size - Change Snap CPG - Change
- User CPG - Convert Provisioning TypeError - Set Snap CPG"
+ User CPG - Convert Provisioning TypeError - Set Snap CPG - Converge Volume"
 module: hpe3par_volume
 options:
   compression:
@@ -156,9 +156,20 @@ options:
       - change_user_cpg
       - convert_type
       - set_snap_cpg
+      - converged
     description:
       - "Whether the specified Volume should exist or not. State also provides
-       actions to modify volume properties.\n"
+       actions to modify volume properties.\n
+       converged creates the volume or brings it to the given cpg, size,
+       type, snap_cpg, expiration_hours, retention_hours and space
+       allocation percentages in one session. The volume is read once
+       and only the needed calls are made, so a volume already in shape costs
+       a single GET. Volumes are never shrunk. Options left at 0 are not
+       changed, expiration and retention are only set on volumes without one.
+       type is always compared, with its default when not given. compression
+       only applies when the volume is created, a tune cannot change it.
+       Started tune tasks are returned in issue.task_ids unless
+       wait_for_task_to_end is set.\n"
     required: true
   type:
     choices:
@@ -185,13 +196,69 @@ options:
     required: false
   volume_name:
     description:
-      - "Name of the Virtual Volume."
-    required: true
+      - "Name of the Virtual Volume.\nRequired unless volumes is given\n"
+    required: false
+  volumes:
+    description:
+      - "List of volumes to act on in a single session with action present,
+       absent, grow, grow_to_size or modify. Each item is either a volume name
+       or a dictionary with volume_name and the options of the action, for
+       example cpg, size, size_unit, type, snap_cpg, staleSS and zeroDetect for
+       present, or new_name and the expiration, retention and allocation
+       options for modify. Values missing from an item are taken from the
+       module options. Per volume results are returned in issue.results.
+       Before creating anything with action present, the volumes are listed
+       once and each target CPG is fetched once. The batch is rejected when a
+       CPG does not exist, or when the fully provisioned volumes do not fit in
+       the free space of their CPG or would grow it beyond its growth limit.\n"
+    required: false
+    type: list
+  max_workers:
+    default: 1
+    description:
+      - "Number of volumes of the volumes list processed concurrently. Capped
+       at 8 to stay within the requests the WSAPI server handles at once.
+       Requests rejected by a busy array are retried with backoff.\n"
+    required: false
+    type: int
+  volume_pattern:
+    description:
+      - "Shell style pattern, for example ci_vol_*, selecting the volumes to
+       delete with action absent, in addition to volume_name and volumes. The
+       volumes are listed once to find the matches. Snapshots are not
+       matched, they are only deleted when listed by name.\n"
+    required: false
+  volume_tags:
+    description:
+      - "Key/value metadata the volumes must carry to be deleted with action
+       absent, for example type ansible-3par-client which is set on every
+       volume created by this module. Without volume_name, volumes and
+       volume_pattern all volumes but snapshots carrying the tags are
+       deleted. The metadata is looked up once per listed volume and tag,
+       max_workers at a time.\n"
+    required: false
+    type: dict
+  unexport:
+    default: false
+    description:
+      - "Remove the VLUNs of the volumes before deleting them with action
+       absent. The VLUNs are listed once for the whole batch.\n"
+    required: false
+    type: bool
+  remove_from_sets:
+    default: false
+    description:
+      - "Remove the volumes from their volume sets before deleting them with
+       action absent. The volume sets are listed once for the whole batch.\n"
+    required: false
+    type: bool
   wait_for_task_to_end:
     default: false
     description:
       - "Setting to true makes the resource to wait until a task asynchronous
-       operation, for ex convert type ends.\n"
+       operation, for ex convert type ends. Otherwise the ID of the started
+       task is returned in issue.task_id, to be waited for with the
+       hpe3par_task module.\n"
     required: false
     type: bool
   storage_system_ip:
@@ -228,6 +295,45 @@ EXAMPLES = r'''
         size="{{ size }}"
         snap_cpg="{{ snap_cpg }}"
 
+    - name: Create multiple Volumes in one session
+      hpe3par_volume:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: present
+        cpg: "{{ cpg }}"
+        size: "{{ size }}"
+        volumes:
+          - volume_ansible_1
+          - volume_name: volume_ansible_2
+            size: 2
+            size_unit: GiB
+        max_workers: 4
+
+    - name: Grow multiple Volumes to "{{ size }}" {{ size_unit }}
+      hpe3par_volume:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: grow_to_size
+        size: "{{ size }}"
+        size_unit: "{{ size_unit }}"
+        volumes: "{{ volume_names }}"
+        max_workers: 4
+
+    - name: Unexport and delete all CI Volumes created by the module
+      hpe3par_volume:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: absent
+        volume_pattern: "ci_vol_*"
+        volume_tags:
+          type: ansible-3par-client
+        unexport: true
+        remove_from_sets: true
+        max_workers: 8
+
     - name: Change provisioning type of Volume "{{ volume_name }}" to "{{ type }}"
       hpe3par_volume:
         storage_system_ip="{{ storage_system_ip }}"
@@ -239,6 +345,20 @@ EXAMPLES = r'''
         cpg="{{ cpg }}"
         wait_for_task_to_end="{{ wait_for_task_to_end }}"
 
+    - name: Converge Volume "{{ volume_name }}"
+      hpe3par_volume:
+        storage_system_ip: "{{ storage_system_ip }}"
+        storage_system_username: "{{ storage_system_username }}"
+        storage_system_password: "{{ storage_system_password }}"
+        state: converged
+        volume_name: "{{ volume_name }}"
+        cpg: "{{ cpg }}"
+        snap_cpg: "{{ snap_cpg }}"
+        size: "{{ size }}"
+        size_unit: "{{ size_unit }}"
+        type: "{{ type }}"
+        usr_spc_alloc_warning_pct: 80
+
     - name: Set Snap CPG of Volume "{{ volume_name }}" to "{{ snap_cpg }}"
       hpe3par_volume:
         storage_system_ip="{{ storage_system_ip }}"
@@ -298,11 +418,45 @@ EXAMPLES = r'''
 
 RETURN = r'''
 '''
+import fnmatch
+import time
+from multiprocessing.pool import ThreadPool
 from ansible.module_utils.basic import AnsibleModule
 try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from hpe3parclient import exceptions
+except ImportError:
+    exceptions = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Upper bound for max_workers. The WSAPI server only services a handful of
+# requests per client at a time, more threads just queue up on the array.
+MAX_BULK_WORKERS = 8
+# Retries of a bulk item when the array answers 503 (busy)
+BUSY_RETRIES = 5
+# copyType of snapshots in the volume list
+VIRTUAL_COPY = 3
+
+# Module options accepted per volume by the bulk modify and their WSAPI keys
+MODIFY_VOLUME_OPTIONS = (
+    ('new_name', 'newName'),
+    ('expiration_hours', 'expirationHours'),
+    ('retention_hours', 'retentionHours'),
+    ('ss_spc_alloc_warning_pct', 'ssSpcAllocWarningPct'),
+    ('ss_spc_alloc_limit_pct', 'ssSpcAllocLimitPct'),
+    ('usr_spc_alloc_warning_pct', 'usrSpcAllocWarningPct'),
+    ('usr_spc_alloc_limit_pct', 'usrSpcAllocLimitPct'),
+    ('rm_ss_spc_alloc_warning', 'rmSsSpcAllocWarning'),
+    ('rm_usr_spc_alloc_warning', 'rmUsrSpcAllocWarning'),
+    ('rm_exp_time', 'rmExpTime'),
+    ('rm_ss_spc_alloc_limit', 'rmSsSpcAllocLimit'),
+    ('rm_usr_spc_alloc_limit', 'rmUsrSpcAllocLimit'))
 
 
 def convert_to_binary_multiple(size, size_unit):
@@ -327,6 +481,58 @@ def get_volume_type(volume_type):
     return enum_type
 
 
+def get_volume_or_none(client_obj, volume_name):
+    """Fetches the volume in one call, returns None if it does not exist."""
+    try:
+        return client_obj.getVolume(volume_name)
+    except exceptions.HTTPNotFound:
+        return None
+
+
+def to_bool(val):
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, str):
+        return val.lower() == 'true'
+    return bool(val)
+
+
+def get_create_volume_optional(
+        array_version,
+        type,
+        snap_cpg,
+        staleSS=None,
+        zeroDetect=None):
+    PRIMERA_MIN_BUILD_VERSION = 40000128
+    tpvv = False
+    tdvv = False
+    if type == 'thin':
+        tpvv = True
+    elif type == 'thin_dedupe':
+        tdvv = True
+    optional = {'tpvv': tpvv, 'snapCPG': snap_cpg,
+                'objectKeyValues': [
+                    {'key': 'type', 'value': 'ansible-3par-client'}]}
+    # 'reduce' is used by Primera and above arrays; 3PAR arrays use 'tdvv' instead
+    if array_version >= PRIMERA_MIN_BUILD_VERSION:
+        optional['reduce'] = tdvv
+    else:
+        optional['tdvv'] = tdvv
+    policies = {}
+
+    # Only add staleSS if explicitly provided in YAML
+    if staleSS is not None:
+        policies['staleSS'] = staleSS
+
+    # Only add zeroDetect if explicitly provided and not thin_dedupe
+    if zeroDetect is not None and type != 'thin_dedupe':
+        policies['zeroDetect'] = zeroDetect
+
+    if policies:
+        optional['policies'] = policies
+    return optional
+
+
 def create_volume(
         client_obj,
         storage_system_username,
@@ -341,13 +547,6 @@ def create_volume(
         staleSS=None,
         zeroDetect=None):
 
-    def to_bool(val):
-        if isinstance(val, bool):
-            return val
-        if isinstance(val, str):
-            return val.lower() == 'true'
-        return bool(val)
-
     if staleSS is not None:
         staleSS = to_bool(staleSS)
     if zeroDetect is not None:
@@ -384,41 +583,14 @@ null",
             {})
     try:
         # Check array version before login (/api is a public endpoint)
-        PRIMERA_MIN_BUILD_VERSION = 40000128
         array_version = client_obj.getWsApiVersion().get('build', 0)
 
         client_obj.login(storage_system_username, storage_system_password)
         if not client_obj.volumeExists(volume_name):
-            tpvv = False
-            tdvv = False
-            if type == 'thin':
-                tpvv = True
-            elif type == 'thin_dedupe':
-                tdvv = True
             size_in_mib = convert_to_binary_multiple(
                 size, size_unit)
-            optional = {'tpvv': tpvv, 'snapCPG': snap_cpg,
-                        'objectKeyValues': [
-                            {'key': 'type', 'value': 'ansible-3par-client'}]}
-            # 'reduce' is used by Primera and above arrays; 3PAR arrays use 'tdvv' instead
-            if array_version >= PRIMERA_MIN_BUILD_VERSION:
-                optional['reduce'] = tdvv
-            else:
-                optional['tdvv'] = tdvv
-            policies = {}
-
-            # Only add staleSS if explicitly provided in YAML
-            if staleSS is not None:
-                policies['staleSS'] = staleSS
-
-            # Only add zeroDetect if explicitly provided and not thin_dedupe
-            if zeroDetect is not None and type != 'thin_dedupe':
-                policies['zeroDetect'] = zeroDetect
-
-            issue_attr_dict = {}
-            if policies:
-                optional['policies'] = policies
-                issue_attr_dict['policies'] = policies
+            optional = get_create_volume_optional(
+                array_version, type, snap_cpg, staleSS, zeroDetect)
             client_obj.createVolume(volume_name, cpg, size_in_mib, optional)
         else:
             return (True, False, "Volume already present", {})
@@ -428,6 +600,437 @@ null",
         client_obj.logout()
     return (True, True, "Created volume %s successfully." % volume_name, {})
 
+
+def get_volume_specs(volumes, defaults):
+    volume_specs = []
+    for volume in volumes:
+        if not isinstance(volume, dict):
+            volume = {'volume_name': volume}
+        spec = dict(defaults)
+        spec.update(volume)
+        volume_specs.append(spec)
+    return volume_specs
+
+
+def validate_volume_specs(volume_specs, action, required=()):
+    for spec in volume_specs:
+        volume_name = spec.get('volume_name')
+        if volume_name is None:
+            return "%s failed. Volume name is null" % action
+        if len(volume_name) < 1 or len(volume_name) > 31:
+            return "%s failed. Volume name %s must be atleast 1 character and not more than 31 characters" % (action, volume_name)
+        for key, label in required:
+            if spec.get(key) is None:
+                return "%s failed. %s is null for volume %s" % (
+                    action, label, volume_name)
+    return None
+
+
+def run_bulk_operation(operation, volume_specs, max_workers):
+    def run_one(spec):
+        delay = 1
+        for attempt in range(BUSY_RETRIES + 1):
+            try:
+                changed, msg = operation(spec)
+                return {'volume_name': spec['volume_name'],
+                        'changed': changed,
+                        'failed': False,
+                        'msg': msg}
+            except Exception as e:
+                # 503 means the array is busy, back off and try again
+                if (getattr(e, 'http_status', None) == 503 and
+                        attempt < BUSY_RETRIES):
+                    time.sleep(delay)
+                    delay *= 2
+                    continue
+                return {'volume_name': spec['volume_name'],
+                        'changed': False,
+                        'failed': True,
+                        'msg': str(e)}
+
+    workers = max(1, min(max_workers or 1, MAX_BULK_WORKERS,
+                         len(volume_specs)))
+    if workers == 1:
+        return [run_one(spec) for spec in volume_specs]
+    pool = ThreadPool(workers)
+    try:
+        return pool.map(run_one, volume_specs)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def summarize_bulk_results(results, action):
+    failed = [result for result in results if result['failed']]
+    changed = any(result['changed'] for result in results)
+    if failed:
+        return (
+            False,
+            changed,
+            "%s failed for %s of %s volume(s) | %s" %
+            (action, len(failed), len(results),
+             "; ".join("%s: %s" % (result['volume_name'], result['msg'])
+                       for result in failed)),
+            {'results': results})
+    return (
+        True,
+        changed,
+        "%s completed for %s volume(s), %s changed." %
+        (action, len(results),
+         len([result for result in results if result['changed']])),
+        {'results': results})
+
+
+def get_cpg_total_mib(cpg):
+    return sum(usage.total_MiB or 0
+               for usage in (cpg.usr_usage, cpg.sausage, cpg.sdusage)
+               if usage is not None)
+
+
+def check_cpg_capacity(client_obj, volume_specs):
+    # Thin volumes only allocate on write, fully provisioned volumes take
+    # their whole size from the user CPG at creation
+    requested = {}
+    for spec in volume_specs:
+        size = 0
+        if spec['type'] == 'full':
+            size = convert_to_binary_multiple(spec['size'], spec['size_unit'])
+        requested[spec['cpg']] = requested.get(spec['cpg'], 0) + size
+    for cpg_name in sorted(requested):
+        try:
+            cpg = client_obj.getCPG(cpg_name)
+        except exceptions.HTTPNotFound:
+            return "CPG %s does not exist" % cpg_name
+        size = requested[cpg_name]
+        if not size:
+            continue
+        # Space already allocated to the CPG is used before it grows
+        allocated_free = 0
+        if cpg.usr_usage is not None:
+            allocated_free = max(0, (cpg.usr_usage.total_MiB or 0) -
+                                 (cpg.usr_usage.used_MiB or 0))
+        growth = max(0, size - allocated_free)
+        if not growth:
+            continue
+        usable_free = client_obj.getCPGAvailableSpace(
+            cpg_name).usable_free_in_mib or 0
+        if growth > usable_free:
+            return ("CPG %s needs %s MiB more for the fully provisioned "
+                    "volumes, only %s MiB is free" %
+                    (cpg_name, growth, usable_free))
+        if cpg.sdgrowth is not None and cpg.sdgrowth.limit_MiB:
+            total = get_cpg_total_mib(cpg) + growth
+            if total > cpg.sdgrowth.limit_MiB:
+                return ("CPG %s would grow to %s MiB, beyond its growth limit "
+                        "of %s MiB" %
+                        (cpg_name, total, cpg.sdgrowth.limit_MiB))
+    return None
+
+
+def create_volumes(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumes,
+        cpg,
+        size,
+        size_unit,
+        type,
+        compression,
+        snap_cpg,
+        staleSS=None,
+        zeroDetect=None,
+        max_workers=1):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Volume creation failed. Storage system username or password is \
+null",
+            {})
+    if not volumes:
+        return (False, False, "Volume creation failed. Volumes is null", {})
+
+    # Validate the whole batch before talking to the array
+    volume_specs = get_volume_specs(volumes, {
+        'cpg': cpg,
+        'size': size,
+        'size_unit': size_unit,
+        'type': type,
+        'snap_cpg': snap_cpg,
+        'staleSS': staleSS,
+        'zeroDetect': zeroDetect})
+    error = validate_volume_specs(
+        volume_specs, "Volume creation",
+        (('cpg', 'Cpg'), ('size', 'Volume size'),
+         ('size_unit', 'Volume size_unit')))
+    if error:
+        return (False, False, error, {})
+    for spec in volume_specs:
+        if spec['staleSS'] is not None:
+            spec['staleSS'] = to_bool(spec['staleSS'])
+        if spec['zeroDetect'] is not None:
+            spec['zeroDetect'] = to_bool(spec['zeroDetect'])
+
+    def create_one(spec):
+        if spec['volume_name'] in existing:
+            return (False, "Volume already present")
+        optional = get_create_volume_optional(
+            array_version, spec['type'], spec['snap_cpg'],
+            spec['staleSS'], spec['zeroDetect'])
+        client_obj.createVolume(
+            spec['volume_name'], spec['cpg'],
+            convert_to_binary_multiple(spec['size'], spec['size_unit']),
+            optional)
+        return (True, "Created volume %s successfully." % spec['volume_name'])
+
+    try:
+        # One version check and one session for the whole batch
+        array_version = client_obj.getWsApiVersion().get('build', 0)
+
+        client_obj.login(storage_system_username, storage_system_password)
+        # Check the whole batch fits before creating anything
+        existing = set(volume.name for volume in client_obj.getVolumes())
+        error = check_cpg_capacity(
+            client_obj,
+            [spec for spec in volume_specs
+             if spec['volume_name'] not in existing])
+        if error:
+            return (False, False, "Volume creation failed. %s" % error, {})
+        results = run_bulk_operation(create_one, volume_specs, max_workers)
+    except Exception as e:
+        return (False, False, "Volume creation failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    return summarize_bulk_results(results, "Volume creation")
+
+
+def get_tagged_volumes(client_obj, volume_names, volume_tags, max_workers):
+    # The volume list does not carry the key/value metadata, each volume and
+    # tag is one lookup. They are spread over the same bounded pool.
+    def is_tagged(volume_name):
+        return all(client_obj.findVolumeMetaData(volume_name, key, str(value))
+                   for key, value in volume_tags.items())
+
+    workers = max(1, min(max_workers or 1, MAX_BULK_WORKERS,
+                         len(volume_names)))
+    if workers == 1:
+        tagged = [is_tagged(volume_name) for volume_name in volume_names]
+    else:
+        pool = ThreadPool(workers)
+        try:
+            tagged = pool.map(is_tagged, volume_names)
+        finally:
+            pool.close()
+            pool.join()
+    return set(volume_name for volume_name, is_match
+               in zip(volume_names, tagged) if is_match)
+
+
+def get_volume_vluns(client_obj):
+    vluns = {}
+    for vlun in client_obj.getVLUNs():
+        vluns.setdefault(vlun.volume_name, []).append(vlun)
+    # Templates go first, removing one also removes its active VLUNs
+    for volume_vluns in vluns.values():
+        volume_vluns.sort(key=lambda vlun: bool(vlun.active))
+    return vluns
+
+
+def get_volume_set_names(client_obj):
+    volume_set_names = {}
+    for volume_set in client_obj.getVolumeSets():
+        for member in volume_set.setmembers or []:
+            volume_set_names.setdefault(member, []).append(volume_set.name)
+    return volume_set_names
+
+
+def unexport_vlun(client_obj, vlun):
+    port = None
+    if vlun.port_pos is not None:
+        port = {'node': vlun.port_pos.node,
+                'slot': vlun.port_pos.slot,
+                'cardPort': vlun.port_pos.card_port}
+    try:
+        client_obj.deleteVLUN(vlun.volume_name, vlun.lun, vlun.hostname, port)
+    except exceptions.HTTPNotFound:
+        # Already removed along with its template
+        pass
+
+
+def delete_volumes(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumes,
+        max_workers=1,
+        volume_pattern=None,
+        volume_tags=None,
+        unexport=False,
+        remove_from_sets=False):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Volume delete failed. Storage system username or password is \
+null",
+            {})
+    if not volumes and not volume_pattern and not volume_tags:
+        return (False, False, "Volume delete failed. Volumes is null", {})
+    volume_specs = get_volume_specs(volumes or [], {})
+    error = validate_volume_specs(volume_specs, "Volume delete")
+    if error:
+        return (False, False, error, {})
+
+    def delete_one(spec):
+        volume_name = spec['volume_name']
+        if existing is not None:
+            if volume_name not in existing:
+                return (False, "Volume does not exist")
+        elif not client_obj.volumeExists(volume_name):
+            return (False, "Volume does not exist")
+        if tagged is not None and volume_name not in tagged:
+            return (False, "Volume does not match volume_tags")
+        for vlun in vluns.get(volume_name, []):
+            unexport_vlun(client_obj, vlun)
+        for volume_set_name in volume_set_names.get(volume_name, []):
+            try:
+                client_obj.removeVolumeFromVolumeSet(
+                    volume_set_name, volume_name)
+            except exceptions.HTTPNotFound:
+                pass
+        client_obj.deleteVolume(volume_name)
+        return (True, "Deleted volume %s successfully." % volume_name)
+
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        existing = None
+        tagged = None
+        if volume_pattern or volume_tags:
+            # One volume list call selects the volumes to delete
+            volume_list = client_obj.getVolumes()
+            existing = [volume.name for volume in volume_list]
+            named = set(spec['volume_name'] for spec in volume_specs)
+            # Snapshots are only deleted by name, a match deleted in parallel
+            # with its parent would fail on the child it still has
+            base_volumes = [volume.name for volume in volume_list
+                            if volume.copy_type != VIRTUAL_COPY]
+            if volume_pattern:
+                matched = [volume_name for volume_name in base_volumes
+                           if fnmatch.fnmatchcase(volume_name, volume_pattern)]
+            elif not volume_specs:
+                matched = base_volumes
+            else:
+                matched = []
+            if volume_tags:
+                candidates = set(matched)
+                tagged = get_tagged_volumes(
+                    client_obj,
+                    [volume_name for volume_name in existing
+                     if volume_name in named or volume_name in candidates],
+                    volume_tags, max_workers)
+                # Only volumes asked for by name report a tag mismatch
+                matched = [volume_name for volume_name in matched
+                           if volume_name in tagged]
+            volume_specs += [{'volume_name': volume_name}
+                             for volume_name in matched
+                             if volume_name not in named]
+            existing = set(existing)
+        vluns = get_volume_vluns(client_obj) if unexport else {}
+        volume_set_names = (get_volume_set_names(client_obj)
+                            if remove_from_sets else {})
+        results = run_bulk_operation(delete_one, volume_specs, max_workers)
+    except Exception as e:
+        return (False, False, "Volume delete failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    return summarize_bulk_results(results, "Volume delete")
+
+
+def grow_volumes(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumes,
+        size,
+        size_unit,
+        to_size=False,
+        max_workers=1):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Grow volume failed. Storage system username or password is null",
+            {})
+    if not volumes:
+        return (False, False, "Grow volume failed. Volumes is null", {})
+    volume_specs = get_volume_specs(
+        volumes, {'size': size, 'size_unit': size_unit})
+    error = validate_volume_specs(
+        volume_specs, "Grow volume",
+        (('size', 'Volume size'), ('size_unit', 'Volume size_unit')))
+    if error:
+        return (False, False, error, {})
+
+    def grow_one(spec):
+        size_mib = convert_to_binary_multiple(spec['size'], spec['size_unit'])
+        if to_size:
+            current_size_mib = client_obj.getVolume(
+                spec['volume_name']).size_mib
+            if current_size_mib >= size_mib:
+                return (False, "Volume size already >= %s %s" %
+                        (spec['size'], spec['size_unit']))
+            size_mib = size_mib - current_size_mib
+        client_obj.growVolume(spec['volume_name'], size_mib)
+        return (True, "Grown volume %s successfully." % spec['volume_name'])
+
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        results = run_bulk_operation(grow_one, volume_specs, max_workers)
+    except Exception as e:
+        return (False, False, "Grow volume failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    return summarize_bulk_results(results, "Grow volume")
+
+
+def modify_volumes(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumes,
+        volume_mods,
+        max_workers=1):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Modify volume failed. Storage system username or password is \
+null",
+            {})
+    if not volumes:
+        return (False, False, "Modify volume failed. Volumes is null", {})
+    volume_specs = get_volume_specs(volumes, volume_mods)
+    error = validate_volume_specs(volume_specs, "Modify volume")
+    if error:
+        return (False, False, error, {})
+
+    def modify_one(spec):
+        client_obj.modifyVolume(
+            spec['volume_name'],
+            dict((wsapi_key, spec.get(option))
+                 for option, wsapi_key in MODIFY_VOLUME_OPTIONS))
+        return (True, "Modified Volume %s successfully." % spec['volume_name'])
+
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        results = run_bulk_operation(modify_one, volume_specs, max_workers)
+    except Exception as e:
+        return (False, False, "Modify Volume failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    return summarize_bulk_results(results, "Modify volume")
+
 def delete_volume(
         client_obj,
         storage_system_username,
@@ -530,14 +1133,11 @@ is null",
     try:
         client_obj.login(
             storage_system_username, storage_system_password)
-        if client_obj.volumeExists(
-                volume_name):
-            if client_obj.getVolume(
-                    volume_name).size_mib < convert_to_binary_multiple(
-                    size, size_unit):
-                client_obj.growVolume(volume_name, convert_to_binary_multiple(
-                    size, size_unit) - client_obj.getVolume(
-                    volume_name).size_mib)
+        volume = get_volume_or_none(client_obj, volume_name)
+        if volume is not None:
+            size_mib = convert_to_binary_multiple(size, size_unit)
+            if volume.size_mib < size_mib:
+                client_obj.growVolume(volume_name, size_mib - volume.size_mib)
             else:
                 return (
                     True,
@@ -586,8 +1186,9 @@ null",
         return (False, False, "Change snap CPG failed. Snap CPG is null", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        if client_obj.volumeExists(volume_name):
-            if client_obj.getVolume(volume_name).snap_cpg != snap_cpg:
+        volume = get_volume_or_none(client_obj, volume_name)
+        if volume is not None:
+            if volume.snap_cpg != snap_cpg:
                 snp_cpg = 2
                 task = client_obj.tuneVolume(
                     volume_name, snp_cpg, {
@@ -603,6 +1204,9 @@ null",
         return (False, False, "Change snap CPG failed | %s" % e, {})
     finally:
         client_obj.logout()
+    if not wait_for_task_to_end:
+        return (True, True, "Changing snap CPG to %s started." % snap_cpg,
+                {'task_id': task.task_id})
     return (True, True, "Changed snap CPG to %s successfully." % snap_cpg, {})
 
 
@@ -632,8 +1236,9 @@ null",
         return (False, False, "Change user CPG failed. Snap CPG is null", {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        if client_obj.volumeExists(volume_name):
-            if client_obj.getVolume(volume_name).user_cpg != cpg:
+        volume = get_volume_or_none(client_obj, volume_name)
+        if volume is not None:
+            if volume.user_cpg != cpg:
                 usr_cpg = 1
                 task = client_obj.tuneVolume(
                     volume_name, usr_cpg, {'userCPG': cpg})
@@ -647,9 +1252,32 @@ null",
         return (False, False, "Change user CPG failed | %s" % e, {})
     finally:
         client_obj.logout()
+    if not wait_for_task_to_end:
+        return (True, True, "Changing user CPG to %s started." % cpg,
+                {'task_id': task.task_id})
     return (True, True, "Changed user CPG to %s successfully." % cpg, {})
 
 
+def needs_type_conversion(volume, type, compression):
+    compression_state = volume.compression_state
+    if compression_state == 2 or compression_state == 3 or compression_state == 4 or compression_state is None:
+        compression_state = False
+    else:
+        compression_state = True
+    provisioning_type = volume.provisioning_type
+    if provisioning_type == 1:
+        volume_type = 'FPVV'
+    elif provisioning_type == 2:
+        volume_type = 'TPVV'
+    elif provisioning_type == 6:
+        volume_type = 'TDVV'
+    else:
+        volume_type = 'UNKNOWN'
+    return (volume_type != get_volume_type(type)[0] or
+            volume_type == 'UNKNOWN' or
+            (compression is not None and compression != compression_state))
+
+
 def convert_type(
         client_obj,
         storage_system_username,
@@ -689,25 +1317,9 @@ is null",
             {})
     try:
         client_obj.login(storage_system_username, storage_system_password)
-        compression_state = client_obj.getVolume(volume_name).compression_state
-        if compression_state == 2 or compression_state == 3 or compression_state == 4 or compression_state is None:
-            compression_state = False
-        else:
-            compression_state = True
-        provisioning_type = client_obj.getVolume(volume_name).provisioning_type
-        if provisioning_type == 1:
-            volume_type = 'FPVV'
-        elif provisioning_type == 2:
-            volume_type = 'TPVV'
-        elif provisioning_type == 6:
-            volume_type = 'TDVV'
-        else:
-            volume_type = 'UNKNOWN'
-
-        if client_obj.volumeExists(volume_name):
-            if (volume_type != get_volume_type(type)[0] or
-                    volume_type == 'UNKNOWN' or
-                    compression != compression_state):
+        volume = get_volume_or_none(client_obj, volume_name)
+        if volume is not None:
+            if needs_type_conversion(volume, type, compression):
                 new_vol_type = get_volume_type(type)[1]
                 usr_cpg = 1
                 optional = {'userCPG': cpg,
@@ -737,6 +1349,13 @@ is null",
         return (False, False, "Provisioning type change failed | %s" % e, {})
     finally:
         client_obj.logout()
+    if not wait_for_task_to_end:
+        return (
+            True,
+            True,
+            "Provisioning type change to %s started." %
+            type,
+            {'task_id': task.task_id})
     return (
         True,
         True,
@@ -804,6 +1423,134 @@ is null",
     return (True, True, "Modified Volume %s successfully." % volume_name, {})
 
 
+def converge_volume(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volume_name,
+        cpg,
+        size,
+        size_unit,
+        type,
+        compression,
+        snap_cpg,
+        volume_mods,
+        wait_for_task_to_end,
+        keep_vv,
+        staleSS=None,
+        zeroDetect=None):
+    """Brings the volume to the given shape with one getVolume and only the
+    calls needed, in order: create, modify, grow, snap CPG tune and user
+    CPG or type tune. volume_mods holds expiration_hours, retention_hours
+    and the *_pct allocation options; 0 leaves an option as it is, and
+    expiration and retention are only set on volumes without one.
+    """
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Converge volume failed. Storage system username or password is \
+null",
+            {})
+    if volume_name is None:
+        return (False, False, "Converge volume failed. Volume name is null",
+                {})
+    if len(volume_name) < 1 or len(volume_name) > 31:
+        return (False, False, "Converge volume failed. Volume name must be atleast 1 character and not more than 31 characters", {})
+    if cpg is None:
+        return (False, False, "Converge volume failed. Cpg is null", {})
+    if staleSS is not None:
+        staleSS = to_bool(staleSS)
+    if zeroDetect is not None:
+        zeroDetect = to_bool(zeroDetect)
+    size_mib = None
+    if size is not None:
+        size_mib = convert_to_binary_multiple(size, size_unit)
+    actions = []
+    task_ids = []
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        volume = get_volume_or_none(client_obj, volume_name)
+        if volume is None:
+            if size_mib is None:
+                return (False, False, "Converge volume failed. Volume size is null", {})
+            optional = get_create_volume_optional(
+                client_obj.getWsApiVersion().get('build', 0), type, snap_cpg,
+                staleSS, zeroDetect)
+            if compression:
+                optional['compression'] = compression
+            for option, wsapi_key in MODIFY_VOLUME_OPTIONS:
+                if volume_mods.get(option):
+                    optional[wsapi_key] = volume_mods[option]
+            client_obj.createVolume(volume_name, cpg, size_mib, optional)
+            return (True, True, "Created volume %s successfully." %
+                    volume_name, {'actions': ['create']})
+
+        mods = {}
+        if volume_mods.get('expiration_hours') and \
+                volume.expiration_time_sec is None:
+            mods['expirationHours'] = volume_mods['expiration_hours']
+        if volume_mods.get('retention_hours') and \
+                volume.retention_time_sec is None:
+            mods['retentionHours'] = volume_mods['retention_hours']
+        for option, wsapi_key in MODIFY_VOLUME_OPTIONS:
+            if option.endswith('_pct') and volume_mods.get(option) and \
+                    volume_mods[option] != getattr(volume, option):
+                mods[wsapi_key] = volume_mods[option]
+        # A volume without snapshot space gets its snap CPG set directly,
+        # existing snapshot space has to be moved by a tune
+        if snap_cpg is not None and volume.snap_cpg is None:
+            mods['snapCPG'] = snap_cpg
+        if mods:
+            client_obj.modifyVolume(volume_name, mods)
+            actions.append('modify')
+
+        if size_mib is not None and volume.size_mib < size_mib:
+            client_obj.growVolume(volume_name, size_mib - volume.size_mib)
+            actions.append('grow')
+
+        tune_snap_cpg = (snap_cpg is not None and
+                         volume.snap_cpg is not None and
+                         volume.snap_cpg != snap_cpg)
+        # A tune cannot turn compression on or off, it is only applied when
+        # the volume is created
+        convert = needs_type_conversion(volume, type, None)
+        if tune_snap_cpg:
+            task = client_obj.tuneVolume(volume_name, 2, {'snapCPG': snap_cpg})
+            # Only one tune can run on a volume at a time
+            if wait_for_task_to_end or convert or volume.user_cpg != cpg:
+                client_obj.waitForTaskToEnd(task.task_id)
+            else:
+                task_ids.append(task.task_id)
+            actions.append('change_snap_cpg')
+        if convert:
+            task = client_obj.tuneVolume(volume_name, 1, {
+                'userCPG': cpg,
+                'conversionOperation': get_volume_type(type)[1],
+                'keepVV': keep_vv})
+            actions.append('convert_type')
+        elif volume.user_cpg != cpg:
+            task = client_obj.tuneVolume(volume_name, 1, {'userCPG': cpg})
+            actions.append('change_user_cpg')
+        if convert or volume.user_cpg != cpg:
+            if wait_for_task_to_end:
+                client_obj.waitForTaskToEnd(task.task_id)
+            else:
+                task_ids.append(task.task_id)
+    except Exception as e:
+        return (False, bool(actions), "Converge volume failed | %s" % e,
+                {'actions': actions})
+    finally:
+        client_obj.logout()
+    if not actions:
+        return (True, False, "Volume %s already converged" % volume_name, {})
+    issue_attr_dict = {'actions': actions}
+    if task_ids:
+        issue_attr_dict['task_ids'] = task_ids
+    return (True, True, "Converged volume %s: %s." % (
+        volume_name, ", ".join(actions)), issue_attr_dict)
+
+
 def main():
 
     fields = {
@@ -817,7 +1564,8 @@ def main():
                         'change_snap_cpg',
                         'change_user_cpg',
                         'convert_type',
-                        'set_snap_cpg'
+                        'set_snap_cpg',
+                        'converged'
                         ],
             "type": 'str'
         },
@@ -836,9 +1584,29 @@ def main():
             "no_log": True
         },
         "volume_name": {
-            "required": True,
             "type": "str"
         },
+        "volumes": {
+            "type": "list"
+        },
+        "max_workers": {
+            "type": "int",
+            "default": 1
+        },
+        "volume_pattern": {
+            "type": "str"
+        },
+        "volume_tags": {
+            "type": "dict"
+        },
+        "unexport": {
+            "type": "bool",
+            "default": False
+        },
+        "remove_from_sets": {
+            "type": "bool",
+            "default": False
+        },
         "cpg": {
             "type": "str",
             "default": None
@@ -937,6 +1705,12 @@ def main():
     storage_system_password = module.params["storage_system_password"]
 
     volume_name = module.params["volume_name"]
+    volumes = module.params["volumes"]
+    max_workers = module.params["max_workers"]
+    volume_pattern = module.params["volume_pattern"]
+    volume_tags = module.params["volume_tags"]
+    unexport = module.params["unexport"]
+    remove_from_sets = module.params["remove_from_sets"]
     size = module.params["size"]
     size_unit = module.params["size_unit"]
     cpg = module.params["cpg"]
@@ -962,13 +1736,71 @@ def main():
     staleSS = module.params["staleSS"]
     zeroDetect = module.params["zeroDetect"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url, 'ansible_module_3par')
+    if volumes is not None and module.params["state"] not in (
+            'present', 'absent', 'grow', 'grow_to_size', 'modify'):
+        module.fail_json(msg='volumes is only supported with state present, '
+                             'absent, grow, grow_to_size and modify')
+    bulk_delete = bool(volume_pattern or volume_tags or unexport or
+                       remove_from_sets)
+    if bulk_delete and module.params["state"] != 'absent':
+        module.fail_json(msg='volume_pattern, volume_tags, unexport and '
+                             'remove_from_sets are only supported with state '
+                             'absent')
+    if volumes is None and volume_name is None and not (
+            volume_pattern or volume_tags):
+        module.fail_json(msg='one of volume_name, volumes, volume_pattern or '
+                             'volume_tags is required')
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password, 'ansible_module_3par')
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url, 'ansible_module_3par')
 
     # States
-    if module.params["state"] == "present":
+    if module.params["state"] == "present" and volumes is not None:
+        return_status, changed, msg, issue_attr_dict = create_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, cpg, size, size_unit, type, compression, snap_cpg,
+            staleSS, zeroDetect, max_workers)
+    elif module.params["state"] == "absent" and (
+            volumes is not None or bulk_delete):
+        if volumes is None:
+            volumes = [volume_name] if volume_name is not None else []
+        return_status, changed, msg, issue_attr_dict = delete_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, max_workers, volume_pattern, volume_tags, unexport,
+            remove_from_sets)
+    elif module.params["state"] == "grow" and volumes is not None:
+        return_status, changed, msg, issue_attr_dict = grow_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, size, size_unit, False, max_workers)
+    elif module.params["state"] == "grow_to_size" and volumes is not None:
+        return_status, changed, msg, issue_attr_dict = grow_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, size, size_unit, True, max_workers)
+    elif module.params["state"] == "modify" and volumes is not None:
+        return_status, changed, msg, issue_attr_dict = modify_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumes, {
+                'expiration_hours': expiration_hours,
+                'retention_hours': retention_hours,
+                'ss_spc_alloc_warning_pct': ss_spc_alloc_warning_pct,
+                'ss_spc_alloc_limit_pct': ss_spc_alloc_limit_pct,
+                'usr_spc_alloc_warning_pct': usr_spc_alloc_warning_pct,
+                'usr_spc_alloc_limit_pct': usr_spc_alloc_limit_pct,
+                'rm_ss_spc_alloc_warning': rm_ss_spc_alloc_warning,
+                'rm_usr_spc_alloc_warning': rm_usr_spc_alloc_warning,
+                'rm_exp_time': rm_exp_time,
+                'rm_usr_spc_alloc_limit': rm_usr_spc_alloc_limit,
+                'rm_ss_spc_alloc_limit': rm_ss_spc_alloc_limit},
+            max_workers)
+    elif module.params["state"] == "present":
         return_status, changed, msg, issue_attr_dict = create_volume(
             client_obj, storage_system_username, storage_system_password,
             volume_name, cpg, size, size_unit, type, compression, snap_cpg, staleSS, zeroDetect)
@@ -1011,12 +1843,25 @@ def main():
             client_obj, storage_system_username, storage_system_password,
             volume_name, None, None, None, None, None, None, None, None, None,
             None, None, None, None, snap_cpg)
+    elif module.params["state"] == "converged":
+        return_status, changed, msg, issue_attr_dict = converge_volume(
+            client_obj, storage_system_username, storage_system_password,
+            volume_name, cpg, size, size_unit, type, compression, snap_cpg, {
+                'expiration_hours': expiration_hours,
+                'retention_hours': retention_hours,
+                'ss_spc_alloc_warning_pct': ss_spc_alloc_warning_pct,
+                'ss_spc_alloc_limit_pct': ss_spc_alloc_limit_pct,
+                'usr_spc_alloc_warning_pct': usr_spc_alloc_warning_pct,
+                'usr_spc_alloc_limit_pct': usr_spc_alloc_limit_pct},
+            wait_for_task_to_end, keep_vv, staleSS, zeroDetect)
 
     if return_status:
         if issue_attr_dict:
             module.exit_json(changed=changed, msg=msg, issue=issue_attr_dict)
         else:
             module.exit_json(changed=changed, msg=msg)
+    elif issue_attr_dict:
+        module.fail_json(msg=msg, issue=issue_attr_dict)
     else:
         module.fail_json(msg=msg)
 
@@ -31,9 +31,16 @@ DOCUMENTATION = r'''
 ---
 author: "Hewlett Packard Enterprise (ecostor@groups.ext.hpe.com )"
 description: "On HPE Alletra 9000 and Primera and 3PAR - Create Volume Set - Add Volumes to Volume
- Set - Remove Volumes from Volume Set"
+ Set - Remove Volumes from Volume Set - Set the exact members of a Volume Set"
 module: hpe3par_volumeset
 options:
+  batch_size:
+    default: 500
+    description:
+      - "Maximum number of volumes added or removed in one request with state
+       exact."
+    required: false
+    type: int
   domain:
     description:
       - "The domain in which the VV set or host set will be created."
@@ -41,7 +48,8 @@ options:
   setmembers:
     description:
       - "The virtual volume to be added to the set.\nRequired with action
-       add_volumes, remove_volumes\n"
+       add_volumes, remove_volumes, exact. With exact, volumes in the set that
+       are not listed are removed and an empty list empties the set\n"
     required: false
   state:
     choices:
@@ -49,9 +57,12 @@ options:
       - absent
       - add_volumes
       - remove_volumes
+      - exact
     description:
       - "Whether the specified Volume Set should exist or not. State also
-       provides actions to add or remove volumes from volume set\n"
+       provides actions to add or remove volumes from volume set. exact
+       creates the volume set if needed and makes setmembers its only
+       members, it requires the hpe3par_util module_utils\n"
     required: true
   volumeset_name:
     description:
@@ -107,6 +118,16 @@ EXAMPLES = r'''
         volumeset_name="{{ volumeset_name }}"
         setmembers="{{ remove_vol_setmembers }}"
 
+    - name: Set the members of Volumeset "{{ volumeset_name }}"
+      hpe3par_volumeset:
+        storage_system_ip="{{ storage_system_ip }}"
+        storage_system_username="{{ storage_system_username }}"
+        storage_system_password="{{ storage_system_password }}"
+        state=exact
+        volumeset_name="{{ volumeset_name }}"
+        setmembers="{{ add_vol_setmembers2 }}"
+        batch_size=100
+
     - name: Delete Volumeset "{{ volumeset_name }}"
       hpe3par_volumeset:
         storage_system_ip="{{ storage_system_ip }}"
@@ -124,6 +145,17 @@ try:
     from hpe3par_sdk import client
 except ImportError:
     client = None
+try:
+    from hpe3parclient import exceptions
+except ImportError:
+    exceptions = None
+try:
+    from ansible.module_utils import hpe3par_util
+except ImportError:
+    hpe3par_util = None
+
+# Default for batch_size, volumes sent in one add/remove set members request
+MAX_SET_MEMBERS_PER_REQUEST = 500
 
 
 def create_volumeset(
@@ -323,11 +355,83 @@ do." %
     return (True, True, "Removed volumes successfully.", {})
 
 
+def set_volumes(
+        client_obj,
+        storage_system_username,
+        storage_system_password,
+        volumeset_name,
+        domain,
+        setmembers,
+        batch_size=MAX_SET_MEMBERS_PER_REQUEST):
+    if storage_system_username is None or storage_system_password is None:
+        return (
+            False,
+            False,
+            "Set volumeset members failed. Storage system username or \
+password is null",
+            {})
+    if volumeset_name is None:
+        return (
+            False,
+            False,
+            "Set volumeset members failed. Volumeset name is null",
+            {})
+    if len(volumeset_name) < 1 or len(volumeset_name) > 27:
+        return (False, False, "Volume Set create failed. Volume Set name must be atleast 1 character and not more than 27 characters", {})
+    if setmembers is None:
+        return (
+            False,
+            False,
+            "Set volumeset members failed. Setmembers is null",
+            {})
+    if batch_size is None or batch_size < 1:
+        return (
+            False,
+            False,
+            "Set volumeset members failed. Batch size must be at least 1",
+            {})
+    try:
+        client_obj.login(storage_system_username, storage_system_password)
+        try:
+            existing_set_members = client_obj.getVolumeSet(
+                volumeset_name).setmembers or []
+        except exceptions.HTTPNotFound:
+            existing_set_members = None
+        wanted_set_members, new_set_members, old_set_members = (
+            hpe3par_util.diff_set_members(existing_set_members, setmembers))
+        if existing_set_members is None:
+            client_obj.createVolumeSet(
+                volumeset_name, domain, None,
+                new_set_members[:batch_size] or None)
+            new_set_members = new_set_members[batch_size:]
+        elif not new_set_members and not old_set_members:
+            return (
+                True,
+                False,
+                "Volume set %s already has the given members. Nothing \
+to do." % volumeset_name,
+                {})
+        for chunk in hpe3par_util.get_chunks(old_set_members, batch_size):
+            client_obj.removeVolumesFromVolumeSet(volumeset_name, chunk)
+        for chunk in hpe3par_util.get_chunks(new_set_members, batch_size):
+            client_obj.addVolumesToVolumeSet(volumeset_name, chunk)
+    except Exception as e:
+        return (False, False, "Set volumeset members failed | %s" % e, {})
+    finally:
+        client_obj.logout()
+    if existing_set_members is None:
+        return (True, True, "Created volume set %s with %s volume(s)." %
+                (volumeset_name, len(wanted_set_members)), {})
+    return (True, True, "Set volumes successfully. Added %s, removed %s." %
+            (len(new_set_members), len(old_set_members)), {})
+
+
 def main():
     fields = {
         "state": {
             "required": True,
-            "choices": ['present', 'absent', 'add_volumes', 'remove_volumes'],
+            "choices": ['present', 'absent', 'add_volumes', 'remove_volumes',
+                        'exact'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -353,6 +457,10 @@ def main():
         },
         "setmembers": {
             "type": "list"
+        },
+        "batch_size": {
+            "type": "int",
+            "default": MAX_SET_MEMBERS_PER_REQUEST
         }
     }
     module = AnsibleModule(argument_spec=fields)
@@ -366,11 +474,22 @@ def main():
     volumeset_name = module.params["volumeset_name"]
     domain = module.params["domain"]
     setmembers = module.params["setmembers"]
+    batch_size = module.params["batch_size"]
 
-    port_number = client.HPE3ParClient.getPortNumber(
-        storage_system_ip, storage_system_username, storage_system_password)
-    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
-    client_obj = client.HPE3ParClient(wsapi_url)
+    if module.params["state"] == "exact" and hpe3par_util is None:
+        module.fail_json(msg='the hpe3par_util module_utils is required with '
+                             'state exact')
+
+    if hpe3par_util is not None:
+        client_obj = hpe3par_util.get_client(
+            client.HPE3ParClient, storage_system_ip, storage_system_username,
+            storage_system_password)
+    else:
+        port_number = client.HPE3ParClient.getPortNumber(
+            storage_system_ip, storage_system_username,
+            storage_system_password)
+        wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+        client_obj = client.HPE3ParClient(wsapi_url)
 
     # States
     if module.params["state"] == "present":
@@ -389,6 +508,10 @@ def main():
         return_status, changed, msg, issue_attr_dict = remove_volumes(
             client_obj, storage_system_username, storage_system_password,
             volumeset_name, setmembers)
+    elif module.params["state"] == "exact":
+        return_status, changed, msg, issue_attr_dict = set_volumes(
+            client_obj, storage_system_username, storage_system_password,
+            volumeset_name, domain, setmembers, batch_size)
 
     if return_status:
         if issue_attr_dict:
@@ -0,0 +1,185 @@
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import mock
+from Modules import hpe3par_capacity_report
+from hpe3par_sdk.models import VirtualVolume
+import unittest
+
+
+class TestHpe3parCapacityReport(unittest.TestCase):
+
+    PARAMS = {'storage_system_ip': '192.168.0.1', 'storage_system_username': 'USER',
+              'storage_system_password': 'PASS', 'group_by': ['cpg', 'domain'], 'tag_keys': ['type'],
+              'max_workers': 8}
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "group_by": {
+            "type": "list",
+            "default": ['cpg', 'domain'],
+            "choices": ['cpg', 'domain', 'tag']
+        },
+        "tag_keys": {
+            "type": "list",
+            "default": ['type']
+        },
+        "max_workers": {
+            "type": "int",
+            "default": 8
+        }
+    }
+
+    VOLUMES = [
+        # Thin, 10 GiB provisioned, 2 GiB reserved
+        VirtualVolume({'name': 'vol_1', 'userCPG': 'cpg_1', 'domain': 'dom_1', 'provisioningType': 2,
+                       'compressionState': 2, 'sizeMiB': 10240, 'totalReservedMiB': 2048,
+                       'totalUsedMiB': 1536, 'hostWriteMiB': 1024, 'userSpace': {'usedMiB': 1024}}),
+        # Dedupe and compressed, 4 GiB written stored in 1 GiB
+        VirtualVolume({'name': 'vol_2', 'userCPG': 'cpg_1', 'provisioningType': 6,
+                       'compressionState': 1, 'sizeMiB': 8192, 'totalReservedMiB': 2048,
+                       'totalUsedMiB': 1024, 'hostWriteMiB': 4096, 'userSpace': {'usedMiB': 1024}}),
+        # Full
+        VirtualVolume({'name': 'vol_3', 'userCPG': 'cpg_2', 'domain': 'dom_1', 'provisioningType': 1,
+                       'sizeMiB': 4096, 'totalReservedMiB': 4096, 'totalUsedMiB': 4096}),
+        # Snapshots are not counted
+        VirtualVolume({'name': 'vol_1_snap', 'userCPG': 'cpg_1', 'provisioningType': 3, 'sizeMiB': 10240}),
+    ]
+
+    TOTAL = {'volumes': 3, 'thin_volumes': 1, 'dedupe_volumes': 1, 'compressed_volumes': 1,
+             'provisioned_mib': 22528, 'reserved_mib': 8192, 'used_mib': 6656, 'written_mib': 5120,
+             'thin_saved_mib': 14336, 'reduction_saved_mib': 3072}
+
+    def get_tags(self, name):
+        if name == 'vol_3':
+            return {'total': 0, 'members': []}
+        return {'total': 2, 'members': [{'key': 'type', 'value': 'ansible-3par-client'},
+                                        {'key': 'owner', 'value': name}]}
+
+    @mock.patch('Modules.hpe3par_capacity_report.client')
+    @mock.patch('Modules.hpe3par_capacity_report.AnsibleModule')
+    def test_module_args(self, mock_module, mock_client):
+        """
+        hpe3par capacity report - test module arguments
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        hpe3par_capacity_report.main()
+        mock_module.assert_called_with(
+            argument_spec=self.fields)
+
+    @mock.patch('Modules.hpe3par_capacity_report.client')
+    @mock.patch('Modules.hpe3par_capacity_report.AnsibleModule')
+    @mock.patch('Modules.hpe3par_capacity_report.build_capacity_report')
+    def test_main_exit_functionality_success(self, mock_build_capacity_report, mock_module, mock_client):
+        """
+        hpe3par capacity report - exit success check
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        mock_build_capacity_report.return_value = (
+            True, False, "Capacity report of 3 volume(s) built successfully.", {'total': self.TOTAL})
+        hpe3par_capacity_report.main()
+        mock_build_capacity_report.assert_called_with(mock.ANY, 'USER', 'PASS', ['cpg', 'domain'], ['type'], 8)
+        mock_module.exit_json.assert_called_with(
+            changed=False, msg="Capacity report of 3 volume(s) built successfully.",
+            report={'total': self.TOTAL})
+
+    @mock.patch('Modules.hpe3par_capacity_report.np', None)
+    @mock.patch('Modules.hpe3par_capacity_report.client')
+    def test_build_capacity_report(self, mock_client):
+        """
+        hpe3par capacity report - build_capacity_report without NumPy
+        """
+        mock_client.HPE3ParClient.getVolumes.return_value = self.VOLUMES
+        mock_client.HPE3ParClient.getAllVolumeMetaData.side_effect = self.get_tags
+        return_status, changed, msg, report = hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['cpg', 'domain', 'tag'], ['type'], 4)
+        self.assertEqual((return_status, changed, msg),
+                         (True, False, "Capacity report of 3 volume(s) built successfully."))
+        self.assertEqual(report['total'], self.TOTAL)
+        self.assertEqual(sorted(report['cpg']), ['cpg_1', 'cpg_2'])
+        self.assertEqual(report['cpg']['cpg_1']['volumes'], 2)
+        self.assertEqual(report['cpg']['cpg_1']['thin_saved_mib'], 14336)
+        self.assertEqual(report['cpg']['cpg_2']['thin_saved_mib'], 0)
+        self.assertEqual(sorted(report['domain']), ['-', 'dom_1'])
+        self.assertEqual(report['domain']['-']['reduction_saved_mib'], 3072)
+        # Only the tag_keys are grouped by, untagged volumes are left out
+        self.assertEqual(list(report['tag']), ['type=ansible-3par-client'])
+        self.assertEqual(report['tag']['type=ansible-3par-client']['provisioned_mib'], 18432)
+        # One volume list call, one metadata call per base volume
+        self.assertEqual(mock_client.HPE3ParClient.getVolumes.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.getAllVolumeMetaData.call_count, 3)
+        mock_client.HPE3ParClient.login.assert_called_once_with('USER', 'PASS')
+        mock_client.HPE3ParClient.logout.assert_called_once_with()
+
+    @unittest.skipIf(hpe3par_capacity_report.np is None, 'numpy is not installed')
+    @mock.patch('Modules.hpe3par_capacity_report.client')
+    def test_build_capacity_report_numpy(self, mock_client):
+        """
+        hpe3par capacity report - NumPy and plain Python give the same report
+        """
+        mock_client.HPE3ParClient.getVolumes.return_value = self.VOLUMES
+        mock_client.HPE3ParClient.getAllVolumeMetaData.side_effect = self.get_tags
+        report = hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['cpg', 'domain', 'tag'], ['type', 'owner'], 4)
+        with mock.patch('Modules.hpe3par_capacity_report.np', None):
+            self.assertEqual(hpe3par_capacity_report.build_capacity_report(
+                mock_client.HPE3ParClient, 'USER', 'PASS', ['cpg', 'domain', 'tag'], ['type', 'owner'], 4),
+                report)
+
+    @mock.patch('Modules.hpe3par_capacity_report.client')
+    def test_build_capacity_report_empty(self, mock_client):
+        """
+        hpe3par capacity report - no volume and invalid input
+        """
+        mock_client.HPE3ParClient.getVolumes.return_value = []
+        return_status, changed, msg, report = hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['cpg'], ['type'], 8)
+        self.assertEqual(msg, "Capacity report of 0 volume(s) built successfully.")
+        self.assertEqual(report, {'total': dict((metric, 0) for metric in hpe3par_capacity_report.METRICS),
+                                  'cpg': {}})
+
+        mock_client.HPE3ParClient.getVolumes.side_effect = Exception('Connection refused')
+        self.assertEqual(hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['cpg'], ['type'], 8),
+            (False, False, "Capacity report failed | Connection refused", {}))
+        self.assertEqual(hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, None, None, ['cpg'], ['type'], 8),
+            (False, False, "Capacity report failed. Storage system username or password is null", {}))
+        self.assertEqual(hpe3par_capacity_report.build_capacity_report(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['tag'], [], 8),
+            (False, False, "Capacity report failed. Tag keys is null", {}))
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -0,0 +1,177 @@
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import mock
+from Modules import hpe3par_facts as facts
+from hpe3par_sdk.models import VirtualVolume, Host, VLUN, CPG
+import unittest
+
+
+class TestHpe3parFacts(unittest.TestCase):
+
+    PARAMS = {'storage_system_ip': '192.168.0.1', 'storage_system_username': 'USER',
+              'storage_system_password': 'PASS', 'gather_subset': ['all'], 'cache_ttl': 0}
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "gather_subset": {
+            "type": "list",
+            "default": ['all'],
+            "choices": ['all', 'volumes', 'hosts', 'host_sets', 'volume_sets', 'vluns', 'cpgs', 'qos_rules']
+        },
+        "cache_ttl": {
+            "type": "int",
+            "default": 0
+        }
+    }
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    @mock.patch('Modules.hpe3par_facts.AnsibleModule')
+    def test_module_args(self, mock_module, mock_client):
+        """
+        hpe3par facts - test module arguments
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        facts.main()
+        mock_module.assert_called_with(
+            argument_spec=self.fields)
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    @mock.patch('Modules.hpe3par_facts.AnsibleModule')
+    @mock.patch('Modules.hpe3par_facts.gather_facts')
+    def test_main_exit_functionality_success(self, mock_gather_facts, mock_module, mock_client):
+        """
+        hpe3par facts - success check
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        mock_gather_facts.return_value = (True, False, "Gathered volumes successfully.", {'volumes': {}})
+        facts.main()
+        mock_module.exit_json.assert_called_with(
+            changed=False, msg="Gathered volumes successfully.", ansible_facts={'hpe3par': {'volumes': {}}})
+        self.assertEqual(mock_module.fail_json.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    @mock.patch('Modules.hpe3par_facts.AnsibleModule')
+    @mock.patch('Modules.hpe3par_facts.gather_facts')
+    def test_main_exit_functionality_fail(self, mock_gather_facts, mock_module, mock_client):
+        """
+        hpe3par facts - exit fail check
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        mock_gather_facts.return_value = (False, False, "Gather facts failed", {})
+        facts.main()
+        mock_module.fail_json.assert_called_with(msg="Gather facts failed")
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    @mock.patch('Modules.hpe3par_facts.AnsibleModule')
+    @mock.patch('Modules.hpe3par_facts.gather_facts')
+    @mock.patch('Modules.hpe3par_facts.hpe3par_util')
+    def test_main_exit_functionality_cached(self, mock_hpe3par_util, mock_gather_facts, mock_module, mock_client):
+        """
+        hpe3par facts - facts served from the cache
+        """
+        params = dict(self.PARAMS, cache_ttl=300)
+        mock_module.params = params
+        mock_module.return_value = mock_module
+        mock_hpe3par_util.read_cache.return_value = {'volumes': {}}
+        facts.main()
+        mock_module.exit_json.assert_called_with(
+            changed=False, msg="Gathered facts from cache.", ansible_facts={'hpe3par': {'volumes': {}}})
+        self.assertEqual(mock_gather_facts.call_count, 0)
+        self.assertEqual(mock_client.HPE3ParClient.getPortNumber.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    def test_gather_facts(self, mock_client):
+        """
+        hpe3par facts - gather_facts
+        """
+        mock_client.HPE3ParClient.getVolumes.return_value = [
+            VirtualVolume({'name': 'vol1', 'sizeMiB': 1024, 'userSpace': {'usedMiB': 10}}),
+            VirtualVolume({'name': 'vol2', 'sizeMiB': 2048})]
+        mock_client.HPE3ParClient.getVLUNs.return_value = [
+            VLUN({'volumeName': 'vol1', 'lun': 1, 'hostname': 'host1'}),
+            VLUN({'volumeName': 'vol1', 'lun': 1, 'hostname': 'host2'})]
+        result = facts.gather_facts(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['volumes', 'vluns'])
+
+        self.assertEqual(result[:3], (True, False, "Gathered volumes, vluns successfully."))
+        self.assertEqual(sorted(result[3]), ['vluns', 'volumes'])
+        self.assertEqual(result[3]['volumes']['vol2']['size_mib'], 2048)
+        self.assertEqual(result[3]['volumes']['vol1']['user_space']['used_MiB'], 10)
+        self.assertEqual([vlun['hostname'] for vlun in result[3]['vluns']['vol1']], ['host1', 'host2'])
+        self.assertEqual(mock_client.HPE3ParClient.getHosts.call_count, 0)
+        mock_client.HPE3ParClient.login.assert_called_once_with('USER', 'PASS')
+        mock_client.HPE3ParClient.logout.assert_called_once_with()
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    def test_gather_facts_all(self, mock_client):
+        """
+        hpe3par facts - gather_facts all subsets
+        """
+        mock_client.HPE3ParClient.getHosts.return_value = [Host({'name': 'host1', 'FCPaths': [{'wwn': '1000000000000001'}]})]
+        mock_client.HPE3ParClient.getCPGs.return_value = [CPG({'name': 'FC_r1'})]
+        result = facts.gather_facts(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['all'])
+
+        self.assertTrue(result[0])
+        self.assertEqual(sorted(result[3]), ['cpgs', 'host_sets', 'hosts', 'qos_rules', 'vluns', 'volume_sets', 'volumes'])
+        self.assertEqual(result[3]['hosts']['host1']['fcpaths'][0]['wwn'], '1000000000000001')
+        self.assertEqual(list(result[3]['cpgs']), ['FC_r1'])
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    def test_gather_facts_username_empty(self, mock_client):
+        """
+        hpe3par facts - gather_facts username empty
+        """
+        result = facts.gather_facts(
+            mock_client.HPE3ParClient, None, None, ['all'])
+        self.assertEqual(result, (
+            False, False, "Gather facts failed. Storage system username or password is null", {}))
+
+    @mock.patch('Modules.hpe3par_facts.client')
+    def test_gather_facts_exception(self, mock_client):
+        """
+        hpe3par facts - gather_facts exception
+        """
+        mock_client.HPE3ParClient.getVolumes.side_effect = Exception("Failed to get volumes!")
+        result = facts.gather_facts(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['volumes'])
+        self.assertEqual(result, (
+            False, False, "Gather facts failed | Failed to get volumes!", {}))
+        mock_client.HPE3ParClient.logout.assert_called_once_with()
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
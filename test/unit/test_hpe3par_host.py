@@ -755,7 +755,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - add_fc_path_to_host
         """
-        object_hash = {'name': 'hostname'}
+        object_hash = {'name': 'hostname', 'FCPaths': [{'wwn': 'wwn.333'}, {'wwn': 'wwn.222'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         wwn_list = ['wwn.333', 'wwn.222']
@@ -771,7 +771,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - add_fc_path_to_host
         """
-        object_hash = {'name': 'other_hostname'}
+        object_hash = {'name': 'other_hostname', 'FCPaths': [{'wwn': 'wwn.111'}, {'wwn': 'wwn.000'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         wwn_list = ['wwn.111', 'wwn.000']
@@ -781,6 +781,25 @@ class TestHpe3parHost(unittest.TestCase):
         self.assertEqual(result, (
             False, False, "FC path(s) wwn.111, wwn.000 already assigned to other host", {}))
 
+    @mock.patch('Modules.hpe3par_host.client')
+    @mock.patch('Modules.hpe3par_host.HPE3ParClient')
+    def test_add_FC_single_query(self, mock_HPE3ParClient, mock_client):
+        """
+        hpe3par host - add_fc_path_to_host
+        """
+        host_obj = Host({'name': 'hostname', 'FCPaths': [{'wwn': '1000000000000001'}]})
+        mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
+        mock_HPE3ParClient.HOST_EDIT_ADD = 1
+        wwn_list = ['10:00:00:00:00:00:00:01', '1000000000000002', '1000000000000003']
+        result = host.add_fc_path_to_host(
+            mock_client.HPE3ParClient, "user", "pass", "hostname", wwn_list)
+
+        self.assertEqual(result, (
+            True, True, "Added FC path(s) 1000000000000002, 1000000000000003 to host successfully.", {}))
+        mock_client.HPE3ParClient.queryHost.assert_called_once_with(iqns=None, wwns=wwn_list)
+        mock_client.HPE3ParClient.modifyHost.assert_called_once_with(
+            'hostname', {'pathOperation': 1, 'FCWWNs': ['1000000000000002', '1000000000000003']})
+
     # Remove FC
     @mock.patch('Modules.hpe3par_host.client')
     def test_remove_fc_username_empty(self, mock_client):
@@ -830,7 +849,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - remove_fc_path_from_host
         """
-        object_hash = {'name': 'hostname'}
+        object_hash = {'name': 'hostname', 'FCPaths': [{'wwn': 'fc_wwn'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         mock_HPE3ParClient.HOST_EDIT_REMOVE = 1
@@ -873,7 +892,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - remove_fc_path_from_host
         """
-        object_hash = {'name': 'other_hostname'}
+        object_hash = {'name': 'other_hostname', 'FCPaths': [{'wwn': 'wwn.111'}, {'wwn': 'wwn.000'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         wwn_list = ['wwn.111', 'wwn.000']
@@ -959,7 +978,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - add_iscsi_path_to_host
         """
-        object_hash = {'name': 'hostname'}
+        object_hash = {'name': 'hostname', 'iSCSIPaths': [{'name': 'iqn.333'}, {'name': 'iqn.222'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         iqn_list = ['iqn.333', 'iqn.222']
@@ -975,7 +994,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - add_iscsi_path_to_host
         """
-        object_hash = {'name': 'other_hostname'}
+        object_hash = {'name': 'other_hostname', 'iSCSIPaths': [{'name': 'iqn.111'}, {'name': 'iqn.000'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         iqn_list = ['iqn.111', 'iqn.000']
@@ -1034,7 +1053,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - remove_iscsi_path_from_host
         """
-        object_hash = {'name': 'hostname'}
+        object_hash = {'name': 'hostname', 'iSCSIPaths': [{'name': 'iscsi_iqn'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         mock_HPE3ParClient.HOST_EDIT_REMOVE = 1
@@ -1077,7 +1096,7 @@ class TestHpe3parHost(unittest.TestCase):
         """
         hpe3par host - remove_iscsi_path_from_host
         """
-        object_hash = {'name': 'other_hostname'}
+        object_hash = {'name': 'other_hostname', 'iSCSIPaths': [{'name': 'iqn.111'}, {'name': 'iqn.000'}]}
         host_obj = Host(object_hash)
         mock_client.HPE3ParClient.queryHost.return_value = [host_obj]
         iqn_list = ['iqn.111', 'iqn.000']
@@ -18,6 +18,8 @@
 
 import mock
 from Modules import hpe3par_hostset as hostset
+from utils import hpe3par_util
+from hpe3parclient import exceptions
 import unittest
 
 
@@ -25,12 +27,13 @@ class TestHpe3parhostset(unittest.TestCase):
 
     PARAMS_FOR_PRESENT = {'state': 'present', 'storage_system_username': 'USER',
                           'storage_system_ip': '192.168.0.1', 'storage_system_password': 'PASS',
-                          'hostset_name': 'hostset', 'domain': 'domain', 'setmembers': 'new'}
+                          'hostset_name': 'hostset', 'domain': 'domain', 'setmembers': 'new', 'batch_size': 500}
 
     fields = {
         "state": {
             "required": True,
-            "choices": ['present', 'absent', 'add_hosts', 'remove_hosts'],
+            "choices": ['present', 'absent', 'add_hosts', 'remove_hosts',
+                        'exact'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -56,6 +59,10 @@ class TestHpe3parhostset(unittest.TestCase):
         },
         "setmembers": {
             "type": "list"
+        },
+        "batch_size": {
+            "type": "int",
+            "default": 500
         }
     }
 
@@ -544,5 +551,112 @@ class TestHpe3parhostset(unittest.TestCase):
         self.assertEqual(instance.fail_json.call_count, 0)
 
 
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util')
+    @mock.patch('Modules.hpe3par_hostset.client')
+    @mock.patch('Modules.hpe3par_hostset.AnsibleModule')
+    @mock.patch('Modules.hpe3par_hostset.set_hosts')
+    def test_main_exit_functionality_success_without_issue_attr_dict_exact(self, mock_hostset, mock_module, mock_client, mock_util):
+        """
+        hpe3par hostset - success check
+        """
+        mock_module.params = dict(self.PARAMS_FOR_PRESENT, state='exact', batch_size=2)
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        mock_hostset.return_value = (
+            True, True, "Set hosts successfully. Added 1, removed 0.", {})
+        hostset.main()
+        mock_hostset.assert_called_once_with(
+            mock_util.get_client.return_value, 'USER', 'PASS', 'hostset', 'domain', 'new', 2)
+        instance.exit_json.assert_called_with(
+            changed=True, msg="Set hosts successfully. Added 1, removed 0.")
+        self.assertEqual(instance.fail_json.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util', None)
+    @mock.patch('Modules.hpe3par_hostset.client')
+    @mock.patch('Modules.hpe3par_hostset.AnsibleModule')
+    def test_main_exact_without_hpe3par_util(self, mock_module, mock_client):
+        """
+        hpe3par hostset - state exact needs the hpe3par_util module_utils
+        """
+        mock_module.params = dict(self.PARAMS_FOR_PRESENT, state='exact', batch_size=2)
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        instance.fail_json.side_effect = SystemExit
+        self.assertRaises(SystemExit, hostset.main)
+        instance.fail_json.assert_called_once_with(
+            msg='the hpe3par_util module_utils is required with state exact')
+
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_hostset.client')
+    def test_set_hosts_batch_size_invalid(self, mock_client):
+        """
+        hpe3par hostset - set the members of a hostset
+        """
+        result = hostset.set_hosts(
+            mock_client, "user", "pass", "hostset", None, ["host1"], 0)
+        self.assertEqual(result, (
+            False,
+            False,
+            "Set hostset members failed. Batch size must be at least 1",
+            {}))
+
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_hostset.client')
+    def test_set_hosts_diff_chunked(self, mock_client):
+        """
+        hpe3par hostset - set the members of a hostset
+        """
+        mock_client.HPE3ParClient.getHostSet.return_value.setmembers = [
+            "host1", "host2", "host3", "host4"]
+        result = hostset.set_hosts(
+            mock_client.HPE3ParClient, "user", "pass", "hostset", None,
+            ["host4", "host5", "host6", "host7"], 2)
+        self.assertEqual(
+            result, (True, True, "Set hosts successfully. Added 3, removed 3.", {}))
+        mock_client.HPE3ParClient.getHostSet.assert_called_once_with("hostset")
+        self.assertEqual(
+            [call[0][1] for call in mock_client.HPE3ParClient.removeHostsFromHostSet.call_args_list],
+            [["host1", "host2"], ["host3"]])
+        self.assertEqual(
+            [call[0][1] for call in mock_client.HPE3ParClient.addHostsToHostSet.call_args_list],
+            [["host5", "host6"], ["host7"]])
+
+        result = hostset.set_hosts(
+            mock_client.HPE3ParClient, "user", "pass", "hostset", None,
+            ["host4", "host3", "host2", "host1"])
+        self.assertEqual(
+            result, (True, False, "Host set hostset already has the given members. Nothing to do.", {}))
+
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_hostset.client')
+    def test_set_hosts_create(self, mock_client):
+        """
+        hpe3par hostset - set the members of a hostset that does not exist
+        """
+        mock_client.HPE3ParClient.getHostSet.side_effect = exceptions.HTTPNotFound()
+        result = hostset.set_hosts(
+            mock_client.HPE3ParClient, "user", "pass", "hostset", "domain",
+            ["host1", "host2", "host3"], 2)
+        self.assertEqual(
+            result, (True, True, "Created host set hostset with 3 host(s).", {}))
+        mock_client.HPE3ParClient.createHostSet.assert_called_once_with(
+            "hostset", "domain", None, ["host1", "host2"])
+        mock_client.HPE3ParClient.addHostsToHostSet.assert_called_once_with(
+            "hostset", ["host3"])
+
+    @mock.patch('Modules.hpe3par_hostset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_hostset.client')
+    def test_set_hosts_exception(self, mock_client):
+        """
+        hpe3par hostset - set the members of a hostset
+        """
+        mock_client.HPE3ParClient.login.side_effect = Exception(
+            "Failed to login!")
+        result = hostset.set_hosts(
+            mock_client.HPE3ParClient, "user", "pass", "hostset", None, ["host1"])
+        self.assertEqual(
+            result, (False, False, "Set hostset members failed | Failed to login!", {}))
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
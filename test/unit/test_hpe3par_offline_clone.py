@@ -19,6 +19,8 @@
 import mock
 import unittest
 from Modules import hpe3par_offline_clone
+from utils import hpe3par_util
+from hpe3parclient import exceptions
 from ansible.module_utils.basic import AnsibleModule
 
 
@@ -45,9 +47,28 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             "no_log": True
         },
         "clone_name": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
+        "clones": {
+            "required": False,
+            "type": "list"
+        },
+        "max_tasks": {
+            "required": False,
+            "type": "int",
+            "default": 4
+        },
+        "wait": {
+            "required": False,
+            "type": "bool",
+            "default": False
+        },
+        "timeout": {
+            "required": False,
+            "type": "int",
+            "default": 3600
+        },
         "base_volume_name": {
             "required": False,
             "type": "str"
@@ -88,6 +109,10 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             'save_snapshot': False,
             'priority': 'MEDIUM',
             'skip_zero': False,
+            'clones': None,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
             'state': 'present'
         }
 
@@ -115,6 +140,10 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             'save_snapshot': False,
             'priority': 'MEDIUM',
             'skip_zero': False,
+            'clones': None,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
             'state': 'present'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -130,6 +159,52 @@ class TestHpe3parOfflineClone(unittest.TestCase):
         # AnsibleModule.fail_json should not be called
         self.assertEqual(instance.fail_json.call_count, 0)
 
+    @mock.patch('Modules.hpe3par_offline_clone.client')
+    @mock.patch('Modules.hpe3par_offline_clone.AnsibleModule')
+    @mock.patch('Modules.hpe3par_offline_clone.create_offline_clones')
+    def test_main_exit_present_clones(self, mock_create_offline_clones, mock_module, mock_client):
+        """
+        hpe3par offline clone - bulk create failure check
+        """
+        clones = [{'clone_name': 'clone1', 'base_volume_name': 'vol1'},
+                  {'clone_name': 'clone2', 'base_volume_name': 'vol2'}]
+        PARAMS_FOR_PRESENT = {
+            'storage_system_ip': '192.168.0.1',
+            'storage_system_name': '3PAR',
+            'storage_system_username': 'USER',
+            'storage_system_password': 'PASS',
+            'clone_name': None,
+            'base_volume_name': None,
+            'dest_cpg': 'dest_cpg',
+            'save_snapshot': False,
+            'priority': 'MEDIUM',
+            'skip_zero': False,
+            'clones': clones,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
+            'state': 'present'
+        }
+        mock_module.params = PARAMS_FOR_PRESENT
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        results = {'results': [
+            {'clone_name': 'clone1', 'base_volume_name': 'vol1', 'failed': False,
+             'changed': True, 'msg': "Created Offline Clone clone1 successfully."},
+            {'clone_name': 'clone2', 'base_volume_name': 'vol2', 'failed': True,
+             'changed': True, 'msg': "Copy task 12 failed"}]}
+        mock_create_offline_clones.return_value = (
+            False, True, "Offline clone creation failed for 1 of 2 clone(s) | clone2: Copy task 12 failed",
+            results)
+        hpe3par_offline_clone.main()
+        mock_create_offline_clones.assert_called_once_with(
+            mock.ANY, 'USER', 'PASS', clones, 'dest_cpg', False, False, 'MEDIUM', 4, 3600)
+        # The per-clone results are kept on failure
+        instance.fail_json.assert_called_with(
+            msg="Offline clone creation failed for 1 of 2 clone(s) | clone2: Copy task 12 failed",
+            issue=results)
+        self.assertEqual(instance.exit_json.call_count, 0)
+
     @mock.patch('Modules.hpe3par_offline_clone.client')
     @mock.patch('Modules.hpe3par_offline_clone.AnsibleModule')
     @mock.patch('Modules.hpe3par_offline_clone.delete_clone')
@@ -148,6 +223,10 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             'save_snapshot': None,
             'priority': None,
             'skip_zero': None,
+            'clones': None,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
             'state': 'absent'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -181,6 +260,10 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             'save_snapshot': None,
             'priority': None,
             'skip_zero': None,
+            'clones': None,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
             'state': 'resync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -214,6 +297,10 @@ class TestHpe3parOfflineClone(unittest.TestCase):
             'save_snapshot': None,
             'priority': None,
             'skip_zero': None,
+            'clones': None,
+            'max_tasks': 4,
+            'wait': False,
+            'timeout': 3600,
             'state': 'stop'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -376,6 +463,7 @@ null", {}))
                                                             'test_clone',
                                                             'base_volume'
                                                             ), (True, True, "Deleted Offline Clone %s successfully." % 'test_clone', {}))
+        self.assertEqual(mock_client.HPE3ParClient.setSSHOptions.call_count, 0)
 
         mock_client.HPE3ParClient.offlinePhysicalCopyExists.return_value = True
         self.assertEqual(hpe3par_offline_clone.delete_clone(mock_client.HPE3ParClient,
@@ -409,5 +497,117 @@ null", {}))
                                                             ), (False, False, "Offline clone delete failed. Base volume name is null", {}))
 
 
+    @mock.patch('Modules.hpe3par_offline_clone.time')
+    @mock.patch('Modules.hpe3par_offline_clone.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_offline_clone.client')
+    def test_create_offline_clones(self, mock_client, mock_time):
+        mock_time.time.return_value = 0
+        self.assertEqual(hpe3par_offline_clone.create_offline_clones(mock_client.HPE3ParClient, 'USER', 'PASS', None,
+                                                                     'cpg', False, False, 'MEDIUM'),
+                         (False, False, "Offline clone create failed. Clones is null", {}))
+        self.assertEqual(hpe3par_offline_clone.create_offline_clones(mock_client.HPE3ParClient, 'USER', 'PASS',
+                                                                     [{'clone_name': 'clone1'}], 'cpg', False, False, 'MEDIUM'),
+                         (False, False, "Offline clone create failed. Base volume name must be atleast 1 character and not more than 31 characters", {}))
+        self.assertEqual(hpe3par_offline_clone.create_offline_clones(mock_client.HPE3ParClient, 'USER', 'PASS',
+                                                                     [{'clone_name': 'clone1', 'base_volume_name': 'vol1'}],
+                                                                     'cpg', False, False, 'MEDIUM', 0),
+                         (False, False, "Offline clone create failed. Max tasks must be at least 1", {}))
+
+        def task(task_id, name, status):
+            task = mock.Mock(task_id=task_id, status=status)
+            task.name = name
+            return task
+        clones = [{'clone_name': 'clone%s' % i, 'base_volume_name': 'vol%s' % i} for i in range(1, 5)]
+        clones[3]['priority'] = 'HIGH'
+        mock_client.HPE3ParClient.copyVolume.side_effect = [{'taskid': 11}, {'taskid': 12}, {'taskid': 13}]
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [
+            # clone1 is already being copied
+            [task(1, 'vol1-*clone1', 2)],
+            [task(11, 'vol2-*clone2', 2), task(12, 'vol3-*clone3', 2)],
+            [task(11, 'vol2-*clone2', 1), task(12, 'vol3-*clone3', 2)],
+            [task(12, 'vol3-*clone3', 4), task(13, 'vol4-*clone4', 1)],
+        ]
+        return_status, changed, msg, issue = hpe3par_offline_clone.create_offline_clones(
+            mock_client.HPE3ParClient, 'USER', 'PASS', clones, 'cpg', False, True, 'MEDIUM', 2)
+        self.assertEqual((return_status, changed, msg),
+                         (False, True, "Offline clone creation failed for 1 of 4 clone(s) | clone3: Copy task 12 failed"))
+        self.assertEqual([result['msg'] for result in issue['results']],
+                         ["Clone already exists / creation in progress. Nothing to do.",
+                          "Created Offline Clone clone2 successfully.",
+                          "Copy task 12 failed",
+                          "Created Offline Clone clone4 successfully."])
+        # clone4 only starts once clone2 has ended
+        self.assertEqual(mock_client.HPE3ParClient.copyVolume.call_args_list, [
+            mock.call('vol2', 'clone2', 'cpg', {'online': False, 'saveSnapshot': True, 'priority': mock_client.HPE3ParClient.TaskPriority.MEDIUM}),
+            mock.call('vol3', 'clone3', 'cpg', {'online': False, 'saveSnapshot': True, 'priority': mock_client.HPE3ParClient.TaskPriority.MEDIUM}),
+            mock.call('vol4', 'clone4', 'cpg', {'online': False, 'saveSnapshot': True, 'priority': mock_client.HPE3ParClient.TaskPriority.HIGH})])
+        # The poll interval doubles while no copy ends
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(1), mock.call(2), mock.call(1)])
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+
+        mock_client.HPE3ParClient.copyVolume.side_effect = None
+        mock_client.HPE3ParClient.copyVolume.return_value = {'taskid': 21}
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [[], [task(21, 'vol2-*clone2', 1)]]
+        self.assertEqual(hpe3par_offline_clone.create_offline_clones(mock_client.HPE3ParClient, 'USER', 'PASS', clones[1:2],
+                                                                     'cpg', False, False, 'MEDIUM'),
+                         (True, True, "Offline clone creation completed for 1 clone(s), 1 created.",
+                          {'results': [{'clone_name': 'clone2', 'base_volume_name': 'vol2', 'failed': False,
+                                        'changed': True, 'msg': "Created Offline Clone clone2 successfully."}]}))
+        # Copies still running at the timeout fail, the rest is not started
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [[], [task(21, 'vol2-*clone2', 2)]]
+        mock_time.time.side_effect = [0, 0, 700]
+        return_status, changed, msg, issue = hpe3par_offline_clone.create_offline_clones(
+            mock_client.HPE3ParClient, 'USER', 'PASS', clones[1:3], 'cpg', False, False, 'MEDIUM', 1, 600)
+        self.assertEqual([result['msg'] for result in issue['results']],
+                         ["Copy task 21 has not ended after 600 seconds", "Copy not started within 600 seconds"])
+
+    @mock.patch('utils.hpe3par_util.time')
+    @mock.patch('Modules.hpe3par_offline_clone.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_offline_clone.client')
+    def test_create_offline_clone_wait(self, mock_client, mock_time):
+        mock_client.HPE3ParClient.onlinePhysicalCopyExists.return_value = False
+        mock_client.HPE3ParClient.offlinePhysicalCopyExists.return_value = False
+        mock_client.HPE3ParClient.copyVolume.return_value = {'taskid': 7}
+        mock_time.time.return_value = 0
+
+        def task(task_id, name, status):
+            task = mock.Mock(task_id=task_id, status=status)
+            task.name = name
+            return task
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [
+            [task(7, 'base_volume-*test_clone', 2)], [task(7, 'base_volume-*test_clone', 2)], []]
+        mock_client.HPE3ParClient.getTask.return_value = task(7, 'base_volume-*test_clone', 1)
+        self.assertEqual(hpe3par_offline_clone.create_offline_clone(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                    'test_clone', 'base_volume', 'dest_cpg', False, False,
+                                                                    'MEDIUM', True, 600),
+                         (True, True, "Created Offline Clone test_clone successfully.", {'task_id': 7}))
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(1), mock.call(2)])
+
+        # A copy started by an earlier task is waited for too
+        mock_client.HPE3ParClient.offlinePhysicalCopyExists.return_value = True
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [
+            [task(7, 'base_volume-*test_clone', 2)], [task(7, 'base_volume-*test_clone', 3)]]
+        self.assertEqual(hpe3par_offline_clone.create_offline_clone(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                    'test_clone', 'base_volume', 'dest_cpg', False, False,
+                                                                    'MEDIUM', True, 600),
+                         (False, False, "Offline Clone creation failed | Copy task 7 was cancelled", {'task_id': 7}))
+
+        # Nothing to wait for once the copy has ended
+        mock_client.HPE3ParClient.getAllTasks.side_effect = None
+        mock_client.HPE3ParClient.getAllTasks.return_value = []
+        self.assertEqual(hpe3par_offline_clone.create_offline_clone(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                    'test_clone', 'base_volume', 'dest_cpg', False, False,
+                                                                    'MEDIUM', True, 600),
+                         (True, False, "Clone already exists / creation in progress. Nothing to do.", {}))
+
+        # A copy task the array does not know is not taken for an ended copy
+        mock_client.HPE3ParClient.offlinePhysicalCopyExists.return_value = False
+        mock_client.HPE3ParClient.getTask.side_effect = exceptions.HTTPNotFound()
+        self.assertEqual(hpe3par_offline_clone.create_offline_clone(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                    'test_clone', 'base_volume', 'dest_cpg', False, False,
+                                                                    'MEDIUM', True, 600),
+                         (False, True, "Offline Clone creation failed | Copy task 7 not found", {'task_id': 7}))
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
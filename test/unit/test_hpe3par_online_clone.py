@@ -19,6 +19,7 @@
 import mock
 import unittest
 from Modules import hpe3par_online_clone
+from utils import hpe3par_util
 from ansible.module_utils.basic import AnsibleModule
 
 
@@ -71,6 +72,16 @@ class TestHpe3parOnlineClone(unittest.TestCase):
         "compression": {
             "required": False,
             "type": "bool",
+        },
+        "wait": {
+            "required": False,
+            "type": "bool",
+            "default": False
+        },
+        "timeout": {
+            "required": False,
+            "type": "int",
+            "default": 3600
         }
     }
 
@@ -91,6 +102,8 @@ class TestHpe3parOnlineClone(unittest.TestCase):
             'reduce': False,
             'snap_cpg': 'snap_cpg',
             'compression': False,
+            'wait': False,
+            'timeout': 3600,
             'state': 'present'
         }
 
@@ -119,6 +132,8 @@ class TestHpe3parOnlineClone(unittest.TestCase):
             'reduce': False,
             'snap_cpg': 'snap_cpg',
             'compression': False,
+            'wait': False,
+            'timeout': 3600,
             'state': 'present'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -153,6 +168,8 @@ class TestHpe3parOnlineClone(unittest.TestCase):
             'reduce': False,
             'snap_cpg': 'snap_cpg',
             'compression': False,
+            'wait': False,
+            'timeout': 3600,
             'state': 'absent'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -187,6 +204,8 @@ class TestHpe3parOnlineClone(unittest.TestCase):
             'reduce': False,
             'snap_cpg': 'snap_cpg',
             'compression': False,
+            'wait': False,
+            'timeout': 3600,
             'state': 'resync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -393,5 +412,44 @@ is null", {}))
                                                            ), (False, False, "Online clone resync failed. Clone name is null", {}))
 
 
+    @mock.patch('utils.hpe3par_util.time')
+    @mock.patch('Modules.hpe3par_online_clone.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_online_clone.client')
+    def test_create_online_clone_wait(self, mock_client, mock_time):
+        mock_client.HPE3ParClient.getWsApiVersion.return_value = {'build': 30201200}
+        mock_client.HPE3ParClient.volumeExists.return_value = False
+        mock_client.HPE3ParClient.copyVolume.return_value = {'taskid': 7}
+        mock_time.time.return_value = 0
+
+        def task(task_id, name, status):
+            task = mock.Mock(task_id=task_id, status=status)
+            task.name = name
+            return task
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [
+            [task(7, 'test_clone', 2)], [task(7, 'test_clone', 2)], [task(7, 'test_clone', 1)]]
+        self.assertEqual(hpe3par_online_clone.create_online_clone(mock_client.HPE3ParClient, 'USER', 'PASS', 'base_volume',
+                                                                  'test_clone', 'dest_cpg', False, False, 'snap_cpg', False,
+                                                                  True, 600),
+                         (True, True, "Created Online Clone test_clone successfully.", {'task_id': 7}))
+        # Backoff between the polls
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(1), mock.call(2)])
+
+        # A copy started by an earlier task is waited for too
+        mock_client.HPE3ParClient.volumeExists.return_value = True
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [[task(7, 'test_clone', 2)], [task(7, 'test_clone', 4)]]
+        self.assertEqual(hpe3par_online_clone.create_online_clone(mock_client.HPE3ParClient, 'USER', 'PASS', 'base_volume',
+                                                                  'test_clone', 'dest_cpg', False, False, 'snap_cpg', False,
+                                                                  True, 600),
+                         (False, False, "Online Clone creation failed | Copy task 7 failed", {'task_id': 7}))
+
+        # Timeout
+        mock_client.HPE3ParClient.getAllTasks.side_effect = None
+        mock_client.HPE3ParClient.getAllTasks.return_value = [task(7, 'test_clone', 2)]
+        mock_time.time.side_effect = [0, 0, 0, 700]
+        self.assertEqual(hpe3par_online_clone.create_online_clone(mock_client.HPE3ParClient, 'USER', 'PASS', 'base_volume',
+                                                                  'test_clone', 'dest_cpg', False, False, 'snap_cpg', False,
+                                                                  True, 600),
+                         (False, False, "Online Clone creation failed | Copy task 7 has not ended after 600 seconds", {'task_id': 7}))
+
 if __name__ == '__main__':
     unittest.main(exit=False)
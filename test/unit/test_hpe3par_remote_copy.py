@@ -29,7 +29,7 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
         "state": {
             "required": True,
             "choices": ['present', 'absent', 'modify', 'add_volume', 'remove_volume', 'start', 'stop', 'synchronize', 'recover', 'admit_link', 
-            'dismiss_link','admit_target','dismiss_target', 'start_rcopy', 'remote_copy_status'],
+            'dismiss_link','admit_target','dismiss_target', 'start_rcopy', 'remote_copy_status', 'wait_for_sync'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -160,6 +160,16 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
         "local_remote_volume_pair_list": {
             "type": "list",
             "default": []
+        },
+        "remote_copy_group_names": {
+            "type": "list"
+        },
+        "volumes": {
+            "type": "list"
+        },
+        "timeout": {
+            "type": "int",
+            "default": 3600
         }
     }
 
@@ -206,6 +216,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
 
@@ -258,6 +271,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -316,6 +332,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -374,6 +393,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -432,6 +454,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -491,6 +516,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -549,6 +577,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -607,6 +638,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -665,6 +699,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -723,6 +760,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -781,6 +821,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -796,6 +839,71 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
         # AnsibleModule.fail_json should not be called
         self.assertEqual(instance.fail_json.call_count, 0)
 
+    @mock.patch('Modules.hpe3par_remote_copy.client')
+    @mock.patch('Modules.hpe3par_remote_copy.AnsibleModule')
+    @mock.patch('Modules.hpe3par_remote_copy.wait_for_remote_copy_sync')
+    def test_main_exit_wait_for_sync(self, mock_wait_for_remote_copy_sync, mock_module, mock_client):
+        """
+        hpe3par remote copy - wait for sync check
+        """
+        PARAMS_FOR_PRESENT = {
+            'state': 'wait_for_sync',
+            'storage_system_ip': '192.168.0.1',
+            'storage_system_username': 'USER',
+            'storage_system_password': 'PASS',
+            'remote_copy_group_name': 'rcg_name_1',
+            'domain': 'test_domain',
+            'remote_copy_targets': [{'target_name': 'CSSOS-SSA04','target_mode': 'sync'}],
+            'admit_volume_targets': [{'target_name': 'CSSOS-SSA04','sec_volume_name': 'demo_volume_1'}],
+            'modify_targets': [{'target_name': 'CSSOS-SSA04','remote_user_cpg': 'FC_r1','remote_snap_cpg': 'FC_r6'}],
+            'local_user_cpg': 'localusrcpg1',
+            'local_snap_cpg': 'snap_cpg1',
+            'keep_snap': False,
+            'unset_user_cpg': False,
+            'unset_snap_cpg': False,
+            'snapshot_name': 'snapshot_1',
+            'volume_auto_creation': False,
+            'skip_initial_sync': False,
+            'different_secondary_wwn': False,
+            'remove_secondary_volume': False,
+            'target_name': 'target_name1',
+            'starting_snapshots': ['volName1','snapShot1'],
+            'no_snapshot': False,
+            'no_resync_snapshot': False,
+            'full_sync': False,
+            'recovery_action': 'REVERSE_GROUP',
+            'skip_start': False,
+            'skip_sync': False,
+            'discard_new_data': False,
+            'skip_promote': False,
+            'stop_groups': False,
+            'local_groups_direction': False,
+            'volume_name': 'volume_1',
+            'source_port': '0:3:1',
+            'target_port_wwn_or_ip': '192.168.1.2',
+            'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
+            'target_mode': 'sync'
+        }
+        # This creates a instance of the AnsibleModule mock.
+        mock_module.params = PARAMS_FOR_PRESENT
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        results = {'results': [{'remote_copy_group_name': 'rcg_name_1', 'synced': False, 'synced_volumes': 0,
+                                'volumes': 1, 'progress': 0.0, 'eta': None}]}
+        mock_wait_for_remote_copy_sync.return_value = (
+            False, False, "Wait for remote copy sync failed. Remote copy group(s) rcg_name_1 not synced after 3600 seconds",
+            results)
+        hpe3par_remote_copy.main()
+        # remote_copy_group_name is waited for without remote_copy_group_names
+        self.assertEqual(mock_wait_for_remote_copy_sync.call_args[0][3], ['rcg_name_1'])
+        # The progress of the groups is returned on failure too
+        instance.fail_json.assert_called_with(
+            msg="Wait for remote copy sync failed. Remote copy group(s) rcg_name_1 not synced after 3600 seconds",
+            output=results)
+
     @mock.patch('Modules.hpe3par_remote_copy.client')
     @mock.patch('Modules.hpe3par_remote_copy.AnsibleModule')
     @mock.patch('Modules.hpe3par_remote_copy.start_remote_copy_service')
@@ -839,6 +947,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -897,6 +1008,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -957,6 +1071,9 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
             'source_port': '0:3:1',
             'target_port_wwn_or_ip': '192.168.1.2',
             'local_remote_volume_pair_list': [('local_v1','remote_v1'),('local_v2','remote_v2')],
+            'remote_copy_group_names': None,
+            'volumes': None,
+            'timeout': 3600,
             'target_mode': 'sync'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -1698,6 +1815,21 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
                                                 'rcg_1',
                                                 [('local_v1','remote_v1'),('local_v2','remote_v2')]
                                                 ), (True, True, "Admit remote copy target %s successful in remote copy group %s." % ('target_name1', 'rcg_1'), {}))
+        mock_client.HPE3ParClient.setSSHOptions.assert_called_once_with('192.168.0.1', 'USER', 'PASS')
+
+        # SSH is not set up when there is nothing to admit
+        mock_client.HPE3ParClient.setSSHOptions.reset_mock()
+        mock_client.HPE3ParClient.targetInRemoteCopyGroupExists.return_value = True
+        self.assertEqual(hpe3par_remote_copy.admit_remote_copy_target(mock_client.HPE3ParClient,
+                                                'USER',
+                                                'PASS',
+                                                '192.168.0.1',
+                                                'target_name1',
+                                                'sync',
+                                                'rcg_1',
+                                                [('local_v1','remote_v1'),('local_v2','remote_v2')]
+                                                ), (True, False, "Admit remote copy target failed.Target is already present", {}))
+        self.assertEqual(mock_client.HPE3ParClient.setSSHOptions.call_count, 0)
 
         mock_client.HPE3ParClient.remoteCopyGroupExists.return_value = False
 
@@ -1850,6 +1982,7 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
                                                 '192.168.0.1',
                                                 'rcg_1',
                                                 ), (True, False, "Remote copy group %s status is complete" % 'rcg_1', {"remote_copy_sync_status":True}))
+        self.assertEqual(mock_client.HPE3ParClient.setSSHOptions.call_count, 0)
 
         mock_client.HPE3ParClient.remoteCopyGroupStatusCheck.return_value = False
         self.assertEqual(hpe3par_remote_copy.remote_copy_group_status(mock_client.HPE3ParClient,
@@ -1879,3 +2012,96 @@ class TestHpe3parRemoteCopy(unittest.TestCase):
                                                 '192.168.0.1',
                                                 'rcg_1',
                                                 ), (False, False, "Remote copy group status failed. Storage system username or password is null", {}))
+
+    @mock.patch('Modules.hpe3par_remote_copy.time')
+    @mock.patch('Modules.hpe3par_remote_copy.client')
+    def test_wait_for_remote_copy_sync(self, mock_client, mock_time):
+        def group(name, target_state, sync_statuses):
+            group = mock.Mock(targets=[mock.Mock(state=target_state)],
+                              volumes=[mock.Mock(remoteVolumes=[mock.Mock(syncStatus=status)])
+                                       for status in sync_statuses])
+            group.name = name
+            return group
+        mock_client.HPE3ParClient.getRemoteCopyGroups.side_effect = [
+            [group('rcg_1', 3, [3, 2, 2, 2]), group('rcg_2', 2, [2])],
+            [group('rcg_1', 3, [3, 2, 2, 2]), group('rcg_2', 3, [3])],
+            [group('rcg_1', 3, [3, 3, 2, 2]), group('rcg_2', 3, [3])],
+            [group('rcg_1', 3, [3, 3, 3, 3]), group('rcg_2', 3, [3]), group('rcg_3', 2, [2])],
+        ]
+        mock_time.time.side_effect = [0, 0, 2, 6, 8, 8]
+        self.assertEqual(hpe3par_remote_copy.wait_for_remote_copy_sync(mock_client.HPE3ParClient, 'USER', 'PASS',
+                                                                       ['rcg_1', 'rcg_2'], 600),
+                         (True, False, "Remote copy group(s) rcg_1, rcg_2 synced in 8 seconds",
+                          {'results': [{'remote_copy_group_name': 'rcg_1', 'synced': True, 'synced_volumes': 4,
+                                        'volumes': 4, 'progress': 100.0, 'eta': 0},
+                                       {'remote_copy_group_name': 'rcg_2', 'synced': True, 'synced_volumes': 1,
+                                        'volumes': 1, 'progress': 100.0, 'eta': 0}]}))
+        # The interval is reset whenever a group progresses
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(2), mock.call(2), mock.call(2)])
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+
+        # Timeout, with the progress and eta of the groups
+        mock_client.HPE3ParClient.getRemoteCopyGroups.side_effect = [
+            [group('rcg_1', 3, [2, 2, 2, 2])], [group('rcg_1', 3, [3, 2, 2, 2])]]
+        mock_time.time.side_effect = [0, 0, 600]
+        return_status, changed, msg, issue = hpe3par_remote_copy.wait_for_remote_copy_sync(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['rcg_1'], 600)
+        self.assertEqual((return_status, changed, msg),
+                         (False, False, "Wait for remote copy sync failed. Remote copy group(s) rcg_1 not synced after 600 seconds"))
+        self.assertEqual(issue['results'][0]['progress'], 25.0)
+        self.assertEqual(issue['results'][0]['eta'], 1800)
+
+        mock_client.HPE3ParClient.getRemoteCopyGroups.side_effect = None
+        mock_client.HPE3ParClient.getRemoteCopyGroups.return_value = []
+        mock_time.time.side_effect = None
+        mock_time.time.return_value = 0
+        self.assertEqual(hpe3par_remote_copy.wait_for_remote_copy_sync(mock_client.HPE3ParClient, 'USER', 'PASS',
+                                                                       ['rcg_1'], 600),
+                         (False, False, "Wait for remote copy sync failed. Remote copy group(s) rcg_1 not present",
+                          {'results': []}))
+        self.assertEqual(hpe3par_remote_copy.wait_for_remote_copy_sync(mock_client.HPE3ParClient, 'USER', 'PASS',
+                                                                       None, 600),
+                         (False, False, "Wait for remote copy sync failed. Remote copy group name is null", {}))
+        self.assertEqual(hpe3par_remote_copy.wait_for_remote_copy_sync(mock_client.HPE3ParClient, 'USER', None,
+                                                                       ['rcg_1'], 600),
+                         (False, False, "Wait for remote copy sync failed. Storage system username or password is null", {}))
+
+    @mock.patch('Modules.hpe3par_remote_copy.exceptions')
+    @mock.patch('Modules.hpe3par_remote_copy.client')
+    def test_add_volumes_to_remote_copy_group(self, mock_client, mock_exceptions):
+        mock_exceptions.HTTPNotFound = Exception
+        mock_client.HPE3ParClient.getStorageSystemInfo.return_value = {'name': 'source_array'}
+        group = mock.Mock(volumes=[mock.Mock(localVolumeName='vol_1')])
+        mock_client.HPE3ParClient.getRemoteCopyGroup.return_value = group
+        mock_client.HPE3ParClient.addVolumeToRemoteCopyGroup.side_effect = [None, Exception('RCOPY_GROUP_IS_BUSY'), None]
+        volumes = ['vol_1', 'vol_2', {'volume_name': 'vol_3', 'sec_volume_name': 'vol_3_dr'},
+                   {'volume_name': 'vol_4', 'admit_volume_targets': [{'target_name': 'target_2', 'sec_volume_name': 'sec_4'}]}]
+        return_status, changed, msg, issue = hpe3par_remote_copy.add_volumes_to_remote_copy_group(
+            mock_client.HPE3ParClient, 'USER', 'PASS', 'rcg_1', volumes, [{'target_name': 'target_1'}], False, False, False)
+        self.assertEqual((return_status, changed, msg),
+                         (False, True, "Add volume to Remote Copy Group failed for 1 of 4 volume(s) | vol_3: RCOPY_GROUP_IS_BUSY"))
+        self.assertEqual([result['changed'] for result in issue['results']], [False, True, False, True])
+        # The group and its volumes are read once, only missing volumes are admitted
+        mock_client.HPE3ParClient.getRemoteCopyGroup.assert_called_once_with('rcg_1')
+        self.assertEqual(mock_client.HPE3ParClient.remoteCopyGroupVolumeExists.call_count, 0)
+        optional = {'volumeAutoCreation': False, 'skipInitialSync': False, 'differentSecondaryWWN': False}
+        self.assertEqual(mock_client.HPE3ParClient.addVolumeToRemoteCopyGroup.call_args_list, [
+            mock.call('rcg_1', 'vol_2', [{'targetName': 'target_1', 'secVolumeName': 'vol_2'}], optional),
+            mock.call('rcg_1', 'vol_3', [{'targetName': 'target_1', 'secVolumeName': 'vol_3_dr'}], optional),
+            mock.call('rcg_1', 'vol_4', [{'targetName': 'target_2', 'secVolumeName': 'sec_4'}], optional)])
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.logout.call_count, 1)
+
+        mock_client.HPE3ParClient.getRemoteCopyGroup.side_effect = Exception
+        self.assertEqual(hpe3par_remote_copy.add_volumes_to_remote_copy_group(
+            mock_client.HPE3ParClient, 'USER', 'PASS', 'rcg_1', ['vol_1'], [{'target_name': 'target_1'}], False, False, False),
+            (False, False, "Remote Copy Group not present", {}))
+        self.assertEqual(hpe3par_remote_copy.add_volumes_to_remote_copy_group(
+            mock_client.HPE3ParClient, 'USER', 'PASS', 'rcg_1', ['vol_1'], [{'target_name': 'source_array'}], False, False, False),
+            (False, False, "Source and target cannot be same. Source and target both are source_array", {}))
+        self.assertEqual(hpe3par_remote_copy.add_volumes_to_remote_copy_group(
+            mock_client.HPE3ParClient, 'USER', 'PASS', 'rcg_1', ['vol_1'], None, False, False, False),
+            (False, False, "Add volume to Remote Copy Group failed. Admit volume targets are null for volume vol_1", {}))
+        self.assertEqual(hpe3par_remote_copy.add_volumes_to_remote_copy_group(
+            mock_client.HPE3ParClient, 'USER', 'PASS', 'rcg_1', None, None, False, False, False),
+            (False, False, "Add volume to Remote Copy Group failed. Volumes is null", {}))
@@ -17,6 +17,7 @@
 # with this program.  If not, see <https://www.gnu.org/licenses/>
 
 import mock
+import time
 import unittest
 from Modules import hpe3par_snapshot
 from ansible.module_utils.basic import AnsibleModule
@@ -27,7 +28,7 @@ class TestHpe3parSnapshot(unittest.TestCase):
     fields = {
         "state": {
             "required": True,
-            "choices": ['present', 'absent', 'create_schedule', 'suspend_schedule', 'resume_schedule', 'delete_schedule', 'modify_schedule', 'modify', 'restore_offline', 'restore_online'],
+            "choices": ['present', 'absent', 'create_schedule', 'suspend_schedule', 'resume_schedule', 'delete_schedule', 'modify_schedule', 'modify', 'restore_offline', 'restore_online', 'consistent_snapshot', 'schedules'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -98,6 +99,15 @@ class TestHpe3parSnapshot(unittest.TestCase):
         },
         "task_freq": {
             "type": "str"
+        },
+        "volume_set_name": {
+            "type": "str"
+        },
+        "base_volume_names": {
+            "type": "list"
+        },
+        "schedules": {
+            "type": "list"
         }
 
     }
@@ -128,6 +138,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'present',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
 
         }
@@ -166,6 +179,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'present',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -209,6 +225,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'absent',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -252,6 +271,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'modify',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -295,6 +317,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'restore_offline',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -338,6 +363,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'restore_online',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -381,6 +409,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'create_schedule',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'            
         }
         # This creates a instance of the AnsibleModule mock.
@@ -424,6 +455,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'modify_schedule',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -467,6 +501,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'suspend_schedule',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -510,6 +547,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'resume_schedule',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -553,6 +593,9 @@ class TestHpe3parSnapshot(unittest.TestCase):
             'state': 'delete_schedule',
             'schedule_name': 'test_schedule',
             'task_freq': 'hourly',
+            'volume_set_name': None,
+            'base_volume_names': None,
+            'schedules': None,
             'new_schedule_name': 'new_schedule'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -1217,5 +1260,149 @@ null", {}))
                                                           ), (False, False, "Schedule delete failed. Schedule name is null", {}))
 
 
+    def test_get_snapshot_names(self):
+        now = time.strptime('2026-01-02 03:04:05', '%Y-%m-%d %H:%M:%S')
+        self.assertEqual(hpe3par_snapshot.get_snapshot_names('@vvname@.@y@@m@@d@@H@@M@@S@', ['vol1', 'vol2'], now),
+                         ['vol1.260102030405', 'vol2.260102030405'])
+        self.assertEqual(hpe3par_snapshot.get_snapshot_names('snap_@count@', ['vol1', 'vol2'], now),
+                         ['snap_0', 'snap_1'])
+
+    @mock.patch('Modules.hpe3par_snapshot.client')
+    def test_create_consistent_snapshot(self, mock_client):
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', None,
+                                                                     None, 'test_set', None, False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot create failed. Storage system username or password is null", {}))
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     None, 'test_set', ['vol1'], False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot create failed. Exactly one of volume set name and base volume names is required", {}))
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     'snap', 'test_set', None, False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot create failed. Snapshot name must contain @vvname@ or @count@", {}))
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     '@vvname@_snapshot_of_the_volume_set_db', None, ['vol1'], False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot create failed. Snapshot name vol1_snapshot_of_the_volume_set_db must not be more than 31 characters", {}))
+
+        # A volume set is snapshotted with one WSAPI call
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     None, 'test_set', None, True, 2, 1, 'Days', 'Hours'),
+                         (True, True, "Created snapshots of volume set test_set successfully.", {}))
+        mock_client.HPE3ParClient.createSnapshotOfVolumeSet.assert_called_once_with(
+            '@vvname@.@y@@m@@d@@H@@M@@S@', 'test_set', {'readOnly': True, 'expirationHours': 48, 'retentionHours': 1})
+        self.assertEqual(mock_client.HPE3ParClient.setSSHOptions.call_count, 0)
+
+        # A list of volumes is snapshotted with one creategroupsv
+        mock_client.HPE3ParClient._run.return_value = ['CopyOfVV,SnapID', 'snap_0,101', 'snap_1,102']
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     'snap_@count@', None, ['vol1', 'vol2'], True, 0, 1, 'Hours', 'Hours'),
+                         (True, True, "Created snapshots snap_0, snap_1 successfully.", {}))
+        mock_client.HPE3ParClient.setSSHOptions.assert_called_once_with('192.168.0.1', 'USER', 'PASS')
+        mock_client.HPE3ParClient._run.assert_called_once_with(
+            ['creategroupsv', '-ro', '-f', '-retain', '1h', 'vol1:snap_0', 'vol2:snap_1'])
+
+        # Snapshot names containing error or invalid are not failures
+        mock_client.HPE3ParClient._run.return_value = ['CopyOfVV,SnapID', 'error_vol1_snap,103',
+                                                       'invalid_db_snap,104']
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     '@vvname@_snap', None, ['error_vol1', 'invalid_db'], False, 0, 0, 'Hours', 'Hours'),
+                         (True, True, "Created snapshots error_vol1_snap, invalid_db_snap successfully.", {}))
+
+        # A snapshot missing from the table is a failure
+        mock_client.HPE3ParClient._run.return_value = ['CopyOfVV,SnapID', 'snap_0,105']
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     'snap_@count@', None, ['vol1', 'vol2'], False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot creation failed | CopyOfVV,SnapID; snap_0,105", {}))
+
+        # Output without the requested snapshots is a failure
+        mock_client.HPE3ParClient._run.return_value = ['vol4: no such volume']
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     'snap_@count@', None, ['vol4'], False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot creation failed | vol4: no such volume", {}))
+
+        mock_client.HPE3ParClient._run.return_value = ['Error: volume vol3 does not exist']
+        self.assertEqual(hpe3par_snapshot.create_consistent_snapshot(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                                     'snap_@count@', None, ['vol3'], False, 0, 0, 'Hours', 'Hours'),
+                         (False, False, "Consistent snapshot creation failed | Error: volume vol3 does not exist", {}))
+
+    SHOWSCHED = [
+        'Id,Name,Owner,Command,Annotation,Min,Hour,DOM,Month,DOW,Status,Alert,NextRunTime',
+        '1,sched_same,3paradm,createsv -ro vol1.@y@@m@@d@@H@@M@@S@ vol1,--,0,*,*,*,*,active,Y,2026-01-02 04:00:00 UTC',
+        '2,sched_freq,3paradm,createsv vol2.@y@@m@@d@@H@@M@@S@ vol2,--,0,*,*,*,*,active,Y,2026-01-02 04:00:00 UTC',
+        '3,sched_cmd,3paradm,createsv vol3.@y@@m@@d@@H@@M@@S@ vol3,--,0,0,*,*,*,active,Y,2026-01-03 00:00:00 UTC',
+        '4,sched_resume,3paradm,createsv vol4.@y@@m@@d@@H@@M@@S@ vol4,--,0,*,*,*,*,suspended,Y,--',
+        '5,sched_remove,3paradm,createsv vol5.@y@@m@@d@@H@@M@@S@ vol5,--,0,*,*,*,*,active,Y,2026-01-02 04:00:00 UTC',
+        '-------------------------------------------------------------------------',
+        '5,total',
+    ]
+
+    @mock.patch('Modules.hpe3par_snapshot.client')
+    def test_get_schedules(self, mock_client):
+        mock_client.HPE3ParClient._run.return_value = self.SHOWSCHED
+        schedules = hpe3par_snapshot.get_schedules(mock_client.HPE3ParClient)
+        mock_client.HPE3ParClient._run.assert_called_once_with(['showsched', '-showcmd'])
+        self.assertEqual(sorted(schedules), ['sched_cmd', 'sched_freq', 'sched_remove', 'sched_resume', 'sched_same'])
+        self.assertEqual(schedules['sched_same'], {'command': 'createsv -ro vol1.@y@@m@@d@@H@@M@@S@ vol1',
+                                                   'task_freq': '0 * * * *', 'status': 'active'})
+        self.assertEqual(schedules['sched_resume']['status'], 'suspended')
+
+        mock_client.HPE3ParClient._run.return_value = ['No scheduled tasks ']
+        self.assertEqual(hpe3par_snapshot.get_schedules(mock_client.HPE3ParClient), {})
+
+    @mock.patch('Modules.hpe3par_snapshot.client')
+    def test_set_schedules(self, mock_client):
+        self.assertEqual(hpe3par_snapshot.set_schedules(mock_client.HPE3ParClient, '192.168.0.1', 'USER', None, []),
+                         (False, False, "Set schedules failed. Storage system username or password is null", {}))
+        self.assertEqual(hpe3par_snapshot.set_schedules(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS', None),
+                         (False, False, "Set schedules failed. Schedules is null", {}))
+        self.assertEqual(hpe3par_snapshot.set_schedules(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                        [{'schedule_name': 'sched', 'state': 'present', 'base_volume_name': 'vol1'}]),
+                         (False, False, "Set schedules failed. Task frequency of schedule sched is null", {}))
+        self.assertEqual(hpe3par_snapshot.set_schedules(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS',
+                                                        [{'schedule_name': 'sched', 'state': 'active'}]),
+                         (False, False, "Set schedules failed. State of schedule sched must be one of present, suspended, absent", {}))
+
+        mock_client.HPE3ParClient._run.return_value = self.SHOWSCHED
+        mock_client.HPE3ParClient.volumeExists.return_value = True
+        schedules = [
+            {'schedule_name': 'sched_same', 'base_volume_name': 'vol1', 'task_freq': 'hourly', 'read_only': True},
+            {'schedule_name': 'sched_freq', 'base_volume_name': 'vol2', 'task_freq': '0 2 * * *'},
+            {'schedule_name': 'sched_cmd', 'base_volume_name': 'vol3', 'task_freq': 'daily', 'read_only': True},
+            {'schedule_name': 'sched_resume', 'base_volume_name': 'vol4', 'task_freq': '@hourly'},
+            {'schedule_name': 'sched_remove', 'state': 'absent'},
+            {'schedule_name': 'sched_new', 'base_volume_name': 'vol6', 'task_freq': 'hourly', 'state': 'suspended'},
+        ]
+        return_status, changed, msg, issue = hpe3par_snapshot.set_schedules(
+            mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS', schedules)
+        self.assertEqual((return_status, changed, msg), (True, True, "Set schedules successfully. Changed 5 of 6 schedule(s)."))
+        self.assertEqual([result['result'] for result in issue['results']],
+                         ['unchanged', 'modified', 'recreated', 'resumed', 'deleted', 'created, suspended'])
+        # The schedules are listed once and all commands share one SSH connection
+        mock_client.HPE3ParClient.setSSHOptions.assert_called_once_with('192.168.0.1', 'USER', 'PASS')
+        mock_client.HPE3ParClient._run.assert_called_once_with(['showsched', '-showcmd'])
+        mock_client.HPE3ParClient.modifySchedule.assert_called_once_with('sched_freq', {'taskFrequency': '0 2 * * *'})
+        self.assertEqual(mock_client.HPE3ParClient.deleteSchedule.call_args_list,
+                         [mock.call('sched_cmd'), mock.call('sched_remove')])
+        self.assertEqual(mock_client.HPE3ParClient.createSchedule.call_args_list,
+                         [mock.call('sched_cmd', 'createsv -ro vol3.@y@@m@@d@@H@@M@@S@ vol3', '@daily'),
+                          mock.call('sched_new', 'createsv vol6.@y@@m@@d@@H@@M@@S@ vol6', '@hourly')])
+        mock_client.HPE3ParClient.resumeSchedule.assert_called_once_with('sched_resume')
+        mock_client.HPE3ParClient.suspendSchedule.assert_called_once_with('sched_new')
+        self.assertEqual(sorted(call[0][0] for call in mock_client.HPE3ParClient.volumeExists.call_args_list),
+                         ['vol3', 'vol6'])
+
+        # Nothing to do
+        mock_client.reset_mock()
+        mock_client.HPE3ParClient._run.return_value = self.SHOWSCHED
+        self.assertEqual(hpe3par_snapshot.set_schedules(mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS', schedules[:1]),
+                         (True, False, "Schedules already in the given state. Nothing to do.",
+                          {'results': [{'schedule_name': 'sched_same', 'changed': False, 'result': 'unchanged'}]}))
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 0)
+
+        # A missing volume fails its schedule only
+        mock_client.HPE3ParClient.volumeExists.return_value = False
+        return_status, changed, msg, issue = hpe3par_snapshot.set_schedules(
+            mock_client.HPE3ParClient, '192.168.0.1', 'USER', 'PASS', schedules[4:])
+        self.assertEqual((return_status, changed, msg),
+                         (False, True, "Set schedules failed for 1 of 2 schedule(s) | sched_new: failed | Volume does not Exist"))
+
 if __name__ == '__main__':
     unittest.main(exit=False)
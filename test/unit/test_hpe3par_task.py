@@ -0,0 +1,176 @@
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+
+import mock
+from Modules import hpe3par_task
+from utils import hpe3par_util
+from hpe3par_sdk.models import Task
+from hpe3parclient import exceptions
+import unittest
+
+
+class TestHpe3parTask(unittest.TestCase):
+
+    PARAMS = {'storage_system_ip': '192.168.0.1', 'storage_system_username': 'USER',
+              'storage_system_password': 'PASS', 'task_ids': [11, 12], 'timeout': 3600}
+
+    fields = {
+        "storage_system_ip": {
+            "required": True,
+            "type": "str"
+        },
+        "storage_system_username": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "storage_system_password": {
+            "required": True,
+            "type": "str",
+            "no_log": True
+        },
+        "task_ids": {
+            "required": True,
+            "type": "list"
+        },
+        "timeout": {
+            "type": "int",
+            "default": 3600
+        }
+    }
+
+    @mock.patch('Modules.hpe3par_task.hpe3par_util')
+    @mock.patch('Modules.hpe3par_task.client')
+    @mock.patch('Modules.hpe3par_task.AnsibleModule')
+    def test_module_args(self, mock_module, mock_client, mock_util):
+        """
+        hpe3par task - test module arguments
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        hpe3par_task.main()
+        mock_module.assert_called_with(
+            argument_spec=self.fields)
+
+    @mock.patch('Modules.hpe3par_task.hpe3par_util')
+    @mock.patch('Modules.hpe3par_task.client')
+    @mock.patch('Modules.hpe3par_task.AnsibleModule')
+    @mock.patch('Modules.hpe3par_task.wait_for_tasks')
+    def test_main_exit_functionality_fail(self, mock_wait_for_tasks, mock_module, mock_client, mock_util):
+        """
+        hpe3par task - exit fail check
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        results = {'results': [{'task_id': 11, 'name': 'tune', 'status': 'failed', 'duration': 2}]}
+        mock_wait_for_tasks.return_value = (False, False, "Wait for tasks failed | task 11 failed", results)
+        hpe3par_task.main()
+        mock_wait_for_tasks.assert_called_with(mock.ANY, 'USER', 'PASS', [11, 12], 3600)
+        mock_module.fail_json.assert_called_once_with(msg="Wait for tasks failed | task 11 failed", issue=results)
+
+    @mock.patch('Modules.hpe3par_task.hpe3par_util', None)
+    @mock.patch('Modules.hpe3par_task.client')
+    @mock.patch('Modules.hpe3par_task.AnsibleModule')
+    def test_main_without_hpe3par_util(self, mock_module, mock_client):
+        """
+        hpe3par task - the task poll helper comes from module_utils
+        """
+        mock_module.params = self.PARAMS
+        mock_module.return_value = mock_module
+        mock_module.fail_json.side_effect = SystemExit
+        self.assertRaises(SystemExit, hpe3par_task.main)
+        mock_module.fail_json.assert_called_once_with(msg='the hpe3par_util module_utils is required')
+
+    @mock.patch('utils.hpe3par_util.time')
+    @mock.patch('Modules.hpe3par_task.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_task.client')
+    def test_wait_for_tasks(self, mock_client, mock_time):
+        """
+        hpe3par task - wait_for_tasks
+        """
+        mock_client.HPE3ParClient.getAllTasks.side_effect = [
+            [Task({'id': 11, 'status': 2, 'name': 'tune_vv_1'}), Task({'id': 12, 'status': 2, 'name': 'tune_vv_2'})],
+            [Task({'id': 11, 'status': 2, 'name': 'tune_vv_1'}), Task({'id': 12, 'status': 2, 'name': 'tune_vv_2'})],
+            [Task({'id': 11, 'status': 1, 'name': 'tune_vv_1'}), Task({'id': 12, 'status': 2, 'name': 'tune_vv_2'})],
+            # Ended tasks drop out of the task list
+            [Task({'id': 11, 'status': 1, 'name': 'tune_vv_1'})],
+        ]
+        mock_client.HPE3ParClient.getTask.return_value = Task({'id': 12, 'status': 1, 'name': 'tune_vv_2'})
+        mock_time.time.side_effect = [0, 0, 2, 6, 8]
+        self.assertEqual(hpe3par_task.wait_for_tasks(mock_client.HPE3ParClient, 'USER', 'PASS', ['11', 12], 600),
+                         (True, False, "2 task(s) ended successfully.",
+                          {'results': [{'task_id': 11, 'name': 'tune_vv_1', 'status': 'done', 'duration': 6},
+                                       {'task_id': 12, 'name': 'tune_vv_2', 'status': 'done', 'duration': 8}]}))
+        # One task list call per poll, the interval is reset once a task ends
+        self.assertEqual(mock_client.HPE3ParClient.getAllTasks.call_count, 4)
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(2), mock.call(4), mock.call(2)])
+        mock_client.HPE3ParClient.login.assert_called_once_with('USER', 'PASS')
+        mock_client.HPE3ParClient.logout.assert_called_once_with()
+        mock_client.HPE3ParClient.getTask.assert_called_once_with(12)
+
+    @mock.patch('utils.hpe3par_util.time')
+    @mock.patch('Modules.hpe3par_task.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_task.client')
+    def test_wait_for_tasks_fail(self, mock_client, mock_time):
+        """
+        hpe3par task - wait_for_tasks failed tasks and timeout
+        """
+        mock_client.HPE3ParClient.getAllTasks.return_value = [
+            Task({'id': 11, 'status': 4, 'name': 'tune_vv_1'}), Task({'id': 12, 'status': 2, 'name': 'tune_vv_2'})]
+        mock_time.time.side_effect = [0, 0, 600]
+        return_status, changed, msg, issue = hpe3par_task.wait_for_tasks(
+            mock_client.HPE3ParClient, 'USER', 'PASS', [11, 12], 600)
+        self.assertEqual((return_status, changed, msg), (
+            False, False, "Wait for tasks failed | task 11 failed; task(s) 12 not ended after 600 seconds"))
+        self.assertEqual([result['status'] for result in issue['results']], ['failed', 'active'])
+        self.assertEqual(issue['results'][1]['duration'], None)
+
+    @mock.patch('utils.hpe3par_util.time')
+    @mock.patch('Modules.hpe3par_task.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_task.client')
+    def test_wait_for_tasks_not_found(self, mock_client, mock_time):
+        """
+        hpe3par task - wait_for_tasks unknown task ID
+        """
+        mock_client.HPE3ParClient.getAllTasks.return_value = [Task({'id': 11, 'status': 1, 'name': 'tune_vv_1'})]
+        mock_client.HPE3ParClient.getTask.side_effect = exceptions.HTTPNotFound()
+        mock_time.time.return_value = 0
+        return_status, changed, msg, issue = hpe3par_task.wait_for_tasks(
+            mock_client.HPE3ParClient, 'USER', 'PASS', [11, 99], 600)
+        self.assertEqual((return_status, changed, msg), (
+            False, False, "Wait for tasks failed | task 99 not found"))
+        self.assertEqual([result['status'] for result in issue['results']], ['done', 'not found'])
+        self.assertEqual(mock_time.sleep.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_task.client')
+    def test_wait_for_tasks_invalid(self, mock_client):
+        """
+        hpe3par task - wait_for_tasks invalid input
+        """
+        self.assertEqual(hpe3par_task.wait_for_tasks(mock_client.HPE3ParClient, None, None, [11], 600), (
+            False, False, "Wait for tasks failed. Storage system username or password is null", {}))
+        self.assertEqual(hpe3par_task.wait_for_tasks(mock_client.HPE3ParClient, 'USER', 'PASS', [], 600), (
+            False, False, "Wait for tasks failed. Task IDs is null", {}))
+        self.assertEqual(hpe3par_task.wait_for_tasks(mock_client.HPE3ParClient, 'USER', 'PASS', ['tune'], 600), (
+            False, False, "Wait for tasks failed. Task IDs must be integers", {}))
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
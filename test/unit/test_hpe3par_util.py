@@ -0,0 +1,323 @@
+# (C) Copyright 2018 Hewlett Packard Enterprise Development LP
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of version 3 of the GNU General Public License as
+# published by the Free Software Foundation.  Alternatively, at your
+# choice, you may also redistribute it and/or modify it under the terms
+# of the Apache License, version 2.0, available at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# This program is distributed in the hope that it will be useful, but
+# WITHOUT ANY WARRANTY; without even the implied warranty of MERCHANTABILITY
+# or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU General Public License
+# for more details.
+#
+# You should have received a copy of the GNU General Public License along
+# with this program.  If not, see <https://www.gnu.org/licenses/>
+
+import mock
+import os
+import shutil
+import tempfile
+import unittest
+from utils import hpe3par_util
+try:
+    from hpe3parclient import ssh as hpe3parclient_ssh
+except ImportError:
+    hpe3parclient_ssh = None
+
+
+class TestHpe3parUtil(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.env = mock.patch.dict(os.environ, {
+            'HPE3PAR_CACHE_DIR': self.cache_dir})
+        self.env.start()
+
+    def tearDown(self):
+        self.env.stop()
+        shutil.rmtree(self.cache_dir)
+
+    def test_cache_read_write(self):
+        cache_file = hpe3par_util.get_cache_file('session', '192.168.0.1', 'USER')
+        self.assertTrue(cache_file.startswith(self.cache_dir))
+        self.assertNotEqual(cache_file, hpe3par_util.get_cache_file('session', '192.168.0.1', 'USER2'))
+        self.assertIsNone(hpe3par_util.read_cache(cache_file, 600))
+
+        hpe3par_util.write_cache(cache_file, 'key')
+        self.assertEqual(hpe3par_util.read_cache(cache_file, 600), 'key')
+        self.assertEqual(os.stat(cache_file).st_mode & 0o777, 0o600)
+        # Expired entries are ignored
+        self.assertIsNone(hpe3par_util.read_cache(cache_file, -1))
+
+        hpe3par_util.remove_cache(cache_file)
+        self.assertIsNone(hpe3par_util.read_cache(cache_file, 600))
+
+    def test_cache_client_disabled(self):
+        client_obj = mock.Mock()
+        wrapped = hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER')
+        wrapped.login('USER', 'PASS')
+        wrapped.getWsApiVersion()
+        wrapped.logout()
+        client_obj.login.assert_called_once_with('USER', 'PASS', None)
+        client_obj.getWsApiVersion.assert_called_once_with()
+        client_obj.logout.assert_called_once_with()
+
+    @mock.patch.dict(os.environ, {'HPE3PAR_SESSION_CACHE': 'true'})
+    def test_cache_client_session(self):
+        client_obj = mock.Mock()
+        client_obj.client.http.get_session_key.return_value = 'key'
+        wrapped = hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER')
+        wrapped.login('USER', 'PASS')
+        client_obj.login.assert_called_once_with('USER', 'PASS', None)
+        wrapped.logout()
+        # The session and SSH stay open
+        self.assertEqual(client_obj.logout.call_count, 0)
+        self.assertEqual(client_obj.client.ssh.close.call_count, 0)
+
+        # A later task picks up the cached session key
+        other_client_obj = mock.Mock()
+        other_client_obj.client.http.get_session_key.return_value = 'key'
+        wrapped = hpe3par_util.cache_client(other_client_obj, '192.168.0.1', 'USER')
+        wrapped.login('USER', 'PASS')
+        self.assertEqual(other_client_obj.login.call_count, 0)
+        self.assertEqual(other_client_obj.client.http.session_key, 'key')
+        self.assertEqual(other_client_obj.client.http.user, 'USER')
+        self.assertEqual(other_client_obj.client.http.password, 'PASS')
+        # Everything else is passed through to the client
+        wrapped.getVolume('test_volume')
+        other_client_obj.getVolume.assert_called_once_with('test_volume')
+
+        # getWsApiVersion is not cached without HPE3PAR_WSAPI_CACHE_TTL
+        wrapped.getWsApiVersion()
+        wrapped.getWsApiVersion()
+        self.assertEqual(other_client_obj.getWsApiVersion.call_count, 2)
+
+        # The cached key is only taken with the password it was created with
+        cache_file = hpe3par_util.get_cache_file('session', '192.168.0.1', 'USER')
+        self.assertNotIn('PASS', open(cache_file).read())
+        wrong_client_obj = mock.Mock()
+        wrong_client_obj.login.side_effect = Exception("invalid username or password")
+        wrapped = hpe3par_util.cache_client(wrong_client_obj, '192.168.0.1', 'USER')
+        self.assertRaises(Exception, wrapped.login, 'USER', 'WRONG')
+        self.assertEqual(hpe3par_util.read_cache(cache_file, 600)['key'], 'key')
+
+        # A key replaced after a password change is deleted on the array
+        rotated_client_obj = mock.Mock()
+        rotated_client_obj.client.http.get_session_key.return_value = 'key2'
+        wrapped = hpe3par_util.cache_client(rotated_client_obj, '192.168.0.1', 'USER')
+        wrapped.login('USER', 'NEWPASS')
+        rotated_client_obj.login.assert_called_once_with('USER', 'NEWPASS', None)
+        rotated_client_obj.client.http.delete.assert_called_once_with('/credentials/key')
+        self.assertEqual(hpe3par_util.read_cache(cache_file, 600)['key'], 'key2')
+
+    @mock.patch.dict(os.environ, {'HPE3PAR_SESSION_CACHE': 'true', 'HPE3PAR_SESSION_CACHE_TTL': '-1'})
+    def test_cache_client_session_expired(self):
+        client_obj = mock.Mock()
+        client_obj.client.http.get_session_key.return_value = 'key'
+        hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER').login('USER', 'PASS')
+
+        # A key past its ttl is replaced and deleted on the array
+        other_client_obj = mock.Mock()
+        other_client_obj.client.http.get_session_key.return_value = 'key2'
+        other_client_obj.client.http.delete.side_effect = Exception("session not found")
+        hpe3par_util.cache_client(other_client_obj, '192.168.0.1', 'USER').login('USER', 'PASS')
+        other_client_obj.login.assert_called_once_with('USER', 'PASS', None)
+        other_client_obj.client.http.delete.assert_called_once_with('/credentials/key')
+
+    @mock.patch.dict(os.environ, {'HPE3PAR_WSAPI_CACHE_TTL': '3600'})
+    def test_cache_client_version(self):
+        client_obj = mock.Mock()
+        client_obj.getWsApiVersion.return_value = {'build': 40000128}
+        client_obj.client.HPE3PAR_WS_PRIMERA_MIN_BUILD_VERSION = 40000128
+        wrapped = hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER')
+        self.assertEqual(wrapped.getWsApiVersion(), {'build': 40000128})
+
+        other_client_obj = mock.Mock()
+        other_client_obj.client.HPE3PAR_WS_PRIMERA_MIN_BUILD_VERSION = 40000128
+        other_client_obj.client.primera_supported = False
+        wrapped = hpe3par_util.cache_client(other_client_obj, '192.168.0.1', 'USER')
+        self.assertEqual(wrapped.getWsApiVersion(), {'build': 40000128})
+        self.assertEqual(other_client_obj.getWsApiVersion.call_count, 0)
+        self.assertTrue(other_client_obj.client.primera_supported)
+        # Sessions are not cached without HPE3PAR_SESSION_CACHE
+        wrapped.login('USER', 'PASS')
+        wrapped.logout()
+        other_client_obj.login.assert_called_once_with('USER', 'PASS', None)
+        other_client_obj.logout.assert_called_once_with()
+
+    @mock.patch('utils.hpe3par_util.atexit')
+    def test_cache_client_ssh(self, mock_atexit):
+        client_obj = mock.Mock()
+        client_obj.client.ssh = None
+
+        def set_ssh_options(*args, **kwargs):
+            client_obj.client.ssh = mock.Mock()
+        client_obj.setSSHOptions.side_effect = set_ssh_options
+        wrapped = hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER')
+        wrapped.setSSHOptions('192.168.0.1', 'USER', 'PASS')
+        ssh = client_obj.client.ssh
+        wrapped.login('USER', 'PASS')
+        wrapped.logout()
+        # The connection is kept for later CLI calls of the run
+        wrapped.setSSHOptions('192.168.0.1', 'USER', 'PASS')
+        client_obj.setSSHOptions.assert_called_once_with('192.168.0.1', 'USER', 'PASS', 22, None, None)
+        self.assertIs(client_obj.client.ssh, ssh)
+        self.assertEqual(ssh.close.call_count, 0)
+        mock_atexit.register.assert_called_once_with(wrapped.close_ssh)
+        wrapped.close_ssh()
+        ssh.close.assert_called_once_with()
+
+        wrapped.setSSHOptions('192.168.0.2', 'USER', 'PASS')
+        self.assertEqual(client_obj.setSSHOptions.call_count, 2)
+
+    @mock.patch('utils.hpe3par_util.atexit')
+    @mock.patch('utils.hpe3par_util.which')
+    @mock.patch('utils.hpe3par_util.subprocess')
+    def test_cache_client_ssh_control_master(self, mock_subprocess, mock_which, mock_atexit):
+        mock_which.return_value = '/usr/bin/ssh'
+        mock_subprocess.Popen.return_value.communicate.return_value = ('Id,Name\n1,sched\n', '')
+        mock_subprocess.Popen.return_value.returncode = 0
+        client_obj = mock.Mock()
+        with mock.patch.dict(os.environ, {'HPE3PAR_SSH_CONTROL_PERSIST': '600'}):
+            wrapped = hpe3par_util.cache_client(client_obj, '192.168.0.1', 'USER')
+        wrapped.setSSHOptions('192.168.0.1', 'USER', 'PASS')
+        self.assertEqual(client_obj.setSSHOptions.call_count, 0)
+        ssh = client_obj.client.ssh
+        self.assertIsInstance(ssh, hpe3par_util.ControlMasterSSH)
+        self.assertTrue(ssh.control_path.startswith(self.cache_dir))
+
+    @unittest.skipIf(hpe3parclient_ssh is None, 'the SSH client of hpe3parclient cannot be imported')
+    @mock.patch('utils.hpe3par_util.subprocess')
+    def test_control_master_ssh_run(self, mock_subprocess):
+        mock_subprocess.Popen.return_value.communicate.return_value = ('Id,Name\n1,sched\n', '')
+        mock_subprocess.Popen.return_value.returncode = 0
+        ssh = hpe3par_util.ControlMasterSSH('192.168.0.1', 'USER', 22, '/tmp/hpe3par-ssh', 600)
+        self.assertEqual(ssh.run(['showsched', '-showcmd']), ['Id,Name', '1,sched'])
+        ssh_cmd = mock_subprocess.Popen.call_args[0][0]
+        self.assertIn('ControlPath=/tmp/hpe3par-ssh', ssh_cmd)
+        self.assertIn('ControlPersist=600', ssh_cmd)
+        self.assertEqual(ssh_cmd[-1], 'setclienv csvtable 1; showsched -showcmd')
+        # Same command string as the SSH client of hpe3parclient
+        ssh.run(['createsched', '"createsv -ro vol1.@s@ vol1"', '"0 * * * *"', 'sched1'])
+        self.assertEqual(mock_subprocess.Popen.call_args[0][0][-1],
+                         'setclienv csvtable 1; createsched "createsv -ro vol1.@s@ vol1" "0 * * * *" sched1')
+        ssh.run(['getfsquota', '-fpg', 'fpg1'])
+        self.assertEqual(mock_subprocess.Popen.call_args[0][0][-1],
+                         'setclienv csvtable 1; Tpd::rtpd "getfsquota -fpg fpg1"')
+
+        from hpe3parclient import exceptions
+        self.assertRaises(exceptions.SSHInjectionThreat, ssh.run, ['showsched', 'x; removesched -f y'])
+        self.assertRaises(exceptions.SSHInjectionThreat, ssh.run, ['showsched', 'x', 'removesched y'])
+        mock_subprocess.Popen.return_value.returncode = 255
+        mock_subprocess.Popen.return_value.communicate.return_value = ('', 'Permission denied (publickey).\n')
+        self.assertRaises(exceptions.SSHException, ssh.run, ['showsched'])
+
+    def test_get_port_number(self):
+        client_class = mock.Mock()
+        client_class.getPortNumber.return_value = 443
+        self.assertEqual(hpe3par_util.get_port_number(client_class, '192.168.0.1', 'USER', 'PASS'), 443)
+        self.assertEqual(hpe3par_util.get_port_number(client_class, '192.168.0.1', 'USER', 'PASS'), 443)
+        self.assertEqual(client_class.getPortNumber.call_count, 2)
+
+        with mock.patch.dict(os.environ, {'HPE3PAR_WSAPI_CACHE_TTL': '3600'}):
+            self.assertEqual(hpe3par_util.get_port_number(client_class, '192.168.0.1', 'USER', 'PASS'), 443)
+            self.assertEqual(hpe3par_util.get_port_number(client_class, '192.168.0.1', 'OTHER', 'PASS'), 443)
+        self.assertEqual(client_class.getPortNumber.call_count, 3)
+
+    def test_get_client(self):
+        client_class = mock.Mock()
+        client_class.getPortNumber.return_value = 8080
+        client_obj = hpe3par_util.get_client(client_class, '192.168.0.1', 'USER', 'PASS', 'ansible_module_3par')
+        client_class.assert_called_with('https://192.168.0.1:8080/api/v1', 'ansible_module_3par')
+        client_obj.getWsApiVersion()
+        client_class.return_value.getWsApiVersion.assert_called_once_with()
+
+    def test_enable_keepalive(self):
+        from hpe3parclient import http
+        requests_module = http.requests
+        try:
+            hpe3par_util.enable_keepalive()
+            self.assertIs(http.requests, requests_module)
+
+            with mock.patch.dict(os.environ, {'HPE3PAR_HTTP_KEEPALIVE': 'true'}):
+                hpe3par_util.enable_keepalive()
+                pooled = http.requests
+                hpe3par_util.enable_keepalive()
+            self.assertIsInstance(pooled, hpe3par_util.PooledRequests)
+            self.assertIs(http.requests, pooled)
+            # Everything but request() is the requests module itself
+            self.assertIs(pooled.exceptions, requests_module.exceptions)
+            with mock.patch.object(pooled._session, 'request') as mock_request:
+                pooled.request('GET', 'https://192.168.0.1/api/v1/volumes', verify=False)
+                mock_request.assert_called_once_with(
+                    'GET', 'https://192.168.0.1/api/v1/volumes', verify=False)
+        finally:
+            http.requests = requests_module
+
+    def test_get_chunks(self):
+        self.assertEqual(hpe3par_util.get_chunks([1, 2, 3, 4, 5], 2), [[1, 2], [3, 4], [5]])
+        self.assertEqual(hpe3par_util.get_chunks([], 2), [])
+
+    def test_diff_set_members(self):
+        self.assertEqual(
+            hpe3par_util.diff_set_members(['m1', 'm2'], ['m3', 'm2', 'm3', 'm4']),
+            (['m3', 'm2', 'm4'], ['m3', 'm4'], ['m1']))
+        self.assertEqual(
+            hpe3par_util.diff_set_members(['m1', 'm2'], ['m2', 'm1']),
+            (['m2', 'm1'], [], []))
+        self.assertEqual(
+            hpe3par_util.diff_set_members(None, ['m2', 'm1', 'm2']),
+            (['m2', 'm1'], ['m2', 'm1'], []))
+
+    @mock.patch('utils.hpe3par_util.time')
+    def test_wait_for_tasks(self, mock_time):
+        def task(task_id, name, status):
+            task = mock.Mock(task_id=task_id, status=status)
+            task.name = name
+            return task
+        client_obj = mock.Mock()
+        client_obj.getAllTasks.side_effect = [
+            [task(1, 'copy_1', 2), task(2, 'copy_2', 2), task(3, 'other', 2)],
+            [task(1, 'copy_1', 4), task(2, 'copy_2', 2)],
+            [task(2, 'copy_2', 2)],
+            # Ended tasks drop out of the task list
+            []]
+        client_obj.getTask.return_value = task(2, 'copy_2', 1)
+        mock_time.time.side_effect = [0, 0, 1, 3, 7]
+        self.assertEqual(hpe3par_util.wait_for_tasks(client_obj, [1, 2], 600), {
+            1: {'name': 'copy_1', 'status': hpe3par_util.TASK_FAILED, 'duration': 1},
+            2: {'name': 'copy_2', 'status': hpe3par_util.TASK_DONE, 'duration': 7}})
+        # The interval is reset once a task ends, doubled while none does
+        self.assertEqual(mock_time.sleep.call_args_list, [mock.call(1), mock.call(1), mock.call(1)])
+
+        client_obj.getAllTasks.side_effect = None
+        client_obj.getAllTasks.return_value = [task(1, 'copy_1', 2)]
+        mock_time.time.side_effect = [0, 0, 700]
+        self.assertEqual(hpe3par_util.wait_for_tasks(client_obj, [1], 600, 2, 60), {
+            1: {'name': 'copy_1', 'status': hpe3par_util.TASK_ACTIVE, 'duration': None}})
+
+        # An ID the array does not know is not taken for an ended task
+        from hpe3parclient import exceptions
+        client_obj.getAllTasks.return_value = [task(1, 'copy_1', 1)]
+        client_obj.getTask.side_effect = exceptions.HTTPNotFound()
+        mock_time.time.side_effect = [0, 0]
+        self.assertEqual(hpe3par_util.wait_for_tasks(client_obj, [1, 5], 600), {
+            1: {'name': 'copy_1', 'status': hpe3par_util.TASK_DONE, 'duration': 0},
+            5: {'name': None, 'status': hpe3par_util.TASK_NOT_FOUND, 'duration': 0}})
+        client_obj.getTask.assert_called_with(5)
+
+    def test_get_task_error(self):
+        self.assertEqual(hpe3par_util.get_task_error(7, hpe3par_util.TASK_DONE, 600), None)
+        self.assertEqual(hpe3par_util.get_task_error(7, hpe3par_util.TASK_FAILED, 600), "Task 7 failed")
+        self.assertEqual(hpe3par_util.get_task_error(7, hpe3par_util.TASK_CANCELLED, 600, 'Copy task'),
+                         "Copy task 7 was cancelled")
+        self.assertEqual(hpe3par_util.get_task_error(7, hpe3par_util.TASK_ACTIVE, 600, 'Copy task'),
+                         "Copy task 7 has not ended after 600 seconds")
+        self.assertEqual(hpe3par_util.get_task_error(7, hpe3par_util.TASK_NOT_FOUND, 600), "Task 7 not found")
+
+
+if __name__ == '__main__':
+    unittest.main(exit=False)
@@ -18,6 +18,7 @@
 
 import mock
 from Modules import hpe3par_vlun as vlun
+from hpe3par_sdk.models import VLUN
 from ansible.module_utils.basic import AnsibleModule as ansible
 import unittest
 
@@ -28,7 +29,9 @@ class TestHpe3parVlun(unittest.TestCase):
                           'storage_system_password': 'PASS', 'state': 'export_volume_to_host',
                           'volume_name': 'test_vol_name', 'volume_set_name': 'test_volset_name',
                           'lunid': 12, 'autolun': True, 'host_name': 'test_host_name',
-                          'host_set_name': 'test_hostset_name', 'node_val': 3, 'slot': 2, 'card_port': 1}
+                          'host_set_name': 'test_hostset_name', 'node_val': 3, 'slot': 2, 'card_port': 1,
+                          'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                          'lun_assignment': 'sequential'}
 
     fields = {
         "state": {
@@ -41,7 +44,8 @@ class TestHpe3parVlun(unittest.TestCase):
                 'export_volume_to_hostset',
                 'unexport_volume_from_hostset',
                 'export_volumeset_to_hostset',
-                'unexport_volumeset_from_hostset'],
+                'unexport_volumeset_from_hostset',
+                'export_matrix'],
             "type": 'str'},
         "storage_system_ip": {
             "required": True,
@@ -75,7 +79,22 @@ class TestHpe3parVlun(unittest.TestCase):
         "slot": {
             "type": "int"},
         "card_port": {
-            "type": "int"}
+            "type": "int"},
+        "volumes": {
+            "type": "list"},
+        "volume_sets": {
+            "type": "list"},
+        "hosts": {
+            "type": "list"},
+        "host_sets": {
+            "type": "list"},
+        "max_workers": {
+            "type": "int",
+            "default": 1},
+        "lun_assignment": {
+            "type": "str",
+            "choices": ['sequential', 'lowest_free'],
+            "default": 'sequential'}
     }
 
     @mock.patch('Modules.hpe3par_vlun.client')
@@ -121,7 +140,9 @@ class TestHpe3parVlun(unittest.TestCase):
         PARAMS_FOR_UNEXPORT = {'storage_system_ip': '192.168.0.1', 'storage_system_name': '3PAR', 'storage_system_username': 'USER',
                                'storage_system_password': 'PASS', 'state': 'unexport_volume_from_host', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True, 'host_name': 'test_host_name',
-                               'host_set_name': 'test_hostset_name', 'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'host_set_name': 'test_hostset_name', 'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -147,7 +168,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'export_volume_to_hostset', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -173,7 +196,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'unexport_volume_from_hostset', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -199,7 +224,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'export_volumeset_to_host', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -225,7 +252,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'unexport_volumeset_from_host', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -251,7 +280,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'export_volumeset_to_hostset', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -277,7 +308,9 @@ class TestHpe3parVlun(unittest.TestCase):
                                'state': 'unexport_volumeset_from_hostset', 'volume_name': 'test_vol_name',
                                'volume_set_name': 'test_volset_name', 'lunid': 12, 'autolun': True,
                                'host_name': 'test_host_name', 'host_set_name': 'test_hostset_name',
-                               'node_val': 3, 'slot': 2, 'card_port': 1}
+                               'node_val': 3, 'slot': 2, 'card_port': 1,
+                               'volumes': None, 'volume_sets': None, 'hosts': None, 'host_sets': None, 'max_workers': 1,
+                               'lun_assignment': 'sequential'}
         # This creates a instance of the AnsibleModule mock.
         mock_module.params = PARAMS_FOR_UNEXPORT
         mock_module.return_value = mock_module
@@ -844,5 +877,133 @@ class TestHpe3parVlun(unittest.TestCase):
             mock_client.HPE3ParClient, "user", "password", "test_volumeset_name", 1, "test_hostsetname", 2, 3, 1)
 
 
+    @mock.patch('Modules.hpe3par_vlun.client')
+    @mock.patch('Modules.hpe3par_vlun.AnsibleModule')
+    @mock.patch('Modules.hpe3par_vlun.export_matrix')
+    def test_main_exit_export_matrix(self, mock_export_matrix, mock_module, mock_client):
+        """
+        hpe3par vlun - export matrix success check
+        """
+        mock_module.params = dict(self.PARAMS_FOR_PRESENT, state='export_matrix', volumes=['vol1'],
+                                  hosts=['host1'], max_workers=4)
+        mock_module.return_value = mock_module
+        results = {'results': [{'volume_name': 'vol1', 'host_name': 'host1', 'lun': 12,
+                                'changed': True, 'failed': False, 'msg': 'Created VLUN successfully.'}]}
+        mock_export_matrix.return_value = (
+            True, True, "VLUN matrix export completed for 1 VLUN(s), 1 created.", results)
+        vlun.main()
+        mock_export_matrix.assert_called_once_with(
+            mock_client.HPE3ParClient.return_value, 'USER', 'PASS', ['vol1'], None, ['host1'], None, 12, True, 4, 'sequential')
+        mock_module.exit_json.assert_called_with(
+            changed=True, msg="VLUN matrix export completed for 1 VLUN(s), 1 created.", issue=results)
+        self.assertEqual(mock_module.fail_json.call_count, 0)
+
+        # The allocated LUN IDs are kept when some of the VLUNs failed
+        results['results'].append({'volume_name': 'vol1', 'host_name': 'host2', 'lun': 12,
+                                   'changed': False, 'failed': True, 'msg': 'Host not found'})
+        mock_export_matrix.return_value = (
+            False, True, "VLUN matrix export failed for 1 of 2 VLUN(s) | vol1 to host2: Host not found",
+            results)
+        vlun.main()
+        mock_module.fail_json.assert_called_with(
+            msg="VLUN matrix export failed for 1 of 2 VLUN(s) | vol1 to host2: Host not found",
+            issue=results)
+
+    @mock.patch('Modules.hpe3par_vlun.client')
+    def test_export_matrix(self, mock_client):
+        """
+        hpe3par vlun - export volumes and volume sets to hosts and host sets
+        """
+        mock_client.HPE3ParClient.getVLUNs.return_value = [
+            VLUN({'volumeName': 'vol1', 'lun': 10, 'hostname': 'host1'})]
+        mock_client.HPE3ParClient.getVolumeSet.return_value.setmembers = ['vol3', 'vol4']
+        result = vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol1', 'vol2'], ['vvset'],
+            ['host1'], ['hostset'], 10, False, 4)
+
+        self.assertEqual(result[:3], (
+            True, True, "VLUN matrix export completed for 6 VLUN(s), 5 created."))
+        mock_client.HPE3ParClient.getVLUNs.assert_called_once_with()
+        mock_client.HPE3ParClient.login.assert_called_once_with('USER', 'PASS')
+        self.assertEqual(
+            sorted(call[0][:3] for call in mock_client.HPE3ParClient.createVLUN.call_args_list),
+            [('set:vvset', 12, 'host1'), ('set:vvset', 12, 'set:hostset'),
+             ('vol1', 10, 'set:hostset'), ('vol2', 11, 'host1'), ('vol2', 11, 'set:hostset')])
+        self.assertEqual(result[3]['results'][0], {
+            'volume_name': 'vol1', 'host_name': 'host1', 'lun': 10,
+            'changed': False, 'failed': False, 'msg': 'VLUN already present'})
+
+    @mock.patch('Modules.hpe3par_vlun.client')
+    def test_export_matrix_autolun_failure(self, mock_client):
+        """
+        hpe3par vlun - export matrix with autolun and a failed VLUN
+        """
+        mock_client.HPE3ParClient.getVLUNs.return_value = []
+        mock_client.HPE3ParClient.createVLUN.side_effect = [None, Exception("Host not found")]
+        result = vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol1'], None,
+            ['host1', 'host2'], None, None, True)
+
+        self.assertEqual(result[:3], (
+            False, True, "VLUN matrix export failed for 1 of 2 VLUN(s) | vol1 to host2: Host not found"))
+        mock_client.HPE3ParClient.createVLUN.assert_any_call('vol1', None, 'host1', None, None, None, True)
+        self.assertEqual(mock_client.HPE3ParClient.getVolumeSet.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_vlun.client')
+    def test_export_matrix_validation(self, mock_client):
+        """
+        hpe3par vlun - export matrix input validation
+        """
+        self.assertEqual(vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', None, None, ['host1'], None, 1, False), (
+            False, False, "VLUN matrix export failed. Volumes or volume sets are required", {}))
+        self.assertEqual(vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol1'], None, None, [], 1, False), (
+            False, False, "VLUN matrix export failed. Hosts or host sets are required", {}))
+        self.assertEqual(vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol1'], None, ['host1'], None, None, False), (
+            False, False, "Lun ID is required", {}))
+
+
+    @mock.patch('Modules.hpe3par_vlun.client')
+    def test_export_matrix_lowest_free(self, mock_client):
+        """
+        hpe3par vlun - export matrix with LUN IDs from the allocator
+        """
+        mock_client.HPE3ParClient.getVLUNs.return_value = [
+            VLUN({'volumeName': 'other1', 'lun': 0, 'hostname': 'host1'}),
+            VLUN({'volumeName': 'other2', 'lun': 1, 'hostname': 'host3'}),
+            VLUN({'volumeName': 'other3', 'lun': 3, 'hostname': 'set:hostset'}),
+            VLUN({'volumeName': 'vol3', 'lun': 7, 'hostname': 'host1'})]
+        mock_client.HPE3ParClient.getHostSet.return_value.setmembers = ['host2', 'host3']
+        mock_client.HPE3ParClient.getVolumeSet.return_value.setmembers = ['vol4', 'vol5']
+        result = vlun.export_matrix(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol1', 'vol2', 'vol3'], ['vvset'],
+            ['host1'], ['hostset'], None, False, 1, 'lowest_free')
+
+        self.assertTrue(result[0])
+        self.assertEqual(
+            [call[0][:3] for call in mock_client.HPE3ParClient.createVLUN.call_args_list],
+            [('vol1', 2, 'host1'), ('vol1', 2, 'set:hostset'),
+             ('vol2', 4, 'host1'), ('vol2', 4, 'set:hostset'),
+             ('vol3', 7, 'set:hostset'),
+             ('set:vvset', 5, 'host1'), ('set:vvset', 5, 'set:hostset')])
+        self.assertEqual(mock_client.HPE3ParClient.vlunExists.call_count, 0)
+        mock_client.HPE3ParClient.getVLUNs.assert_called_once_with()
+
+    def test_lun_allocator(self):
+        """
+        hpe3par vlun - LUN allocator
+        """
+        allocator = vlun.LunAllocator(
+            [VLUN({'volumeName': 'vol1', 'lun': 1, 'hostname': 'host1'})])
+        self.assertEqual(allocator.allocate(['host1']), 0)
+        self.assertEqual(allocator.allocate(['host1'], 2), 2)
+        self.assertEqual(allocator.allocate(['host2'], 1, 0, 1), 1)
+        self.assertEqual(allocator.allocate(['host1', 'host2'], 1, 0, 1), 4)
+        self.assertEqual(allocator.allocate(['host3'], 1, vlun.MAX_LUN_ID), vlun.MAX_LUN_ID)
+        self.assertRaises(Exception, allocator.allocate, ['host3'], 2, vlun.MAX_LUN_ID)
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -19,6 +19,8 @@
 import mock
 import unittest
 from Modules import hpe3par_volume
+from hpe3parclient import exceptions
+from hpe3par_sdk.models import CPG, LDLayoutCapacity, VLUN
 from ansible.module_utils.basic import AnsibleModule
 
 
@@ -35,7 +37,8 @@ class TestHpe3parVolume(unittest.TestCase):
                         'change_snap_cpg',
                         'change_user_cpg',
                         'convert_type',
-                        'set_snap_cpg'
+                        'set_snap_cpg',
+                        'converged'
                         ],
             "type": 'str'
         },
@@ -54,9 +57,29 @@ class TestHpe3parVolume(unittest.TestCase):
             "no_log": True
         },
         "volume_name": {
-            "required": True,
             "type": "str"
         },
+        "volumes": {
+            "type": "list"
+        },
+        "max_workers": {
+            "type": "int",
+            "default": 1
+        },
+        "volume_pattern": {
+            "type": "str"
+        },
+        "volume_tags": {
+            "type": "dict"
+        },
+        "unexport": {
+            "type": "bool",
+            "default": False
+        },
+        "remove_from_sets": {
+            "type": "bool",
+            "default": False
+        },
         "cpg": {
             "type": "str",
             "default": None
@@ -156,6 +179,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': 'test_cpg',
             'size': 1.0,
             'size_unit': 'GiB',
@@ -178,6 +203,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': 'keep_vv',
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'present'
         }
 
@@ -200,6 +229,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': None,
             'size_unit': None,
@@ -222,6 +253,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'absent'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -236,6 +271,143 @@ class TestHpe3parVolume(unittest.TestCase):
         # AnsibleModule.fail_json should not be called
         self.assertEqual(instance.fail_json.call_count, 0)
 
+    @mock.patch('Modules.hpe3par_volume.client')
+    @mock.patch('Modules.hpe3par_volume.AnsibleModule')
+    @mock.patch('Modules.hpe3par_volume.delete_volumes')
+    def test_main_exit_absent_pattern(self, mock_delete_volumes, mock_module, mock_client):
+        """
+        hpe3par volume - bulk delete by pattern and tags
+        """
+        PARAMS = {
+            'storage_system_ip': '192.168.0.1',
+            'storage_system_name': '3PAR',
+            'storage_system_username': 'USER',
+            'storage_system_password': 'PASS',
+            'volume_name': None,
+            'volumes': None,
+            'max_workers': 8,
+            'cpg': None,
+            'size': None,
+            'size_unit': None,
+            'snap_cpg': None,
+            'wait_for_task_to_end': None,
+            'new_name': None,
+            'expiration_hours': None,
+            'retention_hours': None,
+            'ss_spc_alloc_warning_pct': None,
+            'ss_spc_alloc_limit_pct': None,
+            'usr_spc_alloc_warning_pct': None,
+            'usr_spc_alloc_limit_pct': None,
+            'rm_ss_spc_alloc_warning': None,
+            'rm_usr_spc_alloc_warning': None,
+            'rm_exp_time': None,
+            'rm_usr_spc_alloc_limit': None,
+            'rm_ss_spc_alloc_limit': None,
+            'compression': False,
+            'type': 'thin',
+            'keep_vv': None,
+            'staleSS': None,
+            'zeroDetect': None,
+            'volume_pattern': 'ci_vol_*',
+            'volume_tags': {'type': 'ansible-3par-client'},
+            'unexport': True,
+            'remove_from_sets': True,
+            'state': 'absent'
+        }
+        mock_module.params = PARAMS
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        mock_delete_volumes.return_value = (
+            True, True, "Volume delete completed for 2 volume(s), 2 changed.",
+            {'results': []})
+        hpe3par_volume.main()
+        mock_delete_volumes.assert_called_with(
+            mock.ANY, 'USER', 'PASS', [], 8, 'ci_vol_*',
+            {'type': 'ansible-3par-client'}, True, True)
+        instance.exit_json.assert_called_with(
+            changed=True, msg="Volume delete completed for 2 volume(s), 2 changed.",
+            issue={'results': []})
+        self.assertEqual(instance.fail_json.call_count, 0)
+
+        # The bulk delete options only apply to absent
+        PARAMS['state'] = 'present'
+        hpe3par_volume.main()
+        instance.fail_json.assert_any_call(
+            msg='volume_pattern, volume_tags, unexport and remove_from_sets '
+                'are only supported with state absent')
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    @mock.patch('Modules.hpe3par_volume.AnsibleModule')
+    @mock.patch('Modules.hpe3par_volume.create_volumes')
+    def test_main_exit_present_volumes(self, mock_create_volumes, mock_module, mock_client):
+        """
+        hpe3par volume - success check
+        """
+        PARAMS = {
+            'storage_system_ip': '192.168.0.1',
+            'storage_system_name': '3PAR',
+            'storage_system_username': 'USER',
+            'storage_system_password': 'PASS',
+            'volume_name': None,
+            'volumes': ['vol_1', 'vol_2'],
+            'max_workers': 1,
+            'cpg': 'test_cpg',
+            'size': 1024,
+            'size_unit': 'MiB',
+            'snap_cpg': None,
+            'wait_for_task_to_end': None,
+            'new_name': None,
+            'expiration_hours': None,
+            'retention_hours': None,
+            'ss_spc_alloc_warning_pct': None,
+            'ss_spc_alloc_limit_pct': None,
+            'usr_spc_alloc_warning_pct': None,
+            'usr_spc_alloc_limit_pct': None,
+            'rm_ss_spc_alloc_warning': None,
+            'rm_usr_spc_alloc_warning': None,
+            'rm_exp_time': None,
+            'rm_usr_spc_alloc_limit': None,
+            'rm_ss_spc_alloc_limit': None,
+            'compression': False,
+            'type': 'thin',
+            'keep_vv': None,
+            'staleSS': None,
+            'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
+            'state': 'present'
+        }
+        # This creates a instance of the AnsibleModule mock.
+        mock_module.params = PARAMS
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        mock_create_volumes.return_value = (
+            True, True, "Volume creation completed for 2 volume(s), 2 changed.",
+            {'results': []})
+        hpe3par_volume.main()
+        # AnsibleModule.exit_json should be called
+        instance.exit_json.assert_called_with(
+            changed=True, msg="Volume creation completed for 2 volume(s), 2 changed.",
+            issue={'results': []})
+        # AnsibleModule.fail_json should not be called
+        self.assertEqual(instance.fail_json.call_count, 0)
+
+        # The per-volume results are kept when some of the volumes failed
+        results = [
+            {'volume_name': 'vol_1', 'changed': True, 'failed': False,
+             'msg': 'Created'},
+            {'volume_name': 'vol_2', 'changed': False, 'failed': True,
+             'msg': 'CPG not found'}]
+        mock_create_volumes.return_value = (
+            False, True, "Volume creation failed for 1 of 2 volume(s) | "
+                         "vol_2: CPG not found", {'results': results})
+        hpe3par_volume.main()
+        instance.fail_json.assert_called_with(
+            msg="Volume creation failed for 1 of 2 volume(s) | vol_2: CPG not found",
+            issue={'results': results})
+
     @mock.patch('Modules.hpe3par_volume.client')
     @mock.patch('Modules.hpe3par_volume.AnsibleModule')
     @mock.patch('Modules.hpe3par_volume.modify_volume')
@@ -249,6 +421,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': None,
             'size_unit': None,
@@ -271,6 +445,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'modify'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -298,6 +476,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': 1.0,
             'size_unit': 'GiB',
@@ -320,6 +500,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'grow'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -347,6 +531,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': 1.0,
             'size_unit': 'GiB',
@@ -369,6 +555,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'grow_to_size'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -396,6 +586,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': None,
             'size_unit': None,
@@ -418,6 +610,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'change_snap_cpg'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -445,6 +641,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': 'test_cpg',
             'size': None,
             'size_unit': None,
@@ -467,6 +665,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'change_user_cpg'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -494,6 +696,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': 'test_cpg',
             'size': None,
             'size_unit': None,
@@ -516,6 +720,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': 'keep_vv',
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'convert_type'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -543,6 +751,8 @@ class TestHpe3parVolume(unittest.TestCase):
             'storage_system_username': 'USER',
             'storage_system_password': 'PASS',
             'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
             'cpg': None,
             'size': None,
             'size_unit': None,
@@ -565,6 +775,10 @@ class TestHpe3parVolume(unittest.TestCase):
             'keep_vv': None,
             'staleSS': None,
             'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
             'state': 'set_snap_cpg'
         }
         # This creates a instance of the AnsibleModule mock.
@@ -579,6 +793,61 @@ class TestHpe3parVolume(unittest.TestCase):
         # AnsibleModule.fail_json should not be called
         self.assertEqual(instance.fail_json.call_count, 0)
 
+    @mock.patch('Modules.hpe3par_volume.client')
+    @mock.patch('Modules.hpe3par_volume.AnsibleModule')
+    @mock.patch('Modules.hpe3par_volume.converge_volume')
+    def test_main_exit_converged(self, mock_converge_volume, mock_module, mock_client):
+        """
+        hpe3par volume - success check
+        """
+        PARAMS_FOR_PRESENT = {
+            'storage_system_ip': '192.168.0.1',
+            'storage_system_name': '3PAR',
+            'storage_system_username': 'USER',
+            'storage_system_password': 'PASS',
+            'volume_name': 'test_volume',
+            'volumes': None,
+            'max_workers': 1,
+            'cpg': None,
+            'size': None,
+            'size_unit': None,
+            'snap_cpg': 'snap_cpg',
+            'wait_for_task_to_end': None,
+            'new_name': None,
+            'expiration_hours': None,
+            'retention_hours': None,
+            'ss_spc_alloc_warning_pct': None,
+            'ss_spc_alloc_limit_pct': None,
+            'usr_spc_alloc_warning_pct': None,
+            'usr_spc_alloc_limit_pct': None,
+            'rm_ss_spc_alloc_warning': None,
+            'rm_usr_spc_alloc_warning': None,
+            'rm_exp_time': None,
+            'rm_usr_spc_alloc_limit': None,
+            'rm_ss_spc_alloc_limit': None,
+            'compression': None,
+            'type': None,
+            'keep_vv': None,
+            'staleSS': None,
+            'zeroDetect': None,
+            'volume_pattern': None,
+            'volume_tags': None,
+            'unexport': False,
+            'remove_from_sets': False,
+            'state': 'converged'
+        }
+        # This creates a instance of the AnsibleModule mock.
+        mock_module.params = PARAMS_FOR_PRESENT
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        mock_converge_volume.return_value = (True, True, "Converged volume test_volume: grow.", {'actions': ['grow']})
+        hpe3par_volume.main()
+        # AnsibleModule.exit_json should be called
+        instance.exit_json.assert_called_with(
+            changed=True, msg="Converged volume test_volume: grow.", issue={'actions': ['grow']})
+        # AnsibleModule.fail_json should not be called
+        self.assertEqual(instance.fail_json.call_count, 0)
+
     @mock.patch('Modules.hpe3par_volume.client')
     def test_create_snapshot(self, mock_client):
         mock_client.HPE3ParClient.login.return_value = None
@@ -729,6 +998,267 @@ class TestHpe3parVolume(unittest.TestCase):
         self.assertEqual(optional['tdvv'], True)
         self.assertNotIn('reduce', optional)
 
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_create_volumes(self, mock_client):
+        mock_client.HPE3ParClient.login.return_value = None
+        mock_client.HPE3ParClient.getWsApiVersion.return_value = {'build': 30201200}
+        existing_volume = mock.Mock()
+        existing_volume.name = 'vol_2'
+        mock_client.HPE3ParClient.getVolumes.return_value = [existing_volume]
+        mock_client.HPE3ParClient.createVolume.return_value = None
+        mock_client.HPE3ParClient.logout.return_value = None
+        self.assertEqual(hpe3par_volume.create_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       'PASS',
+                                                       ['vol_1',
+                                                        {'volume_name': 'vol_2'},
+                                                        {'volume_name': 'vol_3', 'size': 2, 'size_unit': 'GiB'}],
+                                                       'test_cpg',
+                                                       1024,
+                                                       'MiB',
+                                                       'thin',
+                                                       False,
+                                                       'snap_cpg'
+                                                       ), (True, True, "Volume creation completed for 3 volume(s), 2 changed.",
+                                                           {'results': [
+                                                               {'volume_name': 'vol_1', 'changed': True, 'failed': False,
+                                                                'msg': 'Created volume vol_1 successfully.'},
+                                                               {'volume_name': 'vol_2', 'changed': False, 'failed': False,
+                                                                'msg': 'Volume already present'},
+                                                               {'volume_name': 'vol_3', 'changed': True, 'failed': False,
+                                                                'msg': 'Created volume vol_3 successfully.'}]}))
+        # One version check and one session for the whole batch
+        self.assertEqual(mock_client.HPE3ParClient.getWsApiVersion.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.logout.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.getVolumes.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.volumeExists.call_count, 0)
+        mock_client.HPE3ParClient.getCPG.assert_called_once_with('test_cpg')
+        mock_client.HPE3ParClient.createVolume.assert_called_with(
+            'vol_3', 'test_cpg', 2048, mock.ANY)
+
+        existing_volume.name = 'vol_1'
+        self.assertEqual(hpe3par_volume.create_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       'PASS',
+                                                       ['vol_1'],
+                                                       'test_cpg',
+                                                       1024,
+                                                       'MiB',
+                                                       'thin',
+                                                       False,
+                                                       'snap_cpg'
+                                                       ), (True, False, "Volume creation completed for 1 volume(s), 0 changed.",
+                                                           {'results': [
+                                                               {'volume_name': 'vol_1', 'changed': False, 'failed': False,
+                                                                'msg': 'Volume already present'}]}))
+
+        self.assertEqual(hpe3par_volume.create_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       'PASS',
+                                                       [{'volume_name': 'vol_1'}],
+                                                       None,
+                                                       1024,
+                                                       'MiB',
+                                                       'thin',
+                                                       False,
+                                                       'snap_cpg'
+                                                       ), (False, False, "Volume creation failed. Cpg is null for volume vol_1", {}))
+
+        self.assertEqual(hpe3par_volume.create_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       'PASS',
+                                                       [],
+                                                       'test_cpg',
+                                                       1024,
+                                                       'MiB',
+                                                       'thin',
+                                                       False,
+                                                       'snap_cpg'
+                                                       ), (False, False, "Volume creation failed. Volumes is null", {}))
+
+        self.assertEqual(hpe3par_volume.create_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       None,
+                                                       ['vol_1'],
+                                                       'test_cpg',
+                                                       1024,
+                                                       'MiB',
+                                                       'thin',
+                                                       False,
+                                                       'snap_cpg'
+                                                       ), (False, False, "Volume creation failed. Storage system username or password is null", {}))
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_create_volumes_capacity(self, mock_client):
+        mock_client.HPE3ParClient.getWsApiVersion.return_value = {'build': 30201200}
+        existing_volume = mock.Mock()
+        existing_volume.name = 'vol_1'
+        mock_client.HPE3ParClient.getVolumes.return_value = [existing_volume]
+        # 1 GiB allocated and unused, 2 GiB free to grow, 7 GiB under the growth limit
+        mock_client.HPE3ParClient.getCPG.side_effect = lambda name: CPG({
+            'name': name,
+            'UsrUsage': {'totalMiB': 3072, 'usedMiB': 2048},
+            'SAUsage': {'totalMiB': 512},
+            'SDUsage': {'totalMiB': 512},
+            'SDGrowth': {'limitMiB': 8192}})
+        mock_client.HPE3ParClient.getCPGAvailableSpace.return_value = LDLayoutCapacity({'usableFreeMiB': 2048})
+        volumes = ['vol_1', 'vol_2', {'volume_name': 'vol_3', 'type': 'thin', 'size': 100, 'size_unit': 'GiB'}]
+
+        # vol_1 exists and thin volumes take no space up front
+        return_status, changed, msg, issue = hpe3par_volume.create_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', volumes, 'test_cpg', 3, 'GiB', 'full', False, None)
+        self.assertEqual((return_status, changed, msg),
+                         (True, True, "Volume creation completed for 3 volume(s), 2 changed."))
+        mock_client.HPE3ParClient.getCPG.assert_called_once_with('test_cpg')
+        mock_client.HPE3ParClient.getCPGAvailableSpace.assert_called_once_with('test_cpg')
+
+        # Nothing is created when the batch does not fit
+        mock_client.HPE3ParClient.createVolume.reset_mock()
+        self.assertEqual(hpe3par_volume.create_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', volumes, 'test_cpg', 4, 'GiB', 'full', False, None),
+            (False, False, "Volume creation failed. CPG test_cpg needs 3072 MiB more for the fully provisioned "
+                           "volumes, only 2048 MiB is free", {}))
+        mock_client.HPE3ParClient.getCPGAvailableSpace.return_value = LDLayoutCapacity({'usableFreeMiB': 8192})
+        self.assertEqual(hpe3par_volume.create_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', volumes, 'test_cpg', 6, 'GiB', 'full', False, None),
+            (False, False, "Volume creation failed. CPG test_cpg would grow to 9216 MiB, beyond its growth "
+                           "limit of 8192 MiB", {}))
+        self.assertEqual(mock_client.HPE3ParClient.createVolume.call_count, 0)
+        self.assertEqual(mock_client.HPE3ParClient.logout.call_count, 3)
+
+        mock_client.HPE3ParClient.getCPG.side_effect = exceptions.HTTPNotFound('CPG not found')
+        self.assertEqual(hpe3par_volume.create_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol_2'], 'test_cpg', 1, 'GiB', 'thin', False, None),
+            (False, False, "Volume creation failed. CPG test_cpg does not exist", {}))
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_delete_volumes(self, mock_client):
+        mock_client.HPE3ParClient.login.return_value = None
+        mock_client.HPE3ParClient.volumeExists.side_effect = lambda name: name != 'vol_2'
+        mock_client.HPE3ParClient.deleteVolume.return_value = None
+        mock_client.HPE3ParClient.logout.return_value = None
+        return_status, changed, msg, issue = hpe3par_volume.delete_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol_1', 'vol_2', 'vol_3'], 4)
+        self.assertEqual((return_status, changed, msg),
+                         (True, True, "Volume delete completed for 3 volume(s), 2 changed."))
+        # Results keep the order of the input list
+        self.assertEqual([result['volume_name'] for result in issue['results']],
+                         ['vol_1', 'vol_2', 'vol_3'])
+        self.assertEqual(mock_client.HPE3ParClient.deleteVolume.call_count, 2)
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+
+        self.assertEqual(hpe3par_volume.delete_volumes(mock_client.HPE3ParClient,
+                                                       'USER',
+                                                       'PASS',
+                                                       [None]
+                                                       ), (False, False, "Volume delete failed. Volume name is null", {}))
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_delete_volumes_matching(self, mock_client):
+        volumes = []
+        for name in ['ci_vol_1', 'ci_vol_2', 'ci_vol_3', 'prod_vol', 'ci_vol_1_snap']:
+            volume = mock.Mock(copy_type=1)
+            volume.name = name
+            volumes.append(volume)
+        # Snapshots are not matched by volume_pattern
+        volumes[-1].copy_type = 3
+        mock_client.HPE3ParClient.getVolumes.return_value = volumes
+        # ci_vol_3 was not created by the module
+        mock_client.HPE3ParClient.findVolumeMetaData.side_effect = (
+            lambda name, key, value: name != 'ci_vol_3')
+        template = VLUN({'volumeName': 'ci_vol_1', 'lun': 1, 'hostname': 'host_1', 'active': False})
+        active = VLUN({'volumeName': 'ci_vol_1', 'lun': 1, 'hostname': 'host_1', 'active': True,
+                       'portPos': {'node': 0, 'slot': 1, 'cardPort': 2}})
+        mock_client.HPE3ParClient.getVLUNs.return_value = [
+            active, template, VLUN({'volumeName': 'prod_vol', 'lun': 2, 'hostname': 'host_1', 'active': False})]
+        mock_client.HPE3ParClient.deleteVLUN.side_effect = [None, exceptions.HTTPNotFound('VLUN not found')]
+        volume_set = mock.Mock(setmembers=['ci_vol_2', 'prod_vol'])
+        volume_set.name = 'ci_set'
+        mock_client.HPE3ParClient.getVolumeSets.return_value = [volume_set]
+
+        return_status, changed, msg, issue = hpe3par_volume.delete_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['vol_missing'], 4,
+            'ci_vol_*', {'type': 'ansible-3par-client'}, True, True)
+        self.assertEqual((return_status, changed, msg),
+                         (True, True, "Volume delete completed for 3 volume(s), 2 changed."))
+        self.assertEqual([(result['volume_name'], result['changed'], result['msg']) for result in issue['results']],
+                         [('vol_missing', False, 'Volume does not exist'),
+                          ('ci_vol_1', True, 'Deleted volume ci_vol_1 successfully.'),
+                          ('ci_vol_2', True, 'Deleted volume ci_vol_2 successfully.')])
+        # One list call per object type, one metadata lookup per candidate
+        self.assertEqual(mock_client.HPE3ParClient.getVolumes.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.getVLUNs.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.getVolumeSets.call_count, 1)
+        self.assertEqual(mock_client.HPE3ParClient.findVolumeMetaData.call_count, 3)
+        self.assertEqual(mock_client.HPE3ParClient.volumeExists.call_count, 0)
+        # The template goes first, its active VLUN is then already gone
+        self.assertEqual(mock_client.HPE3ParClient.deleteVLUN.call_args_list, [
+            mock.call('ci_vol_1', 1, 'host_1', None),
+            mock.call('ci_vol_1', 1, 'host_1', {'node': 0, 'slot': 1, 'cardPort': 2})])
+        mock_client.HPE3ParClient.removeVolumeFromVolumeSet.assert_called_once_with('ci_set', 'ci_vol_2')
+        self.assertEqual(sorted(call[0][0] for call in mock_client.HPE3ParClient.deleteVolume.call_args_list),
+                         ['ci_vol_1', 'ci_vol_2'])
+        self.assertEqual(mock_client.HPE3ParClient.login.call_count, 1)
+
+        # Volumes asked for by name report a tag mismatch
+        return_status, changed, msg, issue = hpe3par_volume.delete_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS', ['ci_vol_3'], 1,
+            None, {'type': 'ansible-3par-client'})
+        self.assertEqual(issue['results'], [{'volume_name': 'ci_vol_3', 'changed': False, 'failed': False,
+                                             'msg': 'Volume does not match volume_tags'}])
+
+        self.assertEqual(hpe3par_volume.delete_volumes(mock_client.HPE3ParClient, 'USER', 'PASS', []),
+                         (False, False, "Volume delete failed. Volumes is null", {}))
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_grow_volumes(self, mock_client):
+        mock_client.HPE3ParClient.login.return_value = None
+        mock_client.HPE3ParClient.growVolume.return_value = None
+        mock_client.HPE3ParClient.logout.return_value = None
+        mock_client.HPE3ParClient.getVolume.return_value.size_mib = 1024
+        return_status, changed, msg, issue = hpe3par_volume.grow_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS',
+            ['vol_1', {'volume_name': 'vol_2', 'size': 1, 'size_unit': 'GiB'}],
+            2, 'GiB', True, 2)
+        self.assertEqual((return_status, changed), (True, True))
+        self.assertEqual(issue['results'][1],
+                         {'volume_name': 'vol_2', 'changed': False, 'failed': False,
+                          'msg': 'Volume size already >= 1 GiB'})
+        mock_client.HPE3ParClient.growVolume.assert_called_once_with('vol_1', 1024)
+
+        self.assertEqual(hpe3par_volume.grow_volumes(mock_client.HPE3ParClient,
+                                                     'USER',
+                                                     'PASS',
+                                                     ['vol_1'],
+                                                     None,
+                                                     'GiB'
+                                                     ), (False, False, "Grow volume failed. Volume size is null for volume vol_1", {}))
+
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_modify_volumes(self, mock_client):
+        mock_client.HPE3ParClient.login.return_value = None
+        mock_client.HPE3ParClient.modifyVolume.side_effect = [None, Exception('boom')]
+        mock_client.HPE3ParClient.logout.return_value = None
+        return_status, changed, msg, issue = hpe3par_volume.modify_volumes(
+            mock_client.HPE3ParClient, 'USER', 'PASS',
+            [{'volume_name': 'vol_1', 'new_name': 'vol_1_new'}, 'vol_2'],
+            {'expiration_hours': 10})
+        self.assertEqual((return_status, changed, msg),
+                         (False, True, "Modify volume failed for 1 of 2 volume(s) | vol_2: boom"))
+        volume_mods = mock_client.HPE3ParClient.modifyVolume.call_args_list[0][0][1]
+        self.assertEqual(volume_mods['newName'], 'vol_1_new')
+        self.assertEqual(volume_mods['expirationHours'], 10)
+
+    @mock.patch('Modules.hpe3par_volume.time')
+    def test_run_bulk_operation_retries_busy_array(self, mock_time):
+        busy = Exception('busy')
+        busy.http_status = 503
+        operation = mock.Mock(side_effect=[busy, (True, 'done')])
+        self.assertEqual(hpe3par_volume.run_bulk_operation(operation, [{'volume_name': 'vol_1'}], 20),
+                         [{'volume_name': 'vol_1', 'changed': True, 'failed': False, 'msg': 'done'}])
+        mock_time.sleep.assert_called_once_with(1)
+
     @mock.patch('Modules.hpe3par_volume.client')
     def test_delete_snapshot(self, mock_client):
         mock_client.HPE3ParClient.login.return_value = None
@@ -819,6 +1349,8 @@ class TestHpe3parVolume(unittest.TestCase):
                                                      2,
                                                      'GiB'
                                                      ), (True, True, "Grown volume %s to %s %s successfully." % ('test_volume', 2, 'GiB'), {}))
+        mock_client.HPE3ParClient.getVolume.assert_called_once_with('test_volume')
+        mock_client.HPE3ParClient.growVolume.assert_called_once_with('test_volume', 1024)
 
         mock_client.HPE3ParClient.getVolume.return_value.size_mib = 2048
         self.assertEqual(hpe3par_volume.grow_to_size(mock_client.HPE3ParClient,
@@ -829,7 +1361,7 @@ class TestHpe3parVolume(unittest.TestCase):
                                                      'GiB'
                                                      ), (True, False, "Volume size already >= %s %s" % (2, 'GiB'), {}))
 
-        mock_client.HPE3ParClient.volumeExists.return_value = False
+        mock_client.HPE3ParClient.getVolume.side_effect = exceptions.HTTPNotFound()
         mock_client.HPE3ParClient.getVolume.return_value.size_mib = 1024
         self.assertEqual(hpe3par_volume.grow_to_size(mock_client.HPE3ParClient,
                                                      'USER',
@@ -891,6 +1423,19 @@ class TestHpe3parVolume(unittest.TestCase):
                                                      True
                                                      ), (True, True, "Provisioning type changed to %s successfully." % 'full', {}))
 
+        # Without waiting, the task ID is returned
+        self.assertEqual(hpe3par_volume.convert_type(mock_client.HPE3ParClient,
+                                                     'USER',
+                                                     'PASS',
+                                                     'test_volume',
+                                                     'test_cpg',
+                                                     'full',
+                                                     False,
+                                                     'keep_vv',
+                                                     True
+                                                     ), (True, True, "Provisioning type change to %s started." % 'full', {'task_id': 1}))
+        self.assertEqual(mock_client.HPE3ParClient.waitForTaskToEnd.call_count, 1)
+
         mock_client.HPE3ParClient.getVolume.return_value.provisioning_type = 1
         self.assertEqual(hpe3par_volume.convert_type(mock_client.HPE3ParClient,
                                                      'USER',
@@ -903,7 +1448,7 @@ class TestHpe3parVolume(unittest.TestCase):
                                                      True
                                                      ), (True, False, "Provisioning type already set to %s" % 'full', {}))
 
-        mock_client.HPE3ParClient.volumeExists.return_value = False
+        mock_client.HPE3ParClient.getVolume.side_effect = exceptions.HTTPNotFound()
         self.assertEqual(hpe3par_volume.convert_type(mock_client.HPE3ParClient,
                                                      'USER',
                                                      'PASS',
@@ -976,6 +1521,15 @@ class TestHpe3parVolume(unittest.TestCase):
                                                         True
                                                         ), (True, True, "Changed snap CPG to %s successfully." % 'test_cpg', {}))
 
+        # Without waiting, the task ID is returned
+        self.assertEqual(hpe3par_volume.change_snap_cpg(mock_client.HPE3ParClient,
+                                                        'USER',
+                                                        'PASS',
+                                                        'test_volume',
+                                                        'test_cpg',
+                                                        False
+                                                        ), (True, True, "Changing snap CPG to %s started." % 'test_cpg', {'task_id': 1}))
+
         mock_client.HPE3ParClient.getVolume.return_value.snap_cpg = 'test_cpg'
         self.assertEqual(hpe3par_volume.change_snap_cpg(mock_client.HPE3ParClient,
                                                         'USER',
@@ -985,7 +1539,7 @@ class TestHpe3parVolume(unittest.TestCase):
                                                         True
                                                         ), (True, False, "Snap CPG already set to %s" % 'test_cpg', {}))
 
-        mock_client.HPE3ParClient.volumeExists.return_value = False
+        mock_client.HPE3ParClient.getVolume.side_effect = exceptions.HTTPNotFound()
         self.assertEqual(hpe3par_volume.change_snap_cpg(mock_client.HPE3ParClient,
                                                         'USER',
                                                         'PASS',
@@ -1035,6 +1589,15 @@ class TestHpe3parVolume(unittest.TestCase):
                                                         True
                                                         ), (True, True, "Changed user CPG to %s successfully." % 'test_cpg', {}))
 
+        # Without waiting, the task ID is returned
+        self.assertEqual(hpe3par_volume.change_user_cpg(mock_client.HPE3ParClient,
+                                                        'USER',
+                                                        'PASS',
+                                                        'test_volume',
+                                                        'test_cpg',
+                                                        False
+                                                        ), (True, True, "Changing user CPG to %s started." % 'test_cpg', {'task_id': 1}))
+
         mock_client.HPE3ParClient.getVolume.return_value.user_cpg = 'test_cpg'
         self.assertEqual(hpe3par_volume.change_user_cpg(mock_client.HPE3ParClient,
                                                         'USER',
@@ -1044,7 +1607,7 @@ class TestHpe3parVolume(unittest.TestCase):
                                                         True
                                                         ), (True, False, "user CPG already set to %s" % 'test_cpg', {}))
 
-        mock_client.HPE3ParClient.volumeExists.return_value = False
+        mock_client.HPE3ParClient.getVolume.side_effect = exceptions.HTTPNotFound()
         self.assertEqual(hpe3par_volume.change_user_cpg(mock_client.HPE3ParClient,
                                                         'USER',
                                                         'PASS',
@@ -1152,6 +1715,79 @@ class TestHpe3parVolume(unittest.TestCase):
         self.assertEqual(hpe3par_volume.get_volume_type('thin_dedupe'), ['TDVV', 3])
         self.assertEqual(hpe3par_volume.get_volume_type('full'), ['FPVV', 2])
 
+    @mock.patch('Modules.hpe3par_volume.client')
+    def test_converge_volume(self, mock_client):
+        from hpe3par_sdk.models import VirtualVolume
+        mock_client.HPE3ParClient.getVolume.return_value = VirtualVolume({
+            'name': 'test_volume', 'sizeMiB': 1024, 'userCPG': 'FC_r1', 'snapCPG': 'FC_r6',
+            'provisioningType': 2, 'compressionState': 4, 'usrSpcAllocWarningPct': 80,
+            'expirationTimeSec': 1500000000})
+        volume_mods = {'expiration_hours': 0, 'retention_hours': 0, 'ss_spc_alloc_warning_pct': 0,
+                       'ss_spc_alloc_limit_pct': 0, 'usr_spc_alloc_warning_pct': 80, 'usr_spc_alloc_limit_pct': 0}
+        # A volume in shape costs a single GET
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r1',
+                                                        1, 'GiB', 'thin', False, 'FC_r6',
+                                                        dict(volume_mods, expiration_hours=24), False, None),
+                         (True, False, "Volume test_volume already converged", {}))
+        mock_client.HPE3ParClient.getVolume.assert_called_once_with('test_volume')
+        self.assertEqual(mock_client.HPE3ParClient.modifyVolume.call_count, 0)
+        self.assertEqual(mock_client.HPE3ParClient.growVolume.call_count, 0)
+        self.assertEqual(mock_client.HPE3ParClient.tuneVolume.call_count, 0)
+        self.assertEqual(mock_client.HPE3ParClient.getWsApiVersion.call_count, 0)
+        # A tune cannot change compression, it does not start one
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r1',
+                                                        1, 'GiB', 'thin', True, 'FC_r6', volume_mods, False, None),
+                         (True, False, "Volume test_volume already converged", {}))
+        self.assertEqual(mock_client.HPE3ParClient.tuneVolume.call_count, 0)
+
+        # Only the differences are applied, in order
+        calls = mock.Mock()
+        mock_client.HPE3ParClient.modifyVolume = calls.modifyVolume
+        mock_client.HPE3ParClient.growVolume = calls.growVolume
+        mock_client.HPE3ParClient.tuneVolume = calls.tuneVolume
+        mock_client.HPE3ParClient.waitForTaskToEnd = calls.waitForTaskToEnd
+        calls.tuneVolume.side_effect = [mock.Mock(task_id=5), mock.Mock(task_id=6)]
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r5',
+                                                        2, 'GiB', 'thin_dedupe', False, 'FC_r5',
+                                                        dict(volume_mods, retention_hours=12, usr_spc_alloc_warning_pct=90),
+                                                        False, None),
+                         (True, True, "Converged volume test_volume: modify, grow, change_snap_cpg, convert_type.",
+                          {'actions': ['modify', 'grow', 'change_snap_cpg', 'convert_type'], 'task_ids': [6]}))
+        self.assertEqual(calls.mock_calls, [
+            mock.call.modifyVolume('test_volume', {'retentionHours': 12, 'usrSpcAllocWarningPct': 90}),
+            mock.call.growVolume('test_volume', 1024),
+            mock.call.tuneVolume('test_volume', 2, {'snapCPG': 'FC_r5'}),
+            # The snap CPG tune has to end before the next tune
+            mock.call.waitForTaskToEnd(5),
+            mock.call.tuneVolume('test_volume', 1, {'userCPG': 'FC_r5', 'conversionOperation': 3, 'keepVV': None})])
+
+        # Missing volumes are created
+        mock_client.HPE3ParClient.getVolume.side_effect = exceptions.HTTPNotFound()
+        mock_client.HPE3ParClient.getWsApiVersion.return_value = {'build': 30201200}
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r1',
+                                                        1, 'GiB', 'thin', False, 'FC_r6', volume_mods, False, None),
+                         (True, True, "Created volume test_volume successfully.", {'actions': ['create']}))
+        mock_client.HPE3ParClient.createVolume.assert_called_once_with('test_volume', 'FC_r1', 1024, {
+            'tpvv': True, 'tdvv': False, 'snapCPG': 'FC_r6', 'usrSpcAllocWarningPct': 80,
+            'objectKeyValues': [{'key': 'type', 'value': 'ansible-3par-client'}]})
+        mock_client.HPE3ParClient.createVolume.reset_mock()
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r1',
+                                                        1, 'GiB', 'thin_dedupe', True, 'FC_r6', volume_mods, False, None),
+                         (True, True, "Created volume test_volume successfully.", {'actions': ['create']}))
+        mock_client.HPE3ParClient.createVolume.assert_called_once_with('test_volume', 'FC_r1', 1024, {
+            'tpvv': False, 'tdvv': True, 'compression': True, 'snapCPG': 'FC_r6', 'usrSpcAllocWarningPct': 80,
+            'objectKeyValues': [{'key': 'type', 'value': 'ansible-3par-client'}]})
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', 'FC_r1',
+                                                        None, 'GiB', 'thin', False, 'FC_r6', volume_mods, False, None),
+                         (False, False, "Converge volume failed. Volume size is null", {}))
+
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', 'PASS', 'test_volume', None,
+                                                        1, 'GiB', 'thin', False, 'FC_r6', volume_mods, False, None),
+                         (False, False, "Converge volume failed. Cpg is null", {}))
+        self.assertEqual(hpe3par_volume.converge_volume(mock_client.HPE3ParClient, 'USER', None, 'test_volume', 'FC_r1',
+                                                        1, 'GiB', 'thin', False, 'FC_r6', volume_mods, False, None),
+                         (False, False, "Converge volume failed. Storage system username or password is null", {}))
+
 
 if __name__ == '__main__':
     unittest.main(exit=False)
@@ -18,6 +18,8 @@
 
 import mock
 from Modules import hpe3par_volumeset as volumeset
+from utils import hpe3par_util
+from hpe3parclient import exceptions
 from mock import MagicMock
 from ansible.module_utils.basic import AnsibleModule as ansible
 import unittest
@@ -26,12 +28,14 @@ import unittest
 class TestHpe3parvolumeset(unittest.TestCase):
 
     PARAMS_FOR_PRESENT = {'state': 'present', 'storage_system_username': 'USER', 'storage_system_ip': '192.168.0.1',
-                          'storage_system_password': 'PASS', 'volumeset_name': 'volumeset', 'domain': 'domain', 'setmembers': 'new'}
+                          'storage_system_password': 'PASS', 'volumeset_name': 'volumeset', 'domain': 'domain', 'setmembers': 'new',
+                          'batch_size': 500}
 
     fields = {
         "state": {
             "required": True,
-            "choices": ['present', 'absent', 'add_volumes', 'remove_volumes'],
+            "choices": ['present', 'absent', 'add_volumes', 'remove_volumes',
+                        'exact'],
             "type": 'str'
         },
         "storage_system_ip": {
@@ -57,6 +61,10 @@ class TestHpe3parvolumeset(unittest.TestCase):
         },
         "setmembers": {
             "type": "list"
+        },
+        "batch_size": {
+            "type": "int",
+            "default": 500
         }
     }
 
@@ -562,5 +570,146 @@ class TestHpe3parvolumeset(unittest.TestCase):
         self.assertEqual(instance.fail_json.call_count, 0)
 
 
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util')
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    @mock.patch('Modules.hpe3par_volumeset.AnsibleModule')
+    @mock.patch('Modules.hpe3par_volumeset.set_volumes')
+    def test_main_exit_functionality_success_without_issue_attr_dict_exact(self, mock_volumeset, mock_module, mock_client, mock_util):
+        """
+        hpe3par volumeset - success check
+        """
+        mock_module.params = dict(self.PARAMS_FOR_PRESENT, state='exact', batch_size=2)
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        mock_volumeset.return_value = (
+            True, True, "Set volumes successfully. Added 1, removed 0.", {})
+        volumeset.main()
+        mock_volumeset.assert_called_once_with(
+            mock_util.get_client.return_value, 'USER', 'PASS', 'volumeset', 'domain', 'new', 2)
+        instance.exit_json.assert_called_with(
+            changed=True, msg="Set volumes successfully. Added 1, removed 0.")
+        self.assertEqual(instance.fail_json.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', None)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    @mock.patch('Modules.hpe3par_volumeset.AnsibleModule')
+    def test_main_exact_without_hpe3par_util(self, mock_module, mock_client):
+        """
+        hpe3par volumeset - state exact needs the hpe3par_util module_utils
+        """
+        mock_module.params = dict(self.PARAMS_FOR_PRESENT, state='exact', batch_size=2)
+        mock_module.return_value = mock_module
+        instance = mock_module.return_value
+        instance.fail_json.side_effect = SystemExit
+        self.assertRaises(SystemExit, volumeset.main)
+        instance.fail_json.assert_called_once_with(
+            msg='the hpe3par_util module_utils is required with state exact')
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_setmembers_empty(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset
+        """
+        result = volumeset.set_volumes(
+            mock_client, "user", "pass", "volumeset", None, None)
+        self.assertEqual(result, (
+            False,
+            False,
+            "Set volumeset members failed. Setmembers is null",
+            {}))
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_batch_size_invalid(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset
+        """
+        result = volumeset.set_volumes(
+            mock_client, "user", "pass", "volumeset", None, ["member1"], 0)
+        self.assertEqual(result, (
+            False,
+            False,
+            "Set volumeset members failed. Batch size must be at least 1",
+            {}))
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_diff(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset
+        """
+        mock_client.HPE3ParClient.getVolumeSet.return_value.setmembers = [
+            "member1", "member2"]
+        result = volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", None, ["member2", "member3", "member3"])
+        self.assertEqual(
+            result, (True, True, "Set volumes successfully. Added 1, removed 1.", {}))
+        mock_client.HPE3ParClient.getVolumeSet.assert_called_once_with("volumeset")
+        mock_client.HPE3ParClient.removeVolumesFromVolumeSet.assert_called_once_with(
+            "volumeset", ["member1"])
+        mock_client.HPE3ParClient.addVolumesToVolumeSet.assert_called_once_with(
+            "volumeset", ["member3"])
+
+        result = volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", None, ["member2", "member1"])
+        self.assertEqual(
+            result, (True, False, "Volume set volumeset already has the given members. Nothing to do.", {}))
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_chunked(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset
+        """
+        members = ["member%s" % i for i in range(1200)]
+        mock_client.HPE3ParClient.getVolumeSet.return_value.setmembers = None
+        result = volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", None, members)
+        self.assertEqual(
+            result, (True, True, "Set volumes successfully. Added 1200, removed 0.", {}))
+        self.assertEqual(
+            [call[0][1] for call in mock_client.HPE3ParClient.addVolumesToVolumeSet.call_args_list],
+            [members[:500], members[500:1000], members[1000:]])
+
+        mock_client.HPE3ParClient.addVolumesToVolumeSet.reset_mock()
+        volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", None, members, 1000)
+        self.assertEqual(
+            [call[0][1] for call in mock_client.HPE3ParClient.addVolumesToVolumeSet.call_args_list],
+            [members[:1000], members[1000:]])
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_create(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset that does not exist
+        """
+        members = ["member%s" % i for i in range(600)]
+        mock_client.HPE3ParClient.getVolumeSet.side_effect = exceptions.HTTPNotFound()
+        result = volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", "domain", members)
+        self.assertEqual(
+            result, (True, True, "Created volume set volumeset with 600 volume(s).", {}))
+        mock_client.HPE3ParClient.createVolumeSet.assert_called_once_with(
+            "volumeset", "domain", None, members[:500])
+        mock_client.HPE3ParClient.addVolumesToVolumeSet.assert_called_once_with(
+            "volumeset", members[500:])
+        self.assertEqual(mock_client.HPE3ParClient.removeVolumesFromVolumeSet.call_count, 0)
+
+    @mock.patch('Modules.hpe3par_volumeset.hpe3par_util', hpe3par_util)
+    @mock.patch('Modules.hpe3par_volumeset.client')
+    def test_set_volumes_exception(self, mock_client):
+        """
+        hpe3par volumeset - set the members of a volumeset
+        """
+        mock_client.HPE3ParClient.login.side_effect = Exception(
+            "Failed to login!")
+        result = volumeset.set_volumes(
+            mock_client.HPE3ParClient, "user", "pass", "volumeset", None, ["member1"])
+        self.assertEqual(
+            result, (False, False, "Set volumeset members failed | Failed to login!", {}))
+
+
 if __name__ == '__main__':
     unittest.main(exit=False)
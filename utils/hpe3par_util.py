@@ -19,6 +19,59 @@
 # with this program.  If not, see <https://www.gnu.org/licenses/>
 
 
+import atexit
+import binascii
+import hashlib
+import json
+import os
+import re
+import subprocess
+import tempfile
+import time
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
+# Controller side cache of WSAPI data shared by the modules between tasks.
+# Everything here is opt-in through environment variables, which can be set
+# for a whole play with the play level "environment" keyword.
+CACHE_DIR_ENV = 'HPE3PAR_CACHE_DIR'
+DEFAULT_CACHE_DIR = '~/.ansible/tmp/hpe3par'
+SESSION_CACHE_ENV = 'HPE3PAR_SESSION_CACHE'
+SESSION_CACHE_TTL_ENV = 'HPE3PAR_SESSION_CACHE_TTL'
+# Kept below the default idle timeout of WSAPI sessions
+DEFAULT_SESSION_CACHE_TTL = 600
+# A cached session is only reused with the password it was created with
+PASSWORD_DIGEST_ITERATIONS = 10000
+# WSAPI port and version (build number) cache, disabled when 0
+WSAPI_CACHE_TTL_ENV = 'HPE3PAR_WSAPI_CACHE_TTL'
+HTTP_KEEPALIVE_ENV = 'HPE3PAR_HTTP_KEEPALIVE'
+# Connections kept open to the WSAPI server, one per concurrent bulk worker
+HTTP_POOL_SIZE = 8
+# Seconds an OpenSSH master connection to the array outlives its last task,
+# disabled when 0
+SSH_CONTROL_PERSIST_ENV = 'HPE3PAR_SSH_CONTROL_PERSIST'
+# Task states, as defined by hpe3parclient.client.HPE3ParClient. The
+# hpe3par_sdk client does not expose them.
+TASK_DONE = 1
+TASK_ACTIVE = 2
+TASK_CANCELLED = 3
+TASK_FAILED = 4
+# Not a state of the array, the task ID is unknown to it
+TASK_NOT_FOUND = 0
+TASK_STATUSES = {
+    TASK_DONE: 'done',
+    TASK_ACTIVE: 'active',
+    TASK_CANCELLED: 'cancelled',
+    TASK_FAILED: 'failed',
+    TASK_NOT_FOUND: 'not found'}
+# Seconds between two task polls of wait_for_tasks, doubled while no task
+# ends
+MIN_TASK_POLL_INTERVAL = 1
+MAX_TASK_POLL_INTERVAL = 30
+
+
 def convert_to_binary_multiple(size, size_unit):
     size_mib = 0
     if size_unit == 'GiB':
@@ -46,3 +99,450 @@ def convert_to_hours(time, unit):
     elif unit == 'Hours':
         hours = time
     return hours
+
+
+def get_chunks(items, chunk_size):
+    return [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+
+def diff_set_members(existing_set_members, setmembers):
+    """Returns the given members without duplicates, the members to add and
+    the members to remove, in the given order. existing_set_members is None
+    for a set that does not exist yet. Lookups go through sets, the lists
+    only keep the order.
+    """
+    wanted_set_members = []
+    wanted = set()
+    for member in setmembers:
+        if member not in wanted:
+            wanted.add(member)
+            wanted_set_members.append(member)
+    if existing_set_members is None:
+        return wanted_set_members, wanted_set_members, []
+    existing = set(existing_set_members)
+    new_set_members = [member for member in wanted_set_members
+                       if member not in existing]
+    old_set_members = [member for member in existing_set_members
+                       if member not in wanted]
+    return wanted_set_members, new_set_members, old_set_members
+
+
+def get_tasks(client_obj, task_ids):
+    """Returns the task of each of task_ids, from a single task list call.
+    Ended tasks are eventually dropped from the list, these are looked up one
+    by one. The task is None for an ID the array does not know.
+    """
+    from hpe3parclient import exceptions
+    tasks = dict((task.task_id, task) for task in client_obj.getAllTasks())
+    found = {}
+    for task_id in task_ids:
+        task = tasks.get(task_id)
+        if task is None:
+            try:
+                task = client_obj.getTask(task_id)
+            except exceptions.HTTPNotFound:
+                pass
+        found[task_id] = task
+    return found
+
+
+def wait_for_tasks(client_obj, task_ids, timeout,
+                   min_poll_interval=MIN_TASK_POLL_INTERVAL,
+                   max_poll_interval=MAX_TASK_POLL_INTERVAL):
+    """Waits until none of task_ids is active any more, at most timeout
+    seconds. Every poll is a single task list call, whatever the number of
+    tasks. Returns the name, last status and duration in seconds of each
+    task, the duration is None while the task is active.
+    """
+    start = time.time()
+    deadline = start + timeout
+    poll_interval = min_poll_interval
+    results = dict((task_id, {'name': None, 'status': TASK_ACTIVE,
+                              'duration': None})
+                   for task_id in task_ids)
+    while True:
+        active = [task_id for task_id in task_ids
+                  if results[task_id]['status'] == TASK_ACTIVE]
+        tasks = get_tasks(client_obj, active)
+        now = time.time()
+        ended = 0
+        for task_id in active:
+            result = results[task_id]
+            task = tasks[task_id]
+            if task is not None:
+                result['name'] = task.name
+                result['status'] = task.status
+            else:
+                result['status'] = TASK_NOT_FOUND
+            if result['status'] != TASK_ACTIVE:
+                result['duration'] = int(now - start)
+                ended += 1
+        if ended == len(active) or now >= deadline:
+            return results
+        if ended:
+            poll_interval = min_poll_interval
+        time.sleep(min(poll_interval, deadline - now))
+        if not ended:
+            poll_interval = min(poll_interval * 2, max_poll_interval)
+
+
+def get_task_error(task_id, status, timeout, label='Task'):
+    if status == TASK_ACTIVE:
+        return "%s %s has not ended after %s seconds" % (label, task_id,
+                                                          timeout)
+    if status == TASK_FAILED:
+        return "%s %s failed" % (label, task_id)
+    if status == TASK_CANCELLED:
+        return "%s %s was cancelled" % (label, task_id)
+    if status == TASK_NOT_FOUND:
+        return "%s %s not found" % (label, task_id)
+    return None
+
+
+def env_flag(name):
+    return os.environ.get(name, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def env_int(name, default):
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def get_cache_file(kind, *keys):
+    cache_dir = os.path.expanduser(
+        os.environ.get(CACHE_DIR_ENV, DEFAULT_CACHE_DIR))
+    digest = hashlib.sha1(
+        '|'.join(str(key) for key in keys).encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, '%s-%s.json' % (kind, digest))
+
+
+def read_cache_entry(cache_file):
+    """Returns the cached value with the time it was written, whatever its
+    age, or None.
+    """
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (IOError, OSError, ValueError):
+        return None
+
+
+def read_cache(cache_file, ttl):
+    entry = read_cache_entry(cache_file)
+    if entry is None or time.time() - entry.get('time', 0) > ttl:
+        return None
+    return entry.get('value')
+
+
+def write_cache(cache_file, value):
+    # The cache is best effort, a failed write only costs a cache miss
+    cache_dir = os.path.dirname(cache_file)
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir, 0o700)
+        # mkstemp creates the file readable by the owner only
+        fd, tmp_file = tempfile.mkstemp(dir=cache_dir)
+        with os.fdopen(fd, 'w') as f:
+            json.dump({'time': time.time(), 'value': value}, f)
+        os.rename(tmp_file, cache_file)
+    except (IOError, OSError):
+        pass
+
+
+def remove_cache(cache_file):
+    try:
+        os.remove(cache_file)
+    except (IOError, OSError):
+        pass
+
+
+def get_password_digest(password, salt):
+    # Salted and slow, the cache files must not make the password cheap to
+    # guess
+    return binascii.hexlify(hashlib.pbkdf2_hmac(
+        'sha256', password.encode('utf-8'), salt.encode('utf-8'),
+        PASSWORD_DIGEST_ITERATIONS)).decode('ascii')
+
+
+class CachingClient(object):
+    """Wraps an HPE3ParClient to share WSAPI data with other tasks.
+
+    With a session cache file, login() takes the session key cached by an
+    earlier task instead of creating a new session and logout() caches the
+    key instead of deleting the session. The key is only taken with the
+    password it was created with, a key that is replaced after its ttl or a
+    password change is deleted on the array. A key that expired on the array
+    is replaced by the client's own re-login when the array answers 401 or
+    403.
+
+    With a version cache file, getWsApiVersion() is answered from the cache.
+
+    The SSH connection of the CLI calls is shared by the whole module run.
+    setSSHOptions() keeps the connection of an earlier call for the same
+    array and user, logout() leaves it open and it is closed when the module
+    exits. The client itself connects on the first CLI command, so runs
+    without one never open SSH. With ssh_control_persist, the CLI commands
+    go through an OpenSSH master connection that later tasks reuse.
+    """
+
+    def __init__(self, client_obj, session_cache_file=None, session_ttl=0,
+                 version_cache_file=None, version_ttl=0,
+                 ssh_control_persist=0):
+        self._client_obj = client_obj
+        self._session_cache_file = session_cache_file
+        self._session_ttl = session_ttl
+        self._version_cache_file = version_cache_file
+        self._version_ttl = version_ttl
+        self._ssh_control_persist = ssh_control_persist
+        self._ssh_options = None
+        self._session = None
+
+    def __getattr__(self, name):
+        return getattr(self._client_obj, name)
+
+    def login(self, username, password, optional=None):
+        if self._session_cache_file is None:
+            return self._client_obj.login(username, password, optional)
+        http = self._client_obj.client.http
+        entry = read_cache_entry(self._session_cache_file)
+        session = entry and entry.get('value')
+        if not isinstance(session, dict):
+            session = None
+        if (session is not None and
+                time.time() - entry.get('time', 0) <= self._session_ttl and
+                session.get('digest') == get_password_digest(
+                    password, session.get('salt', ''))):
+            http.session_key = session.get('key')
+            # Needed by the client to re-login if the key has expired
+            http.user = username
+            http.password = password
+            http._auth_optional = optional
+            http.auth_try = 0
+        else:
+            self._client_obj.login(username, password, optional)
+            if session is not None and session.get('key') not in (
+                    None, http.get_session_key()):
+                self.delete_session(session['key'])
+            salt = binascii.hexlify(os.urandom(16)).decode('ascii')
+            session = {'salt': salt,
+                       'digest': get_password_digest(password, salt)}
+        self._session = session
+        self.cache_session()
+
+    def cache_session(self):
+        self._session['key'] = self._client_obj.client.http.get_session_key()
+        write_cache(self._session_cache_file, self._session)
+
+    def delete_session(self, session_key):
+        # Best effort, the array also drops idle sessions after a while
+        try:
+            self._client_obj.client.http.delete('/credentials/%s' %
+                                                session_key)
+        except Exception:
+            pass
+
+    def logout(self):
+        rest_client = self._client_obj.client
+        if self._session_cache_file is None:
+            # The client's logout also closes SSH, which is kept for later
+            # CLI calls of this run
+            ssh = rest_client.ssh
+            rest_client.ssh = None
+            try:
+                return self._client_obj.logout()
+            finally:
+                rest_client.ssh = ssh
+        if (self._session is not None and
+                rest_client.http.get_session_key() is not None):
+            self.cache_session()
+
+    def setSSHOptions(self, ip, login, password, port=22, conn_timeout=None,
+                      privatekey=None, **kwargs):
+        rest_client = self._client_obj.client
+        options = (ip, login, port)
+        if options == self._ssh_options and rest_client.ssh is not None:
+            return
+        if self._ssh_control_persist > 0 and which('ssh'):
+            rest_client.ssh = ControlMasterSSH(
+                ip, login, port, get_control_path(ip, login, port),
+                self._ssh_control_persist)
+        else:
+            self._client_obj.setSSHOptions(ip, login, password, port,
+                                           conn_timeout, privatekey, **kwargs)
+        if self._ssh_options is None:
+            atexit.register(self.close_ssh)
+        self._ssh_options = options
+
+    def close_ssh(self):
+        ssh = self._client_obj.client.ssh
+        if ssh:
+            ssh.close()
+
+    def getWsApiVersion(self):
+        if self._version_cache_file is None:
+            return self._client_obj.getWsApiVersion()
+        api_version = read_cache(self._version_cache_file, self._version_ttl)
+        if api_version is None:
+            api_version = self._client_obj.getWsApiVersion()
+            write_cache(self._version_cache_file, api_version)
+        else:
+            # Same side effect as a live getWsApiVersion() call
+            rest_client = self._client_obj.client
+            if (api_version.get('build', 0) >=
+                    rest_client.HPE3PAR_WS_PRIMERA_MIN_BUILD_VERSION):
+                rest_client.primera_supported = True
+        return api_version
+
+
+class PooledRequests(object):
+    """Stands in for the requests module inside hpe3parclient.http.
+
+    hpe3parclient sends every WSAPI call through requests.request(), which
+    opens a new TCP connection and TLS handshake each time. Routing the calls
+    through one requests.Session keeps the connections to the WSAPI server
+    open for the whole module run.
+    """
+
+    def __init__(self, requests_module, pool_size):
+        self._requests = requests_module
+        self._session = requests_module.Session()
+        adapter = requests_module.adapters.HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+
+    def __getattr__(self, name):
+        return getattr(self._requests, name)
+
+    def request(self, method, url, **kwargs):
+        return self._session.request(method, url, **kwargs)
+
+
+class ControlMasterSSH(object):
+    """Stands in for the paramiko based SSH client of hpe3parclient.
+
+    Commands run through the OpenSSH client with a master connection that
+    stays open for control_persist seconds after its last use, so the SSH
+    handshake and login are paid once for all tasks against an array.
+    OpenSSH cannot be given a password, the array user needs a public key
+    (setsshkey) usable by the controller.
+    """
+
+    def __init__(self, ip, login, port, control_path, control_persist):
+        self.san_ip = ip
+        self.san_login = login
+        self.san_ssh_port = port
+        self.control_path = control_path
+        self.control_persist = control_persist
+
+    def open(self):
+        # The master connection is opened by the first command
+        pass
+
+    def close(self):
+        # The master connection is closed by ControlPersist
+        pass
+
+    def run(self, cmd, multi_line_stripper=False):
+        from hpe3parclient import exceptions
+        from hpe3parclient.ssh import HPE3PARSSHClient, tpd_commands
+        # Same checks and command string as the SSH client of hpe3parclient.
+        # check_ssh_injection() uses no state of the client, it is called on
+        # an instance that never connects.
+        HPE3PARSSHClient.__new__(HPE3PARSSHClient).check_ssh_injection(cmd)
+        command = ' '.join(cmd)
+        if re.match('|'.join(tpd_commands), command):
+            command = 'Tpd::rtpd "' + command.replace('"', '\\"') + '"'
+        ssh_cmd = [
+            'ssh', '-o', 'BatchMode=yes',
+            '-o', 'ControlMaster=auto',
+            '-o', 'ControlPath=%s' % self.control_path,
+            '-o', 'ControlPersist=%s' % self.control_persist,
+            '-p', str(self.san_ssh_port), '-l', self.san_login, self.san_ip,
+            # Same table format as the sessions of hpe3parclient
+            'setclienv csvtable 1; %s' % command]
+        process = subprocess.Popen(ssh_cmd, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE,
+                                   universal_newlines=True)
+        stdout, stderr = process.communicate()
+        if process.returncode == 255:
+            raise exceptions.SSHException(stderr.strip())
+        return stdout.rstrip('\n').split('\n')
+
+
+def get_control_path(ip, login, port):
+    """Returns the socket of the OpenSSH master connection. Socket paths
+    are limited to about 100 characters, so the name is kept short.
+    """
+    cache_file = get_cache_file('ssh', ip, login, port)
+    cache_dir = os.path.dirname(cache_file)
+    if not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir, 0o700)
+    return os.path.join(cache_dir, os.path.basename(cache_file)[:20])
+
+
+def enable_keepalive():
+    if not env_flag(HTTP_KEEPALIVE_ENV):
+        return
+    try:
+        from hpe3parclient import http
+    except ImportError:
+        return
+    if not isinstance(http.requests, PooledRequests):
+        http.requests = PooledRequests(http.requests, HTTP_POOL_SIZE)
+
+
+def cache_client(client_obj, storage_system_ip, storage_system_username):
+    """Returns client_obj wrapped with the caches enabled in the environment
+    and the shared SSH connection."""
+    enable_keepalive()
+    session_cache_file = None
+    version_cache_file = None
+    if env_flag(SESSION_CACHE_ENV):
+        session_cache_file = get_cache_file(
+            'session', storage_system_ip, storage_system_username)
+    version_ttl = env_int(WSAPI_CACHE_TTL_ENV, 0)
+    if version_ttl > 0:
+        version_cache_file = get_cache_file('version', storage_system_ip)
+    return CachingClient(
+        client_obj,
+        session_cache_file,
+        env_int(SESSION_CACHE_TTL_ENV, DEFAULT_SESSION_CACHE_TTL),
+        version_cache_file,
+        version_ttl,
+        env_int(SSH_CONTROL_PERSIST_ENV, 0))
+
+
+def get_port_number(client_class, storage_system_ip, storage_system_username,
+                    storage_system_password):
+    """Returns the WSAPI port of the array, cached if enabled.
+
+    The port is discovered with showwsapi over SSH, the slowest step of
+    most tasks.
+    """
+    ttl = env_int(WSAPI_CACHE_TTL_ENV, 0)
+    cache_file = get_cache_file('port', storage_system_ip)
+    if ttl > 0:
+        port_number = read_cache(cache_file, ttl)
+        if port_number is not None:
+            return port_number
+    port_number = client_class.getPortNumber(
+        storage_system_ip, storage_system_username, storage_system_password)
+    if ttl > 0:
+        write_cache(cache_file, port_number)
+    return port_number
+
+
+def get_client(client_class, storage_system_ip, storage_system_username,
+               storage_system_password, *args):
+    """Returns a WSAPI client of the array, on the cached port and wrapped
+    with cache_client(). args are passed to client_class after the URL.
+    """
+    port_number = get_port_number(client_class, storage_system_ip,
+                                  storage_system_username,
+                                  storage_system_password)
+    wsapi_url = 'https://%s:%s/api/v1' % (storage_system_ip, port_number)
+    return cache_client(client_class(wsapi_url, *args), storage_system_ip,
+                        storage_system_username)